@@ -0,0 +1,80 @@
+# X:\Aplikacje\dictaitor\benchmarks\bench_batch.py
+"""
+Benchmark transkrypcji partiami: przepustowość (nagrania na sekundę) transcribe_batch_local
+dla różnych rozmiarów partii na zestawie krótkich nagrań (3-15 s, jak notatki głosowe).
+
+Rozmiar partii 1 odpowiada transkrypcji każdego nagrania osobno. Model jest ładowany raz,
+a pierwszy przebieg (rozgrzewka) nie jest liczony. Pamięć podręczna transkrypcji jest wyłączona.
+
+Użycie:
+    python benchmarks/bench_batch.py --models base small --batch-sizes 1 4 8 16 --clips 32
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from common import synthetic_speech
+from bench_models import model_is_cached
+
+from modules.local_stt import transcribe_batch_local, load_whisper_model
+
+DEFAULT_BATCH_SIZES = [1, 2, 4, 8, 16]
+
+
+def synthetic_clips(count: int, seed: int = 0) -> list:
+    """Nagrania o losowej długości 3-15 s."""
+    rng = np.random.default_rng(seed)
+    return [synthetic_speech(float(rng.uniform(3.0, 15.0)), seed=seed + i) for i in range(count)]
+
+
+def measure(model_name: str, clips: list, batch_sizes: list, language: str) -> list:
+    load_whisper_model(model_name)
+    # Rozgrzewka - pierwsza partia płaci za alokacje i inicjalizację jąder
+    transcribe_batch_local(clips[:2], model_name, language, batch_size=2, use_cache=False)
+    audio_seconds = sum(len(clip) for clip in clips) / 16000
+    rows = []
+    for batch_size in batch_sizes:
+        started = time.perf_counter()
+        outcomes = transcribe_batch_local(clips, model_name, language, batch_size=batch_size, use_cache=False)
+        elapsed = time.perf_counter() - started
+        rows.append({"model": model_name, "batch_size": batch_size, "seconds": elapsed,
+                     "clips_per_second": len(clips) / elapsed, "rtf": elapsed / audio_seconds,
+                     "errors": sum(1 for _, error in outcomes if error)})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", nargs="+", default=["base"], help="Modele Whisper")
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=DEFAULT_BATCH_SIZES)
+    parser.add_argument("--clips", type=int, default=32, help="Liczba syntetycznych nagrań")
+    parser.add_argument("--language", default="en")
+    parser.add_argument("--allow-download", action="store_true", help="Pobieraj brakujące modele")
+    parser.add_argument("--json", help="Zapisz wyniki do pliku JSON")
+    args = parser.parse_args()
+
+    clips = synthetic_clips(args.clips)
+    rows = []
+    for model_name in args.models:
+        if not args.allow_download and not model_is_cached(model_name):
+            print(f"Pomijam {model_name}: brak modelu w pamięci podręcznej (użyj --allow-download)")
+            continue
+        rows.extend(measure(model_name, clips, args.batch_sizes, args.language))
+
+    print(f"{'model':<12}{'partia':>8}{'czas [s]':>10}{'nagr./s':>10}{'RTF':>8}{'przysp.':>9}")
+    baseline = {}
+    for row in rows:
+        baseline.setdefault(row["model"], row["clips_per_second"])
+        speedup = row["clips_per_second"] / baseline[row["model"]]
+        print(f"{row['model']:<12}{row['batch_size']:>8}{row['seconds']:>10.2f}"
+              f"{row['clips_per_second']:>10.2f}{row['rtf']:>8.3f}{speedup:>8.2f}x")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"clips": args.clips, "runs": rows}, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
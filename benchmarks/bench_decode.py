@@ -0,0 +1,139 @@
+# X:\Aplikacje\dictaitor\benchmarks\bench_decode.py
+"""
+Benchmark dekodowania plików WAV: bezpośrednia ścieżka audio_io (nagłówek + np.frombuffer,
+resampler polifazowy) w porównaniu z librosa.load i dekoderem Whisper (ffmpeg).
+
+Dla każdego wariantu pliku (nagrania aplikacji 16 kHz mono 16-bit, 44.1 kHz stereo,
+48 kHz 24-bit) mierzy najkrótszy czas dekodowania i różnicę względem wyniku librosa.
+Czas samego importu librosa jest mierzony w osobnym procesie (pierwsze wczytanie pliku
+w aplikacji płaci go w całości).
+
+Użycie:
+    python benchmarks/bench_decode.py [--seconds 300] [--repeat 3] [--json wynik.json]
+"""
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+from common import synthetic_speech
+
+from modules.audio_io import load_audio, WHISPER_SAMPLE_RATE
+
+# Nazwa, częstotliwość, kanały, bajty na próbkę
+VARIANTS = [
+    ("16k_mono_16bit", 16000, 1, 2),
+    ("44k1_stereo_16bit", 44100, 2, 2),
+    ("48k_mono_24bit", 48000, 1, 3),
+]
+
+
+def write_variant(path: str, seconds: float, rate: int, channels: int, width: int) -> None:
+    """Zapisuje syntetyczne nagranie w zadanym formacie PCM."""
+    audio = synthetic_speech(seconds, rate=rate)
+    frames = np.repeat(audio[:, None], channels, axis=1) * np.linspace(1.0, 0.6, channels)
+    scaled = np.round(np.clip(frames, -1.0, 1.0) * (2 ** (8 * width - 1) - 1)).astype("<i4")
+    if width == 2:
+        data = scaled.astype("<i2").tobytes()
+    else:
+        data = scaled.view(np.uint8).reshape(-1, 4)[:, :width].tobytes()
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(width)
+        wf.setframerate(rate)
+        wf.writeframes(data)
+    with open(path, "wb") as f:
+        f.write(buffer.getvalue())
+
+
+def best_time(func, repeat: int):
+    """Najkrótszy czas wykonania i wynik ostatniego wywołania."""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def librosa_import_seconds():
+    """Czas importu librosa w świeżym procesie (None, jeśli nie jest zainstalowana)."""
+    code = "import time; s = time.perf_counter(); import librosa; print(time.perf_counter() - s)"
+    completed = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    return float(completed.stdout) if completed.returncode == 0 else None
+
+
+def run_benchmark(seconds: float, repeat: int) -> dict:
+    decoders = {"audio_io": load_audio}
+    try:
+        import librosa
+        decoders["librosa"] = lambda path: librosa.load(path, sr=WHISPER_SAMPLE_RATE, mono=True)[0]
+    except ImportError:
+        pass
+    try:
+        import whisper
+        decoders["whisper_ffmpeg"] = whisper.load_audio
+    except ImportError:
+        pass
+
+    results = {"audio_seconds": seconds, "repeat": repeat,
+               "librosa_import_seconds": librosa_import_seconds(), "variants": {}}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for name, rate, channels, width in VARIANTS:
+            path = os.path.join(temp_dir, f"{name}.wav")
+            write_variant(path, seconds, rate, channels, width)
+            row = {"file_bytes": os.path.getsize(path), "decoders": {}}
+            outputs = {}
+            for decoder_name, decoder in decoders.items():
+                try:
+                    elapsed, outputs[decoder_name] = best_time(lambda: decoder(path), repeat)
+                except Exception as e:
+                    row["decoders"][decoder_name] = {"error": str(e)}
+                    continue
+                row["decoders"][decoder_name] = {"seconds": elapsed, "realtime_factor": seconds / elapsed}
+            if "librosa" in outputs and "audio_io" in outputs:
+                length = min(len(outputs["librosa"]), len(outputs["audio_io"]))
+                row["max_abs_diff_vs_librosa"] = float(np.max(np.abs(
+                    outputs["librosa"][:length] - outputs["audio_io"][:length])))
+            results["variants"][name] = row
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=300.0, help="Długość syntetycznych nagrań")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="Zapisz wyniki do pliku JSON")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.seconds, max(1, args.repeat))
+
+    import_seconds = results["librosa_import_seconds"]
+    print(f"Nagrania: {args.seconds:.0f} s, import librosa: "
+          f"{f'{import_seconds:.2f} s' if import_seconds is not None else 'brak biblioteki'}")
+    print(f"{'wariant':<20}{'dekoder':<16}{'czas [s]':>10}{'x czasu rzecz.':>16}")
+    for name, row in results["variants"].items():
+        for decoder_name, timing in row["decoders"].items():
+            if "error" in timing:
+                print(f"{name:<20}{decoder_name:<16}  błąd: {timing['error']}")
+            else:
+                print(f"{name:<20}{decoder_name:<16}{timing['seconds']:>10.3f}{timing['realtime_factor']:>16.0f}")
+        if "max_abs_diff_vs_librosa" in row:
+            print(f"{'':<20}maks. różnica względem librosa: {row['max_abs_diff_vs_librosa']:.2e}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+# X:\Aplikacje\dictaitor\benchmarks\bench_models.py
+"""
+Benchmark lokalnych modeli Whisper: czas ładowania, współczynnik czasu rzeczywistego (RTF),
+szczytowe zużycie pamięci (RSS) i WER względem tekstu referencyjnego.
+
+Każda kombinacja model x liczba wątków jest mierzona w osobnym procesie - ładowanie modelu
+jest zawsze "zimne", a szczytowy RSS dotyczy tylko tego modelu. Transkrypcja przechodzi przez
+transcribe_audio_local (z wyłączoną pamięcią podręczną wyników), czyli tę samą ścieżkę co w aplikacji.
+
+Benchmark działa offline na CPU: modele, których nie ma w katalogu pamięci podręcznej whisper
+(~/.cache/whisper lub $XDG_CACHE_HOME/whisper), są pomijane, chyba że podano --allow-download.
+
+Nagrania testowe:
+  - domyślnie syntetyczne sygnały 10 s, 60 s i 300 s (tylko wydajność - bez WER),
+  - --fixtures plik.json - lista obiektów {"audio": ..., "reference": ..., "language": ...}
+    (ścieżki względem pliku JSON; "reference" i "language" są opcjonalne).
+
+Użycie:
+    python benchmarks/bench_models.py --models tiny base small --threads 1 4 --json wyniki.json
+    python benchmarks/bench_models.py --fixtures nagrania/fixtures.json --models turbo --repeat 3
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+from common import synthetic_speech, word_error_rate
+
+from modules.audio_io import encode_wav, get_audio_duration
+
+DEFAULT_MODELS = ["tiny", "base", "small", "medium", "turbo"]
+# Nazwa, długość [s], język przekazywany do modelu (None - wykrywanie automatyczne)
+SYNTHETIC_FIXTURES = [("synthetic_10s", 10, None), ("synthetic_60s", 60, "pl"), ("synthetic_300s", 300, "en")]
+
+
+def whisper_cache_dir() -> str:
+    """Katalog, w którym whisper przechowuje pobrane modele."""
+    cache_home = os.getenv("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(cache_home, "whisper")
+
+
+def model_is_cached(model_name: str) -> bool:
+    """Czy plik modelu jest już w pamięci podręcznej whisper (ładowanie nie wymaga sieci)."""
+    import whisper
+    from modules.local_stt import base_model_name
+
+    url = getattr(whisper, "_MODELS", {}).get(base_model_name(model_name))
+    if url is None:
+        # Nieznana nazwa lub ścieżka do własnego pliku modelu
+        return os.path.isfile(model_name)
+    return os.path.isfile(os.path.join(whisper_cache_dir(), os.path.basename(url)))
+
+
+def peak_rss_mb() -> float:
+    """Szczytowy rozmiar pamięci rezydentnej bieżącego procesu w MB."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux podaje KB, macOS bajty
+        return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                        ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        ctypes.windll.psapi.GetProcessMemoryInfo(
+            ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb)
+        return counters.PeakWorkingSetSize / 2**20
+
+
+def load_fixtures(manifest_path: str) -> list:
+    """Wczytuje listę nagrań testowych z pliku JSON."""
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    fixtures = []
+    for entry in entries:
+        path = os.path.join(base_dir, entry["audio"])
+        fixtures.append({
+            "name": os.path.basename(path),
+            "path": path,
+            "seconds": get_audio_duration(path),
+            "language": entry.get("language"),
+            "reference": entry.get("reference"),
+        })
+    return fixtures
+
+
+def synthetic_fixtures(directory: str) -> list:
+    """Zapisuje syntetyczne nagrania SYNTHETIC_FIXTURES do katalogu tymczasowego."""
+    fixtures = []
+    for seed, (name, seconds, language) in enumerate(SYNTHETIC_FIXTURES):
+        path = os.path.join(directory, f"{name}.wav")
+        with open(path, "wb") as f:
+            f.write(encode_wav(synthetic_speech(seconds, seed=seed)))
+        fixtures.append({"name": name, "path": path, "seconds": float(seconds),
+                         "language": language, "reference": None})
+    return fixtures
+
+
+def _init_worker(threads: int) -> None:
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+def measure_model(model_name: str, threads: int, fixtures: list, repeat: int) -> dict:
+    """
+    Mierzy jeden model w bieżącym (świeżym) procesie.
+
+    Returns:
+        dict: Czas ładowania, szczytowy RSS oraz RTF i WER dla każdego nagrania
+    """
+    from modules.local_stt import load_whisper_model, transcribe_audio_local
+
+    rss_before = peak_rss_mb()
+    started = time.perf_counter()
+    if load_whisper_model(model_name) is None:
+        raise RuntimeError(f"Nie udało się załadować modelu '{model_name}'")
+    load_seconds = time.perf_counter() - started
+    rss_after_load = peak_rss_mb()
+
+    results = []
+    for fixture in fixtures:
+        timings = []
+        text = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            text, error = transcribe_audio_local(fixture["path"], model_name=model_name,
+                                                 language=fixture["language"], use_cache=False)
+            timings.append(time.perf_counter() - started)
+            if error:
+                raise RuntimeError(f"{fixture['name']}: {error}")
+        elapsed = min(timings)
+        results.append({
+            "fixture": fixture["name"],
+            "seconds": fixture["seconds"],
+            "elapsed_seconds": elapsed,
+            "rtf": elapsed / fixture["seconds"] if fixture["seconds"] else None,
+            "wer": word_error_rate(fixture["reference"], text) if fixture["reference"] is not None else None,
+            "text": text,
+        })
+
+    rtfs = [row["rtf"] for row in results if row["rtf"] is not None]
+    wers = [row["wer"] for row in results if row["wer"] is not None]
+    return {
+        "model": model_name,
+        "threads": threads,
+        "load_seconds": load_seconds,
+        "rss_before_load_mb": rss_before,
+        "rss_after_load_mb": rss_after_load,
+        "peak_rss_mb": peak_rss_mb(),
+        "mean_rtf": sum(rtfs) / len(rtfs) if rtfs else None,
+        "mean_wer": sum(wers) / len(wers) if wers else None,
+        "results": results,
+    }
+
+
+def machine_info() -> dict:
+    """Opis maszyny i wersji bibliotek - do porównywania wyników między komputerami i wydaniami."""
+    info = {
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+    }
+    for package in ("torch", "whisper", "numpy"):
+        try:
+            module = __import__(package)
+            info[package] = getattr(module, "__version__", "?")
+        except ImportError:
+            info[package] = None
+    return info
+
+
+def run_benchmark(models: list, threads_list: list, fixtures: list, repeat: int, allow_download: bool) -> dict:
+    results = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "machine": machine_info(),
+        "repeat": repeat,
+        "fixtures": [{key: fixture[key] for key in ("name", "seconds", "language")} |
+                     {"has_reference": fixture["reference"] is not None} for fixture in fixtures],
+        "runs": [],
+        "skipped": [],
+    }
+    context = multiprocessing.get_context("spawn")
+    for model_name in models:
+        if not allow_download and not model_is_cached(model_name):
+            print(f"Pomijam {model_name}: brak modelu w {whisper_cache_dir()} (użyj --allow-download)")
+            results["skipped"].append({"model": model_name, "reason": "brak modelu w pamięci podręcznej"})
+            continue
+        for threads in threads_list:
+            print(f"Pomiar: {model_name}, wątki: {threads}...", flush=True)
+            # Osobny proces dla każdego pomiaru: zimne ładowanie i niezależny szczytowy RSS
+            with ProcessPoolExecutor(max_workers=1, mp_context=context,
+                                     initializer=_init_worker, initargs=(threads,)) as executor:
+                try:
+                    run = executor.submit(measure_model, model_name, threads, fixtures, repeat).result()
+                except Exception as e:
+                    print(f"  błąd: {e}")
+                    results["skipped"].append({"model": model_name, "threads": threads, "reason": str(e)})
+                    continue
+            results["runs"].append(run)
+    return results
+
+
+def print_summary(results: dict) -> None:
+    print(f"{'model':<10}{'wątki':>6}{'ładowanie [s]':>15}{'RSS [MB]':>10}{'RTF':>8}{'WER':>8}")
+    for run in results["runs"]:
+        rtf = f"{run['mean_rtf']:.3f}" if run["mean_rtf"] is not None else "-"
+        wer = f"{run['mean_wer']:.3f}" if run["mean_wer"] is not None else "-"
+        print(f"{run['model']:<10}{run['threads']:>6}{run['load_seconds']:>15.2f}"
+              f"{run['peak_rss_mb']:>10.0f}{rtf:>8}{wer:>8}")
+    print("RTF < 1 - szybciej niż czas rzeczywisty. WER tylko dla nagrań z tekstem referencyjnym.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", nargs="+", default=DEFAULT_MODELS, help="Modele Whisper do porównania")
+    parser.add_argument("--threads", nargs="+", type=int, default=[os.cpu_count() or 1],
+                        help="Liczby wątków obliczeniowych (torch) do porównania")
+    parser.add_argument("--fixtures", help="Plik JSON z nagraniami i tekstem referencyjnym (domyślnie syntetyczne)")
+    parser.add_argument("--repeat", type=int, default=1, help="Powtórzenia transkrypcji (wynik: najszybsze)")
+    parser.add_argument("--allow-download", action="store_true", help="Pobieraj brakujące modele")
+    parser.add_argument("--json", help="Zapisz wyniki do pliku JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        fixtures = load_fixtures(args.fixtures) if args.fixtures else synthetic_fixtures(temp_dir)
+        results = run_benchmark(args.models, args.threads, fixtures, max(1, args.repeat), args.allow_download)
+
+    print_summary(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# X:\Aplikacje\dictaitor\benchmarks\bench_quantization.py
+"""
+Benchmark kwantyzacji int8: porównuje każdy model Whisper float32 z jego wariantem "-int8"
+(dynamiczna kwantyzacja warstw liniowych) pod względem szybkości (RTF), szczytowego
+zużycia pamięci (RSS) i WER.
+
+Pomiary wykonuje bench_models (osobny proces dla każdego wariantu). Wariant int8 przy
+pierwszym uruchomieniu jest kwantyzowany i zapisywany w config/quantized_models - czas
+ładowania z zapisanego pliku pokazuje drugi przebieg benchmarku.
+
+Użycie:
+    python benchmarks/bench_quantization.py --models tiny base small --threads 4 --json wyniki.json
+    python benchmarks/bench_quantization.py --fixtures nagrania/fixtures.json --models turbo
+"""
+import argparse
+import json
+import os
+import tempfile
+
+from bench_models import load_fixtures, run_benchmark, synthetic_fixtures
+
+from modules.local_stt import QUANTIZED_SUFFIX
+
+DEFAULT_MODELS = ["tiny", "base", "small", "medium", "turbo"]
+
+
+def compare_runs(results: dict) -> list:
+    """Zestawia pomiary float32 i int8 tego samego modelu przy tej samej liczbie wątków."""
+    runs = {(run["model"], run["threads"]): run for run in results["runs"]}
+    rows = []
+    for (model_name, threads), fp32 in runs.items():
+        int8 = runs.get((model_name + QUANTIZED_SUFFIX, threads))
+        if int8 is None:
+            continue
+        row = {"model": model_name, "threads": threads}
+        for key in ("load_seconds", "peak_rss_mb", "mean_rtf", "mean_wer"):
+            row[f"fp32_{key}"] = fp32[key]
+            row[f"int8_{key}"] = int8[key]
+        row["speedup"] = fp32["mean_rtf"] / int8["mean_rtf"] if fp32["mean_rtf"] and int8["mean_rtf"] else None
+        row["rss_ratio"] = int8["peak_rss_mb"] / fp32["peak_rss_mb"] if fp32["peak_rss_mb"] else None
+        rows.append(row)
+    return rows
+
+
+def print_comparison(rows: list) -> None:
+    print(f"{'model':<10}{'wątki':>6}{'RTF fp32':>10}{'RTF int8':>10}{'przysp.':>9}"
+          f"{'RSS fp32':>10}{'RSS int8':>10}{'WER fp32':>10}{'WER int8':>10}")
+
+    def fmt(value, spec):
+        return format(value, spec) if value is not None else "-"
+
+    for row in rows:
+        print(f"{row['model']:<10}{row['threads']:>6}{fmt(row['fp32_mean_rtf'], '.3f'):>10}"
+              f"{fmt(row['int8_mean_rtf'], '.3f'):>10}{fmt(row['speedup'], '.2f'):>8}x"
+              f"{row['fp32_peak_rss_mb']:>10.0f}{row['int8_peak_rss_mb']:>10.0f}"
+              f"{fmt(row['fp32_mean_wer'], '.3f'):>10}{fmt(row['int8_mean_wer'], '.3f'):>10}")
+    print("Przyspieszenie > 1 - int8 szybszy niż float32. WER tylko dla nagrań z tekstem referencyjnym.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", nargs="+", default=DEFAULT_MODELS, help="Modele Whisper (bez przyrostka -int8)")
+    parser.add_argument("--threads", nargs="+", type=int, default=[os.cpu_count() or 1],
+                        help="Liczby wątków obliczeniowych (torch) do porównania")
+    parser.add_argument("--fixtures", help="Plik JSON z nagraniami i tekstem referencyjnym (domyślnie syntetyczne)")
+    parser.add_argument("--repeat", type=int, default=1, help="Powtórzenia transkrypcji (wynik: najszybsze)")
+    parser.add_argument("--allow-download", action="store_true", help="Pobieraj brakujące modele")
+    parser.add_argument("--json", help="Zapisz wyniki do pliku JSON")
+    args = parser.parse_args()
+
+    models = [name for model_name in args.models for name in (model_name, model_name + QUANTIZED_SUFFIX)]
+    with tempfile.TemporaryDirectory() as temp_dir:
+        fixtures = load_fixtures(args.fixtures) if args.fixtures else synthetic_fixtures(temp_dir)
+        results = run_benchmark(models, args.threads, fixtures, max(1, args.repeat), args.allow_download)
+
+    results["comparison"] = compare_runs(results)
+    print_comparison(results["comparison"])
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+# X:\Aplikacje\dictaitor\benchmarks\bench_recorder.py
+"""
+Test obciążeniowy rejestratora bez mikrofonu: ArraySource odtwarza syntetyczne nagranie
+przez AudioRecorder (bufor w pamięci i opcjonalnie zapis WAV na bieżąco), a wątki czytelników
+w tym czasie pobierają z bufora ostatnie sekundy nagrania (jak wskaźnik poziomu czy napisy
+na żywo).
+
+Mierzy czas obsługi porcji w wątku źródła (p50/p99/maks.), opóźnienia porcji względem
+czasu rzeczywistego, czas odczytów czytelników, rozmiar bufora w pamięci i zgodność
+nagrania ze źródłem.
+--speed 0 odtwarza bez czekania - pokazuje maksymalną przepustowość rejestratora.
+
+Użycie:
+    python benchmarks/bench_recorder.py [--seconds 600] [--speed 20] [--readers 2] [--stream-to-disk] [--json wynik.json]
+"""
+import argparse
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from common import synthetic_speech
+
+from modules.audio_recorder import AudioRecorder
+from modules.audio_sources import ArraySource
+
+
+class TimedArraySource(ArraySource):
+    """ArraySource mierzące czas obsługi każdej porcji przez rejestrator."""
+
+    def start(self, on_chunk, on_stop=None):
+        self.handler_seconds = []
+
+        def timed_chunk(data):
+            started = time.perf_counter()
+            on_chunk(data)
+            self.handler_seconds.append(time.perf_counter() - started)
+
+        super().start(timed_chunk, on_stop)
+
+
+def reader_loop(recorder: AudioRecorder, window_seconds: float, interval: float,
+                stop_event: threading.Event, timings: list) -> None:
+    """Co `interval` s liczy poziom ostatnich `window_seconds` nagrania."""
+    while not stop_event.wait(interval):
+        started = time.perf_counter()
+        window = recorder.get_recent_pcm(window_seconds)
+        if len(window):
+            np.sqrt(np.mean(np.square(window, dtype=np.float32)))
+        timings.append(time.perf_counter() - started)
+
+
+def percentiles_us(values: list) -> dict:
+    if not values:
+        return {"p50": None, "p99": None, "max": None}
+    array = np.array(values) * 1e6
+    return {"p50": float(np.percentile(array, 50)), "p99": float(np.percentile(array, 99)),
+            "max": float(array.max())}
+
+
+def run_benchmark(seconds: float, speed: float, chunk_size: int, readers: int,
+                  window_seconds: float, stream_to_disk: bool) -> dict:
+    audio = synthetic_speech(seconds)
+    source = TimedArraySource(audio, chunk_size=chunk_size, speed=speed)
+    recorder = AudioRecorder(stream_to_disk=stream_to_disk, source=source)
+
+    stop_event = threading.Event()
+    reader_timings = [[] for _ in range(readers)]
+    threads = [threading.Thread(target=reader_loop, args=(recorder, window_seconds, 0.05, stop_event, timings))
+               for timings in reader_timings]
+
+    started = time.perf_counter()
+    if not recorder.start_recording():
+        raise RuntimeError("Nie udało się uruchomić rejestratora")
+    for thread in threads:
+        thread.start()
+    source.finished.wait()
+    elapsed = time.perf_counter() - started
+    stop_event.set()
+    for thread in threads:
+        thread.join()
+
+    stop_started = time.perf_counter()
+    path = recorder.stop_recording()
+    stop_seconds = time.perf_counter() - stop_started
+
+    # Przy zapisie na dysk początek długiego nagrania jest czytany z pliku WAV
+    convert_started = time.perf_counter()
+    recorded = recorder.get_audio_array()
+    convert_seconds = time.perf_counter() - convert_started
+    expected = source.audio.mean(axis=1, dtype=np.float32) / 32768.0
+    if path:
+        os.remove(path)
+
+    return {
+        "audio_seconds": seconds,
+        "speed": speed,
+        "chunk_size": chunk_size,
+        "readers": readers,
+        "stream_to_disk": stream_to_disk,
+        "elapsed_seconds": elapsed,
+        "realtime_factor": seconds / elapsed,
+        "chunks": len(source.handler_seconds),
+        "chunk_handler_us": percentiles_us(source.handler_seconds),
+        "max_chunk_lag_ms": source.max_lag * 1000,
+        "late_chunks": source.late_chunks,
+        "reader_reads": sum(len(timings) for timings in reader_timings),
+        "reader_read_us": percentiles_us([t for timings in reader_timings for t in timings]),
+        "stop_seconds": stop_seconds,
+        "get_audio_array_seconds": convert_seconds,
+        "buffer_mb": recorder.pcm_arena.nbytes / (1024 * 1024),
+        "matches_source": bool(len(recorded) == len(expected) and np.allclose(recorded, expected, atol=1e-6)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=600.0, help="Długość odtwarzanego nagrania")
+    parser.add_argument("--speed", type=float, default=20.0, help="Krotność czasu rzeczywistego (0 - bez czekania)")
+    parser.add_argument("--chunk-size", type=int, default=1024, help="Próbki w porcji (1024 = 64 ms przy 16 kHz)")
+    parser.add_argument("--readers", type=int, default=2, help="Wątki czytające bufor w trakcie nagrywania")
+    parser.add_argument("--window", type=float, default=10.0, help="Okno czytelników w sekundach")
+    parser.add_argument("--stream-to-disk", action="store_true", help="Zapisuj też plik WAV na bieżąco")
+    parser.add_argument("--json", help="Zapisz wyniki do pliku JSON")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.seconds, args.speed, args.chunk_size, args.readers, args.window,
+                            args.stream_to_disk)
+
+    def fmt(stats):
+        return " / ".join("-" if stats[key] is None else f"{stats[key]:.0f}" for key in ("p50", "p99", "max"))
+
+    print(f"Nagranie {results['audio_seconds']:.0f} s w {results['elapsed_seconds']:.2f} s "
+          f"({results['realtime_factor']:.0f}x czasu rzeczywistego), porcji: {results['chunks']}")
+    print(f"Obsługa porcji [µs] p50/p99/maks.: {fmt(results['chunk_handler_us'])}")
+    print(f"Opóźnienie porcji: maks. {results['max_chunk_lag_ms']:.1f} ms, spóźnionych: {results['late_chunks']}")
+    print(f"Odczyty czytelników: {results['reader_reads']}, [µs] p50/p99/maks.: {fmt(results['reader_read_us'])}")
+    print(f"Zatrzymanie: {results['stop_seconds'] * 1000:.1f} ms, get_audio_array: "
+          f"{results['get_audio_array_seconds'] * 1000:.1f} ms, zgodność ze źródłem: {results['matches_source']}")
+    print(f"Bufor w pamięci po nagraniu: {results['buffer_mb']:.1f} MB")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
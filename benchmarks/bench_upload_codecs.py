@@ -0,0 +1,130 @@
+# X:\Aplikacje\dictaitor\benchmarks\bench_upload_codecs.py
+"""
+Benchmark kodeków wysyłania w OpenAIWhisperClient.
+
+Uruchamia lokalny serwer udający endpoint transkrypcji (z symulowaną przepustowością
+łącza wysyłającego) i dla każdego kodeka mierzy liczbę wysłanych bajtów oraz czas
+całego żądania (kodowanie + wysyłanie + odpowiedź).
+
+Użycie:
+    python benchmarks/bench_upload_codecs.py [--audio plik.wav] [--uplink-mbps 10] [--json wynik.json]
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from common import synthetic_speech
+
+from modules.audio_io import encode_audio, encode_wav, load_audio, UPLOAD_CODECS, WHISPER_SAMPLE_RATE
+from modules.openai_whisper_client import OpenAIWhisperClient
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    """Odbiera formularz, symuluje czas wysyłania i odpowiada stałym tekstem."""
+
+    uplink_bytes_per_second = None
+    received_bytes = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        with _StandInHandler.lock:
+            _StandInHandler.received_bytes += length
+        if self.uplink_bytes_per_second:
+            time.sleep(length / self.uplink_bytes_per_second)
+        body = "transkrypcja".encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run_benchmark(audio_path: str, codecs, bitrate_kbps: int, uplink_mbps: float, repeat: int) -> dict:
+    _StandInHandler.uplink_bytes_per_second = uplink_mbps * 1e6 / 8 if uplink_mbps > 0 else None
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    audio = load_audio(audio_path)
+    results = {
+        "audio_seconds": len(audio) / WHISPER_SAMPLE_RATE,
+        "uplink_mbps": uplink_mbps,
+        "bitrate_kbps": bitrate_kbps,
+        "codecs": {}
+    }
+    try:
+        for codec in codecs:
+            client = OpenAIWhisperClient(api_key="benchmark")
+            client.API_URL = f"http://127.0.0.1:{server.server_address[1]}/v1/audio/transcriptions"
+            client.upload_codec = codec
+            client.upload_bitrate_kbps = bitrate_kbps
+
+            started = time.perf_counter()
+            _, extension = encode_audio(audio, WHISPER_SAMPLE_RATE, codec, bitrate_kbps)
+            encode_seconds = time.perf_counter() - started
+
+            round_trips = []
+            for _ in range(repeat):
+                _StandInHandler.received_bytes = 0
+                started = time.perf_counter()
+                _, error = client.transcribe_audio(audio_path)
+                round_trips.append(time.perf_counter() - started)
+                if error:
+                    raise RuntimeError(f"{codec}: {error}")
+
+            results["codecs"][codec] = {
+                "format": extension,
+                "bytes_sent": _StandInHandler.received_bytes,
+                "encode_seconds": encode_seconds,
+                "round_trip_seconds": min(round_trips),
+            }
+    finally:
+        server.shutdown()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--audio", help="Plik audio (domyślnie syntetyczne nagranie WAV)")
+    parser.add_argument("--seconds", type=float, default=120.0, help="Długość syntetycznego nagrania")
+    parser.add_argument("--codecs", nargs="+", default=list(UPLOAD_CODECS), choices=list(UPLOAD_CODECS))
+    parser.add_argument("--bitrate", type=int, default=32, help="Przepływność kodeków stratnych (kbps)")
+    parser.add_argument("--uplink-mbps", type=float, default=10.0, help="Symulowana przepustowość wysyłania (0 - bez limitu)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="Zapisz wyniki do pliku JSON")
+    args = parser.parse_args()
+
+    temp_path = None
+    audio_path = args.audio
+    if not audio_path:
+        handle, temp_path = tempfile.mkstemp(suffix=".wav")
+        with os.fdopen(handle, "wb") as f:
+            f.write(encode_wav(synthetic_speech(args.seconds)))
+        audio_path = temp_path
+
+    try:
+        results = run_benchmark(audio_path, args.codecs, args.bitrate, args.uplink_mbps, args.repeat)
+    finally:
+        if temp_path:
+            os.remove(temp_path)
+
+    print(f"Nagranie: {results['audio_seconds']:.1f} s, łącze: {args.uplink_mbps} Mb/s")
+    print(f"{'kodek':<8}{'format':<8}{'bajty':>12}{'kodowanie [s]':>16}{'żądanie [s]':>14}")
+    for codec, row in results["codecs"].items():
+        print(f"{codec:<8}{row['format']:<8}{row['bytes_sent']:>12}{row['encode_seconds']:>16.3f}{row['round_trip_seconds']:>14.3f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
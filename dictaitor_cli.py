@@ -0,0 +1,271 @@
+# X:\Aplikacje\dictaitor\dictaitor_cli.py
+"""
+Wsadowa transkrypcja plików audio z wiersza poleceń (bez interfejsu Tk).
+
+Przykłady:
+    python dictaitor_cli.py nagrania/ --model turbo --language pl --jobs 2
+    python dictaitor_cli.py "archiwum/**/*.mp3" --backend openai --jobs 4 --format jsonl
+
+Wyniki są zapisywane obok każdego pliku (<nazwa>.txt lub <nazwa>.jsonl). Pliki, dla których
+wynik już istnieje i jest nowszy od nagrania, są pomijane - przerwany przebieg można wznowić.
+"""
+import os
+import sys
+import glob
+import json
+import time
+import logging
+import argparse
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from typing import Optional, List, Dict, Any
+
+from modules.audio_io import get_audio_duration
+
+logger = logging.getLogger("DictAItorCLI")
+
+# Rozszerzenia plików wyszukiwanych w katalogach
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".ogg", ".flac", ".m4a", ".opus", ".webm", ".mp4", ".aac")
+OUTPUT_FORMATS = ("txt", "jsonl")
+
+
+def collect_audio_files(inputs: List[str], recursive: bool = False) -> List[str]:
+    """
+    Rozwija listę plików, katalogów i wzorców glob do posortowanej listy plików audio.
+
+    Args:
+        inputs: Ścieżki plików, katalogów lub wzorce glob (np. "nagrania/**/*.wav")
+        recursive: Czy przeszukiwać podkatalogi wskazanych katalogów
+
+    Returns:
+        List[str]: Bezwzględne ścieżki plików audio (bez powtórzeń)
+    """
+    found = []
+    for item in inputs:
+        if os.path.isdir(item):
+            pattern = os.path.join(item, "**", "*") if recursive else os.path.join(item, "*")
+            candidates = glob.glob(pattern, recursive=recursive)
+        elif os.path.isfile(item):
+            found.append(os.path.abspath(item))
+            continue
+        else:
+            candidates = glob.glob(item, recursive=True)
+            if not candidates:
+                logger.warning(f"Nie znaleziono plików dla: {item}")
+        found.extend(os.path.abspath(path) for path in candidates
+                     if os.path.isfile(path) and path.lower().endswith(AUDIO_EXTENSIONS))
+    return sorted(set(found))
+
+
+def output_path(audio_path: str, output_format: str) -> str:
+    """Ścieżka pliku wynikowego obok nagrania."""
+    return f"{os.path.splitext(audio_path)[0]}.{output_format}"
+
+
+def is_done(audio_path: str, output_format: str) -> bool:
+    """Czy dla pliku istnieje już wynik nowszy od nagrania."""
+    result_path = output_path(audio_path, output_format)
+    try:
+        return os.path.getmtime(result_path) >= os.path.getmtime(audio_path)
+    except OSError:
+        return False
+
+
+def write_result(record: Dict[str, Any], output_format: str) -> str:
+    """
+    Zapisuje wynik obok nagrania (atomowo, aby przerwany zapis nie oznaczał pliku jako gotowego).
+
+    Returns:
+        str: Ścieżka zapisanego pliku
+    """
+    result_path = output_path(record["file"], output_format)
+    temp_path = f"{result_path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        if output_format == "jsonl":
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        else:
+            f.write(record["text"] + "\n")
+    os.replace(temp_path, result_path)
+    return result_path
+
+
+def _init_local_worker(model_name: str, threads: int, slot_counter=None) -> None:
+    """Inicjalizuje proces roboczy lokalnej transkrypcji (wątki obliczeniowe, opcjonalnie przypięcie do rdzeni)."""
+    from modules.thread_tuning import apply_thread_settings
+    logging.basicConfig(level=logging.WARNING)
+    slot = None
+    if slot_counter is not None:
+        with slot_counter.get_lock():
+            slot = slot_counter.value
+            slot_counter.value += 1
+    apply_thread_settings(model_name, threads, slot)
+
+
+def transcribe_file_local(audio_path: str, model_name: str, language: Optional[str],
+                          vad_aggressiveness: int) -> Dict[str, Any]:
+    """Transkrybuje plik lokalnym modelem Whisper (model zostaje w pamięci procesu roboczego)."""
+    from modules.local_stt import transcribe_audio_local
+    started = time.monotonic()
+    text, error_msg = transcribe_audio_local(audio_path, model_name=model_name, language=language,
+                                             vad_aggressiveness=vad_aggressiveness)
+    return _build_record(audio_path, text, error_msg, "local", model_name, language, started)
+
+
+def transcribe_files_local_batch(audio_paths: List[str], model_name: str, language: Optional[str],
+                                 vad_aggressiveness: int) -> List[Dict[str, Any]]:
+    """Transkrybuje grupę krótkich plików jednym przebiegiem modelu (transcribe_batch_local)."""
+    from modules.local_stt import transcribe_batch_local
+    started = time.monotonic()
+    outcomes = transcribe_batch_local(audio_paths, model_name=model_name, language=language,
+                                      vad_aggressiveness=vad_aggressiveness, batch_size=len(audio_paths))
+    # Czas partii jest rozkładany równo na jej pliki
+    share = (time.monotonic() - started) / len(audio_paths)
+    records = []
+    for audio_path, (text, error_msg) in zip(audio_paths, outcomes):
+        record = _build_record(audio_path, text, error_msg, "local", model_name, language, started)
+        record["elapsed"] = round(share, 3)
+        records.append(record)
+    return records
+
+
+def transcribe_file_openai(client, audio_path: str, language: Optional[str]) -> Dict[str, Any]:
+    """Transkrybuje plik przez API OpenAI Whisper."""
+    started = time.monotonic()
+    text, error_msg = client.transcribe_audio(audio_path, language=language)
+    return _build_record(audio_path, text, error_msg, "openai", client.MODEL_NAME, language, started)
+
+
+def _build_record(audio_path: str, text: Optional[str], error_msg: Optional[str], backend: str,
+                  model_name: str, language: Optional[str], started: float) -> Dict[str, Any]:
+    return {
+        "file": audio_path,
+        "text": text.strip() if text else "",
+        "error": error_msg,
+        "backend": backend,
+        "model": model_name,
+        "language": language,
+        "duration": get_audio_duration(audio_path),
+        "elapsed": round(time.monotonic() - started, 3),
+    }
+
+
+def _load_openai_client(args: argparse.Namespace):
+    """Tworzy klienta OpenAI z kluczem z argumentu, zmiennej OPENAI_API_KEY lub konfiguracji aplikacji."""
+    from modules.openai_whisper_client import OpenAIWhisperClient
+    from modules.config_manager import load_openai_api_key
+
+    api_key = args.api_key or os.environ.get("OPENAI_API_KEY") or load_openai_api_key()
+    client = OpenAIWhisperClient(api_key=api_key)
+    client.vad_aggressiveness = args.vad
+    client.upload_codec = args.codec
+    if args.api_url:
+        client.API_URL = args.api_url
+    return client
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="DictAItor - wsadowa transkrypcja plików audio bez interfejsu graficznego."
+    )
+    parser.add_argument("inputs", nargs="+", help="Pliki, katalogi lub wzorce glob (np. \"nagrania/**/*.wav\")")
+    parser.add_argument("--backend", choices=("local", "openai"), default="local",
+                        help="Lokalny model Whisper lub API OpenAI (domyślnie: local)")
+    parser.add_argument("--model", default="turbo", help="Model Whisper dla transkrypcji lokalnej (domyślnie: turbo)")
+    parser.add_argument("--language", default=None, help="Kod języka, np. pl (domyślnie: wykrywanie automatyczne)")
+    parser.add_argument("--vad", type=int, choices=(0, 1, 2, 3), default=0,
+                        help="Poziom usuwania ciszy przed transkrypcją (0 - wyłączone)")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="Liczba plików przetwarzanych równolegle; lokalnie każdy proces trzyma własny model")
+    parser.add_argument("--threads", type=int, default=0,
+                        help="Wątki obliczeniowe na proces lokalny (0 - z kalibracji dictaitor_tune.py, "
+                             "najwyżej równa część rdzeni)")
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help="Lokalnie: liczba krótkich plików (do 30 s) transkrybowanych jednym przebiegiem modelu")
+    parser.add_argument("--pin-cpus", action="store_true",
+                        help="Przypnij każdy proces lokalny do osobnej grupy rdzeni")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="txt", dest="output_format",
+                        help="Format wyniku zapisywanego obok pliku (domyślnie: txt)")
+    parser.add_argument("--recursive", action="store_true", help="Przeszukuj podkatalogi wskazanych katalogów")
+    parser.add_argument("--overwrite", action="store_true", help="Transkrybuj ponownie pliki z istniejącym wynikiem")
+    parser.add_argument("--api-key", default=None, help="Klucz API OpenAI (domyślnie: OPENAI_API_KEY lub konfiguracja)")
+    parser.add_argument("--api-url", default=None, help="Adres API zgodnego z OpenAI (np. lokalny serwer)")
+    parser.add_argument("--codec", default="wav", help="Kompresja nagrań WAV przed wysłaniem (wav, flac, opus, mp3)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Szczegółowe logi")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    files = collect_audio_files(args.inputs, args.recursive)
+    pending = [path for path in files if args.overwrite or not is_done(path, args.output_format)]
+    skipped = len(files) - len(pending)
+    print(f"Znaleziono {len(files)} plików audio, do transkrypcji: {len(pending)}, pominięto (gotowe): {skipped}")
+    if not pending:
+        return 0
+
+    jobs = max(1, args.jobs)
+    if args.backend == "openai":
+        client = _load_openai_client(args)
+        executor = ThreadPoolExecutor(max_workers=jobs)
+        groups = [[path] for path in pending]
+        submit = lambda paths: executor.submit(transcribe_file_openai, client, paths[0], args.language)
+    else:
+        from modules.thread_tuning import resolve_threads
+        threads = resolve_threads(args.model, jobs, args.threads)
+        context = multiprocessing.get_context("spawn")
+        # Osobne procesy: model Whisper nie jest bezpieczny przy równoległym użyciu z wielu wątków
+        executor = ProcessPoolExecutor(max_workers=jobs, mp_context=context, initializer=_init_local_worker,
+                                       initargs=(args.model, threads, context.Value("i", 0) if args.pin_cpus else None))
+        if args.batch_size > 1:
+            groups = [pending[start:start + args.batch_size] for start in range(0, len(pending), args.batch_size)]
+            submit = lambda paths: executor.submit(transcribe_files_local_batch, paths, args.model, args.language, args.vad)
+        else:
+            groups = [[path] for path in pending]
+            submit = lambda paths: executor.submit(transcribe_file_local, paths[0], args.model, args.language, args.vad)
+
+    started = time.monotonic()
+    audio_seconds = 0.0
+    done = failed = 0
+    try:
+        futures = {submit(paths): paths for paths in groups}
+        for future in as_completed(futures):
+            paths = futures[future]
+            try:
+                result = future.result()
+                records = result if isinstance(result, list) else [result]
+            except Exception as e:
+                records = [{"file": path, "error": str(e)} for path in paths]
+            for record in records:
+                path = record["file"]
+                if record.get("error"):
+                    failed += 1
+                    print(f"[{done + failed}/{len(pending)}] BŁĄD {path}: {record['error']}", file=sys.stderr)
+                    continue
+
+                done += 1
+                write_result(record, args.output_format)
+                duration = record.get("duration") or 0.0
+                audio_seconds += duration
+                speed = f"{duration / record['elapsed']:.1f}x" if record["elapsed"] > 0 and duration else "-"
+                print(f"[{done + failed}/{len(pending)}] {path}: {duration:.1f} s audio w {record['elapsed']:.1f} s ({speed})")
+    except KeyboardInterrupt:
+        print("Przerwano - zakończone pliki są zapisane, ponowne uruchomienie wznowi pracę.", file=sys.stderr)
+        executor.shutdown(wait=False, cancel_futures=True)
+        return 130
+    executor.shutdown(wait=True)
+
+    wall_seconds = time.monotonic() - started
+    throughput = audio_seconds / wall_seconds if wall_seconds > 0 else 0.0
+    print(f"Gotowe: {done}, błędy: {failed}, pominięte: {skipped}. "
+          f"Audio: {audio_seconds / 3600:.2f} h w {wall_seconds / 3600:.2f} h "
+          f"- przepustowość {throughput:.1f} h audio / h ({throughput:.1f}x czasu rzeczywistego)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
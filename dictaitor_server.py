@@ -0,0 +1,57 @@
+# X:\Aplikacje\dictaitor\dictaitor_server.py
+"""
+Lokalny serwer transkrypcji zgodny z endpointem /v1/audio/transcriptions API OpenAI.
+
+Przykład:
+    python dictaitor_server.py --model turbo --port 8765
+
+Klient OpenAIWhisperClient (lub dictaitor_cli.py --backend openai --api-url ...) może korzystać
+z serwera po ustawieniu API_URL na http://127.0.0.1:8765/v1/audio/transcriptions.
+Liczniki serwera (m.in. głębokość kolejki) są dostępne pod /metrics.
+"""
+import sys
+import logging
+import argparse
+from typing import Optional, List
+
+from modules.stt_server import (run_server, DEFAULT_HOST, DEFAULT_PORT, MAX_QUEUE_DEPTH,
+                                MAX_BATCH_SIZE, BATCH_WINDOW_SECONDS)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="DictAItor - lokalny serwer transkrypcji zgodny z API OpenAI.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"Adres nasłuchiwania (domyślnie: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port (domyślnie: {DEFAULT_PORT})")
+    parser.add_argument("--model", default="turbo", help="Domyślny model Whisper (także dla model=whisper-1)")
+    parser.add_argument("--vad", type=int, choices=(0, 1, 2, 3), default=0,
+                        help="Poziom usuwania ciszy przed transkrypcją (0 - wyłączone)")
+    parser.add_argument("--max-queue", type=int, default=MAX_QUEUE_DEPTH,
+                        help="Maksymalna liczba oczekujących żądań; kolejne dostają 429")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH_SIZE,
+                        help="Maksymalna liczba żądań w jednej partii")
+    parser.add_argument("--batch-window-ms", type=float, default=BATCH_WINDOW_SECONDS * 1000,
+                        help="Jak długo zbierać żądania do partii (ms)")
+    parser.add_argument("--api-key", default=None, help="Wymagany token Bearer (domyślnie: brak uwierzytelniania)")
+    parser.add_argument("--no-warm-up", action="store_true", help="Nie ładuj modelu przed pierwszym żądaniem")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    run_server(
+        host=args.host,
+        port=args.port,
+        default_model=args.model,
+        api_key=args.api_key,
+        warm_up=not args.no_warm_up,
+        vad_aggressiveness=args.vad,
+        max_queue_depth=args.max_queue,
+        max_batch_size=args.max_batch,
+        batch_window=args.batch_window_ms / 1000
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
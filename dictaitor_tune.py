@@ -0,0 +1,59 @@
+# X:\Aplikacje\dictaitor\dictaitor_tune.py
+"""
+Jednorazowa kalibracja liczby wątków lokalnej transkrypcji na bieżącym komputerze.
+
+Dla każdego modelu mierzy współczynnik czasu rzeczywistego (RTF) przy różnych liczbach
+wątków obliczeniowych i wątków inter-op torch, a najlepsze ustawienia zapisuje
+w config/thread_tuning.json. Aplikacja, CLI i serwer stosują je potem automatycznie.
+
+Przykłady:
+    python dictaitor_tune.py --models base turbo
+    python dictaitor_tune.py --models small --threads 4 8 16 32 --interop 1 2 4 --audio nagranie.wav
+"""
+import sys
+import logging
+import argparse
+from typing import Optional, List
+
+from modules.thread_tuning import (calibrate, calibration_audio, default_thread_candidates,
+                                   CALIBRATION_SECONDS, DEFAULT_INTEROP_CHOICES, THREAD_TUNING_PATH)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="DictAItor - kalibracja liczby wątków lokalnej transkrypcji.")
+    parser.add_argument("--models", nargs="+", default=["turbo"], help="Modele Whisper do kalibracji (domyślnie: turbo)")
+    parser.add_argument("--threads", nargs="+", type=int, default=None,
+                        help=f"Liczby wątków do sprawdzenia (domyślnie: {' '.join(map(str, default_thread_candidates()))})")
+    parser.add_argument("--interop", nargs="+", type=int, default=DEFAULT_INTEROP_CHOICES,
+                        help="Liczby wątków inter-op torch do sprawdzenia")
+    parser.add_argument("--audio", default=None,
+                        help=f"Nagranie kalibracyjne (domyślnie: syntetyczne, {CALIBRATION_SECONDS:.0f} s)")
+    parser.add_argument("--repeat", type=int, default=1, help="Powtórzenia każdego pomiaru (wynik: najszybszy)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    if args.audio:
+        from modules.audio_io import load_audio
+        audio = load_audio(args.audio)
+    else:
+        audio = calibration_audio()
+
+    results = calibrate(args.models, args.threads, args.interop, audio, args.repeat,
+                        progress=lambda message: print(message, flush=True))
+    if not results["measurements"]:
+        print("Nie zmierzono żadnego modelu.", file=sys.stderr)
+        return 1
+
+    print(f"{'model':<14}{'wątki':>7}{'inter-op':>10}{'RTF':>8}")
+    for model_name, settings in results["models"].items():
+        print(f"{model_name:<14}{settings['threads']:>7}{settings['interop_threads']:>10}{settings['rtf']:>8.3f}")
+    print(f"Zapisano w {THREAD_TUNING_PATH}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
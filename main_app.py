@@ -1,16 +1,31 @@
 # X:\Aplikacje\dictaitor\main_app.py
+import sys
+import time
+
+# Pomiar czasu uruchamiania (--startup-profile) zaczyna się przed pozostałymi importami
+from modules.startup_profile import StartupProfiler, STARTUP_BUDGET_SECONDS
+startup_profiler = StartupProfiler()
+
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
-import threading
 import os
+import threading
 import logging
+import importlib.util
 from functools import partial
 from typing import Optional, Tuple, List, Dict, Any, Callable
+startup_profiler.mark("tkinter i biblioteka standardowa")
 
 # Importy z naszych modułów
-from modules.config_manager import save_config, load_config
+from modules.config_manager import get_config_store
 from modules.audio_recorder import AudioRecorder
+from modules.transcription_cache import get_default_cache
+from modules.jobs import JobExecutor, Job, JobCancelled, JOB_PENDING
+from modules.metrics import JobTimer, current_timer, set_metrics_enabled, get_metrics_recorder
+from modules.thread_tuning import set_affinity_enabled
+from modules.language_id import set_language_learning_enabled
 # Usunięto import OpenRouterClient
+startup_profiler.mark("config_manager, audio_recorder (numpy)")
 
 # Konfiguracja logowania z lepszą organizacją
 logging.basicConfig(
@@ -20,54 +35,45 @@ logging.basicConfig(
 )
 logger = logging.getLogger("DictAItorApp")
 
-# Sprawdźmy dostępność biblioteki OpenAI Whisper
+# Sprawdźmy dostępność lokalnej transkrypcji Whisper.
+# Biblioteka whisper (i torch) nie jest tu importowana - local_stt korzysta z wyników
+# zapisanych w config/capabilities.json, a pełne sprawdzenie odbywa się w tle po starcie.
 try:
-    import whisper
-    WHISPER_AVAILABLE = True
-    # Próbuj zaimportować moduł local_stt
-    try:
-        from modules.local_stt import transcribe_audio_local, AVAILABLE_WHISPER_MODELS, get_available_models
-        LOCAL_STT_MODULE_AVAILABLE = True
-        
-        # Pobierz faktycznie dostępne modele z Whisper
-        actual_models = get_available_models()
-        if actual_models:
-            AVAILABLE_WHISPER_MODELS = actual_models
-            logger.info(f"Pobrano dostępne modele Whisper: {', '.join(AVAILABLE_WHISPER_MODELS)}")
-    except ImportError as e:
-        # Jeśli moduł local_stt nie jest dostępny, ale whisper tak, to definiujemy podstawową listę modeli
-        LOCAL_STT_MODULE_AVAILABLE = False
-        AVAILABLE_WHISPER_MODELS = ["tiny", "base", "small", "medium", "large"]
-        logger.warning(f"Nie można zaimportować modułu local_stt: {str(e)}")
-        
-        # Sprawdź czy model turbo jest dostępny
-        try:
-            if "turbo" in whisper.available_models():
-                AVAILABLE_WHISPER_MODELS.append("turbo")
-                logger.info("Model 'turbo' jest dostępny w Whisper!")
-        except Exception as e:
-            logger.warning(f"Nie można sprawdzić dostępności modelu 'turbo': {str(e)}")
+    from modules.local_stt import WHISPER_INSTALLED, AVAILABLE_WHISPER_MODELS, get_available_models
+    LOCAL_STT_MODULE_AVAILABLE = True
+    WHISPER_AVAILABLE = WHISPER_INSTALLED
+    
+    actual_models = get_available_models()
+    if actual_models:
+        AVAILABLE_WHISPER_MODELS = actual_models
+        logger.info(f"Pobrano dostępne modele Whisper: {', '.join(AVAILABLE_WHISPER_MODELS)}")
 except ImportError as e:
-    WHISPER_AVAILABLE = False
+    # Jeśli moduł local_stt nie jest dostępny, korzystamy z podstawowej listy modeli
     LOCAL_STT_MODULE_AVAILABLE = False
+    WHISPER_AVAILABLE = importlib.util.find_spec("whisper") is not None
     AVAILABLE_WHISPER_MODELS = ["tiny", "base", "small", "medium", "large", "turbo"]
-    logger.warning(f"Nie można zaimportować biblioteki Whisper: {str(e)}")
+    logger.warning(f"Nie można zaimportować modułu local_stt: {str(e)}")
+startup_profiler.mark("local_stt (bez whisper/torch)")
 
-# Sprawdźmy dostępność klienta OpenAI API
+# Sprawdźmy dostępność klienta OpenAI API (requests jest importowany dopiero przy wysyłaniu)
 try:
     from modules.openai_whisper_client import OpenAIWhisperClient
-    OPENAI_AVAILABLE = True
+    from modules.audio_io import UPLOAD_CODECS
+    OPENAI_AVAILABLE = importlib.util.find_spec("requests") is not None
 except ImportError:
     OPENAI_AVAILABLE = False
+startup_profiler.mark("openai_whisper_client (bez requests)")
 
 # Użyjemy Pillow do obsługi obrazów PNG (dla logo)
 from PIL import Image, ImageTk
+startup_profiler.mark("Pillow")
 
 # Stałe aplikacji wydzielone jako globalne zmienne dla łatwiejszej konfiguracji
 APP_NAME = "DictAItor"
 APP_VERSION = "0.3.0"  # Zaktualizowano wersję
 WINDOW_WIDTH = 700
 WINDOW_HEIGHT = 750  # Powiększono okno dla dodatkowych kontrolek
+CLOSE_POLL_MS = 100  # Co ile sprawdzać przy zamykaniu, czy zadania w tle się zakończyły
 
 # Ścieżki
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -82,6 +88,32 @@ OPENAI_KEY_CONFIG = 'openai_api_key'
 PREFERRED_MODE_CONFIG = 'preferred_mode'
 PREFERRED_MODEL_CONFIG = 'preferred_model'
 PREFERRED_LANGUAGE_CONFIG = 'preferred_language'
+SAVE_RECORDINGS_CONFIG = 'save_recordings'
+LIVE_CAPTIONS_CONFIG = 'live_captions'
+VAD_AGGRESSIVENESS_CONFIG = 'vad_aggressiveness'
+PARALLEL_WORKERS_CONFIG = 'parallel_workers'  # Procesy dla długich nagrań (każdy trzyma własny model)
+THREADS_PER_WORKER_CONFIG = 'threads_per_worker'  # 0 - rdzenie dzielone równo między procesy
+OPENAI_PARALLEL_UPLOADS_CONFIG = 'openai_parallel_uploads'
+OPENAI_SEGMENT_SECONDS_CONFIG = 'openai_segment_seconds'
+OPENAI_UPLOAD_CODEC_CONFIG = 'openai_upload_codec'
+OPENAI_UPLOAD_BITRATE_CONFIG = 'openai_upload_bitrate_kbps'
+MODEL_MEMORY_BUDGET_CONFIG = 'model_memory_budget_mb'  # Pamięć na jednocześnie załadowane modele Whisper
+MODEL_IDLE_TIMEOUT_CONFIG = 'model_idle_timeout_minutes'  # 0 - nie zwalniaj bezczynnych modeli
+TRANSCRIPTION_CACHE_CONFIG = 'transcription_cache'  # Pamięć podręczna wyników (config/transcription_cache.sqlite3)
+TRANSCRIPTION_CACHE_MAX_ENTRIES_CONFIG = 'transcription_cache_max_entries'
+TRANSCRIPTION_CACHE_MAX_AGE_DAYS_CONFIG = 'transcription_cache_max_age_days'
+METRICS_CONFIG = 'metrics'  # Czasy etapów każdej transkrypcji w config/metrics.jsonl
+METRICS_PORT_CONFIG = 'metrics_port'  # Endpoint Prometheus http://127.0.0.1:<port>/metrics (0 - wyłączony)
+CPU_AFFINITY_CONFIG = 'cpu_affinity'  # Przypinanie procesów transkrypcji równoległej do osobnych grup rdzeni
+LEARN_LANGUAGE_CONFIG = 'learn_language'  # Tryb automatyczny: język nauczony z historii zamiast detekcji
+
+# Poziomy usuwania ciszy (VAD) przed transkrypcją
+VAD_OPTIONS = [
+    ("Wyłączone", 0),
+    ("Łagodne", 1),
+    ("Średnie", 2),
+    ("Agresywne", 3)
+]
 
 # Upewnij się, że niezbędne katalogi istnieją
 for directory in [ASSETS_DIR, CONFIG_DIR, RECORDINGS_DIR]:
@@ -108,18 +140,50 @@ class DictAItorApp:
         # Ustawienie minimalnego rozmiaru okna
         self.root.minsize(WINDOW_WIDTH, WINDOW_HEIGHT)
         
-        # Wczytywanie konfiguracji
-        self.config = load_config()
+        # Konfiguracja trzymana w pamięci (zapis na dysk odroczony i atomowy)
+        self.config = get_config_store()
         
         # Inicjalizacja modułów
         self.api_key_value = self.config.get(OPENROUTER_KEY_CONFIG, '')
         self.openai_key_value = self.config.get(OPENAI_KEY_CONFIG, '')
-        self.recorder = AudioRecorder()
+        self.save_recordings = tk.BooleanVar(value=self.config.get(SAVE_RECORDINGS_CONFIG, True))
+        self.recorder = AudioRecorder(stream_to_disk=self.save_recordings.get())
+        self.recorder.on_source_stopped = lambda error: self._update_gui(
+            partial(self._on_recording_interrupted, error), timed=False)
+        self.live_captions = tk.BooleanVar(value=self.config.get(LIVE_CAPTIONS_CONFIG, False))
+        self.live_transcriber = None
+        if LOCAL_STT_MODULE_AVAILABLE:
+            from modules.local_stt import model_pool
+            model_pool.memory_budget_mb = self.config.get(MODEL_MEMORY_BUDGET_CONFIG, model_pool.memory_budget_mb)
+            model_pool.idle_timeout = self.config.get(
+                MODEL_IDLE_TIMEOUT_CONFIG, model_pool.idle_timeout / 60) * 60
+        set_metrics_enabled(self.config.get(METRICS_CONFIG, True))
+        set_affinity_enabled(self.config.get(CPU_AFFINITY_CONFIG, False))
+        set_language_learning_enabled(self.config.get(LEARN_LANGUAGE_CONFIG, False))
+        self.use_transcription_cache = self.config.get(TRANSCRIPTION_CACHE_CONFIG, True)
+        if self.use_transcription_cache:
+            transcription_cache = get_default_cache()
+            if transcription_cache is not None:
+                transcription_cache.max_entries = self.config.get(
+                    TRANSCRIPTION_CACHE_MAX_ENTRIES_CONFIG, transcription_cache.max_entries)
+                transcription_cache.max_age_days = self.config.get(
+                    TRANSCRIPTION_CACHE_MAX_AGE_DAYS_CONFIG, transcription_cache.max_age_days)
+                logger.info(f"Pamięć podręczna transkrypcji: {transcription_cache.stats()}")
         
         # Inicjalizacja klienta OpenAI Whisper
         if OPENAI_AVAILABLE:
             self.openai_client = OpenAIWhisperClient(api_key=self.openai_key_value)
             self.openai_client.debug_mode = True  # Włącz tryb debugowania
+            self.openai_client.vad_aggressiveness = self.config.get(VAD_AGGRESSIVENESS_CONFIG, 0)
+            self.openai_client.max_parallel_uploads = self.config.get(
+                OPENAI_PARALLEL_UPLOADS_CONFIG, self.openai_client.max_parallel_uploads)
+            self.openai_client.max_segment_seconds = self.config.get(
+                OPENAI_SEGMENT_SECONDS_CONFIG, self.openai_client.max_segment_seconds)
+            self.openai_client.upload_codec = self.config.get(
+                OPENAI_UPLOAD_CODEC_CONFIG, self.openai_client.upload_codec)
+            self.openai_client.upload_bitrate_kbps = self.config.get(
+                OPENAI_UPLOAD_BITRATE_CONFIG, self.openai_client.upload_bitrate_kbps)
+            self.openai_client.use_cache = self.use_transcription_cache
         
         # Zmienne stanu
         self.is_recording_app_state = False
@@ -156,6 +220,18 @@ class DictAItorApp:
                 self.transcription_mode = tk.StringVar(value="local")
                 
         self.last_recorded_file = None
+        # Czy ostatnie nagranie z mikrofonu jest dostępne w buforze rejestratora
+        self.last_recording_in_memory = False
+        # Zadanie ładowania modelu w tle (najwyżej jedno ładowanie naraz) i ładowany model
+        self._warmup_job: Optional[Job] = None
+        self._warmup_model: Optional[str] = None
+        self._warmup_lock = threading.Lock()
+        # Zadania w tle (sprawdzanie możliwości, ładowanie modelu) startują po wyświetleniu okna
+        self._background_tasks_started = False
+
+        # Zadania w tle (transkrypcja, ładowanie modeli) - ograniczona pula zamiast osobnych wątków
+        self.jobs = JobExecutor(on_change=lambda job: self._update_gui(self._refresh_job_list, timed=False))
+        self._closing = False
 
         # Cache dla komponentów GUI
         self._widgets = {}
@@ -173,6 +249,52 @@ class DictAItorApp:
         
         # Pokaż informacje o dostępności usług
         self._show_service_status()
+        
+        # Zamknięcie okna kończy nagrywanie i zadania zamiast przerywać je w połowie
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
+
+    def start_background_tasks(self) -> None:
+        """
+        Uruchamia zadania odłożone na po wyświetleniu okna: sprawdzenie dostępności
+        Whisper (jeśli brak aktualnych wyników w config/capabilities.json), ładowanie
+        wybranego modelu i import biblioteki requests.
+        """
+        self._background_tasks_started = True
+        
+        if LOCAL_STT_MODULE_AVAILABLE:
+            from modules.local_stt import capabilities_cached, refresh_capabilities
+            if not capabilities_cached():
+                def probe_job(job: Job):
+                    models = refresh_capabilities()
+                    self._update_gui(lambda: self._apply_capabilities(models))
+                self._submit_job("Sprawdzanie Whisper", probe_job, key="capabilities")
+        
+        if self.transcription_mode.get() == "local":
+            self._warm_up_selected_model()
+        
+        metrics_port = self.config.get(METRICS_PORT_CONFIG, 0)
+        metrics_recorder = get_metrics_recorder()
+        if metrics_port and metrics_recorder is not None:
+            from modules.metrics import start_metrics_server
+            start_metrics_server(metrics_recorder, port=metrics_port)
+        
+        if OPENAI_AVAILABLE:
+            def preload_requests(job: Job):
+                import requests
+            self._submit_job("Import requests", preload_requests, key="preload_requests")
+
+    def _apply_capabilities(self, models: List[str]) -> None:
+        """Aktualizuje listę modeli i dostępność Whisper po sprawdzeniu w tle."""
+        global WHISPER_AVAILABLE, AVAILABLE_WHISPER_MODELS
+        from modules import local_stt
+        
+        WHISPER_AVAILABLE = local_stt.WHISPER_INSTALLED
+        if models and models != AVAILABLE_WHISPER_MODELS:
+            AVAILABLE_WHISPER_MODELS = models
+            self.whisper_model_combobox.config(values=AVAILABLE_WHISPER_MODELS)
+            logger.info(f"Zaktualizowano listę modeli Whisper: {', '.join(AVAILABLE_WHISPER_MODELS)}")
+        if not WHISPER_AVAILABLE:
+            self.model_status_label.config(text="🔴 Whisper niedostępny", foreground="#f44336")
 
     def _show_service_status(self):
         """Wyświetla informacje o dostępności usług transkrypcji."""
@@ -242,6 +364,11 @@ class DictAItorApp:
                  background=[('active', bg_color), ('selected', bg_color)],
                  foreground=[('active', fg_color), ('selected', fg_color)])
         
+        style.configure('TCheckbutton', background=bg_color, foreground=fg_color, padding=2)
+        style.map('TCheckbutton', 
+                 background=[('active', bg_color), ('selected', bg_color)],
+                 foreground=[('active', fg_color), ('selected', fg_color)])
+        
         style.configure('TCombobox', 
                       fieldbackground=bg_color, 
                       background=accent_color, 
@@ -261,6 +388,11 @@ class DictAItorApp:
         style.configure('TLabelframe', background=bg_color, foreground=fg_color)
         style.configure('TLabelframe.Label', background=bg_color, foreground=fg_color)
 
+        # Lista zadań w tle
+        style.configure('Treeview', background=bg_color, fieldbackground=bg_color, foreground=fg_color)
+        style.configure('Treeview.Heading', background=accent_color, foreground=fg_color)
+        style.map('Treeview', background=[('selected', selected_bg)])
+
         # Dostosowanie głównego okna
         self.root.configure(background=bg_color)
 
@@ -286,6 +418,7 @@ class DictAItorApp:
         self._create_action_section(main_frame)
         self._create_file_selection_section(main_frame)
         self._create_transcription_section(main_frame)
+        self._create_jobs_section(main_frame)
         
         # Aktualizacja trybów i widoczności komponentów - teraz po utworzeniu wszystkich widgetów
         self.root.after(100, self._update_transcription_mode)
@@ -361,6 +494,18 @@ class DictAItorApp:
         save_key_button = ttk.Button(api_frame, text="🔑 Zapisz Klucz", command=self.save_openai_key_action)
         save_key_button.grid(row=0, column=2, padx=5, pady=5)
         
+        ttk.Label(api_frame, text="Kompresja:").grid(row=1, column=0, padx=5, pady=5, sticky="w")
+        
+        self.upload_codec_combobox = ttk.Combobox(
+            api_frame,
+            values=list(UPLOAD_CODECS),
+            state="readonly",
+            width=10
+        )
+        self.upload_codec_combobox.grid(row=1, column=1, padx=5, pady=5, sticky="w")
+        self.upload_codec_combobox.set(self.openai_client.upload_codec)
+        self.upload_codec_combobox.bind("<<ComboboxSelected>>", self._on_upload_codec_selected)
+        
         api_frame.columnconfigure(1, weight=1)
     
     def _create_transcription_mode_section(self, parent: ttk.Frame) -> None:
@@ -431,6 +576,11 @@ class DictAItorApp:
             width=20
         )
         self.whisper_model_combobox.pack(side=tk.LEFT, padx=(0, 10))
+        self.whisper_model_combobox.bind("<<ComboboxSelected>>", self._on_whisper_model_selected)
+        
+        # Wskaźnik gotowości modelu (ładowanego w tle)
+        self.model_status_label = ttk.Label(self.whisper_models_container, text="")
+        self.model_status_label.pack(side=tk.LEFT, padx=(0, 10))
         
         # Ustawienie wybranego modelu Whisper w comboboxie
         if self.selected_whisper_model.get() in AVAILABLE_WHISPER_MODELS:
@@ -502,6 +652,23 @@ class DictAItorApp:
             self.language_combobox.current(0)
         
         self.language_combobox.bind("<<ComboboxSelected>>", self._on_language_selected)
+        
+        # Usuwanie ciszy przed transkrypcją
+        ttk.Label(self.language_options_container, text="Usuwanie ciszy:").pack(side=tk.LEFT, padx=(15, 5))
+        
+        self._vad_levels = dict(VAD_OPTIONS)
+        self.vad_combobox = ttk.Combobox(
+            self.language_options_container,
+            values=[option[0] for option in VAD_OPTIONS],
+            state="readonly",
+            width=12
+        )
+        self.vad_combobox.pack(side=tk.LEFT)
+        
+        vad_level = self.config.get(VAD_AGGRESSIVENESS_CONFIG, 0)
+        vad_index = next((i for i, option in enumerate(VAD_OPTIONS) if option[1] == vad_level), 0)
+        self.vad_combobox.current(vad_index)
+        self.vad_combobox.bind("<<ComboboxSelected>>", self._on_vad_selected)
 
     def _create_action_section(self, parent: ttk.Frame) -> None:
         """
@@ -529,6 +696,23 @@ class DictAItorApp:
         )
         self.transcribe_button.pack(side=tk.LEFT, padx=5, pady=5)
         
+        save_recordings_check = ttk.Checkbutton(
+            action_frame,
+            text="💾 Zapisuj nagrania",
+            variable=self.save_recordings,
+            command=self._on_save_recordings_toggled
+        )
+        save_recordings_check.pack(side=tk.LEFT, padx=5, pady=5)
+        
+        live_captions_check = ttk.Checkbutton(
+            action_frame,
+            text="⚡ Na żywo",
+            variable=self.live_captions,
+            command=lambda: self._save_settings({LIVE_CAPTIONS_CONFIG: self.live_captions.get()}),
+            state=tk.NORMAL if LOCAL_STT_MODULE_AVAILABLE else tk.DISABLED
+        )
+        live_captions_check.pack(side=tk.LEFT, padx=5, pady=5)
+        
         self.status_label = ttk.Label(action_frame, text="Status: Gotowy")
         self.status_label.pack(side=tk.LEFT, padx=10, pady=5, fill=tk.X, expand=True)
 
@@ -576,12 +760,15 @@ class DictAItorApp:
         
         if file_path:
             self.last_recorded_file = file_path
+            self.last_recording_in_memory = False
             self.file_path_var.set(file_path)
             self.file_path_label.config(
                 text=f"Wybrany plik: {os.path.basename(file_path)}",
                 foreground="white"  # Zmieniono kolor na biały dla ciemnego motywu
             )
-            self.transcribe_button.config(state=tk.NORMAL)
+            # W trakcie nagrywania lub transkrypcji przycisk pozostaje zablokowany - odblokuje go ich zakończenie
+            if not self.is_recording_app_state and not self.jobs.has_active("transcription"):
+                self.transcribe_button.config(state=tk.NORMAL)
             self._update_status(f"Wybrano plik: {os.path.basename(file_path)}")
             logger.info(f"Wybrano plik audio: {file_path}")
 
@@ -620,8 +807,66 @@ class DictAItorApp:
             insertbackground="#ffffff"  # Biały kursor
         )
         self.transcription_text.pack(fill=tk.BOTH, expand=True)
+        # Niezatwierdzony (tymczasowy) tekst napisów na żywo
+        self.transcription_text.tag_configure("unstable", foreground="#909090", font=("Arial", 10, "italic"))
         self.transcription_text.config(state=tk.DISABLED)  # Domyślnie tylko do odczytu
 
+    def _create_jobs_section(self, parent: ttk.Frame) -> None:
+        """
+        Tworzy sekcję listy zadań w tle z możliwością anulowania.
+        
+        Args:
+            parent: Widget rodzica
+        """
+        jobs_frame = ttk.LabelFrame(parent, text="Zadania", padding="10")
+        jobs_frame.pack(fill=tk.X, pady=(10, 0))
+        
+        self.jobs_tree = ttk.Treeview(
+            jobs_frame,
+            columns=("state", "progress", "time"),
+            height=3,
+            selectmode="browse"
+        )
+        self.jobs_tree.heading("#0", text="Zadanie")
+        self.jobs_tree.heading("state", text="Stan")
+        self.jobs_tree.heading("progress", text="Postęp")
+        self.jobs_tree.heading("time", text="Czas")
+        self.jobs_tree.column("#0", width=220)
+        self.jobs_tree.column("state", width=160)
+        self.jobs_tree.column("progress", width=70, anchor=tk.E)
+        self.jobs_tree.column("time", width=70, anchor=tk.E)
+        self.jobs_tree.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        
+        self.cancel_job_button = ttk.Button(jobs_frame, text="✖ Anuluj", command=self.cancel_selected_job)
+        self.cancel_job_button.pack(side=tk.LEFT, padx=(10, 0), anchor=tk.N)
+
+    def _refresh_job_list(self) -> None:
+        """Odświeża listę zadań (wywoływane w głównym wątku po każdej zmianie zadania)."""
+        if self._closing:
+            return
+        selected = self.jobs_tree.selection()
+        self.jobs_tree.delete(*self.jobs_tree.get_children())
+        for job in reversed(self.jobs.jobs()):
+            state = f"{job.state}: {job.message}" if job.message and not job.finished else job.state
+            seconds = job.run_seconds if job.state != JOB_PENDING else job.wait_seconds
+            self.jobs_tree.insert(
+                "", tk.END, iid=str(job.id), text=job.name,
+                values=(state, f"{job.progress * 100:.0f}%", f"{seconds:.1f} s")
+            )
+        existing = [iid for iid in selected if self.jobs_tree.exists(iid)]
+        if existing:
+            self.jobs_tree.selection_set(existing)
+
+    def cancel_selected_job(self) -> None:
+        """Anuluje zadanie zaznaczone na liście (lub trwającą transkrypcję, gdy nic nie zaznaczono)."""
+        selected = self.jobs_tree.selection()
+        if selected:
+            self.jobs.cancel(int(selected[0]))
+            return
+        for job in self.jobs.jobs():
+            if job.key == "transcription" and not job.finished:
+                self.jobs.cancel(job.id)
+
     def _on_language_selected(self, event: Optional[tk.Event]) -> None:
         """
         Obsługuje wybór języka z comboboxa.
@@ -638,6 +883,35 @@ class DictAItorApp:
         
         logger.info(f"Wybrano język: {selected_language_display} (kod: {language_code or 'auto'})")
 
+    def _on_upload_codec_selected(self, event: Optional[tk.Event]) -> None:
+        """
+        Obsługuje wybór kodeka kompresji nagrań wysyłanych do OpenAI.
+        
+        Args:
+            event: Obiekt zdarzenia (może być None)
+        """
+        codec = self.upload_codec_combobox.get()
+        self.openai_client.upload_codec = codec
+        self._save_settings({OPENAI_UPLOAD_CODEC_CONFIG: codec})
+        logger.info(f"Wybrano kodek wysyłania: {codec}")
+
+    def _on_vad_selected(self, event: Optional[tk.Event]) -> None:
+        """
+        Obsługuje wybór poziomu usuwania ciszy z comboboxa.
+        
+        Args:
+            event: Obiekt zdarzenia (może być None)
+        """
+        vad_level = self._vad_levels.get(self.vad_combobox.get(), 0)
+        self._save_settings({VAD_AGGRESSIVENESS_CONFIG: vad_level})
+        if OPENAI_AVAILABLE and hasattr(self, 'openai_client'):
+            self.openai_client.vad_aggressiveness = vad_level
+        logger.info(f"Wybrano poziom usuwania ciszy: {self.vad_combobox.get()} ({vad_level})")
+
+    def _get_vad_aggressiveness(self) -> int:
+        """Zwraca wybrany poziom usuwania ciszy (0 - wyłączone)."""
+        return self.config.get(VAD_AGGRESSIVENESS_CONFIG, 0)
+
     def _on_whisper_model_selected(self, event: Optional[tk.Event]) -> None:
         """
         Obsługuje wybór modelu Whisper z comboboxa.
@@ -647,6 +921,63 @@ class DictAItorApp:
             # Zapisz wybrany model w konfiguracji
             self._save_settings({PREFERRED_MODEL_CONFIG: selected_model})
             logger.info(f"Wybrano model Whisper: {selected_model}")
+            if LOCAL_STT_MODULE_AVAILABLE:
+                from modules.local_stt import get_loaded_models
+                loaded = ", ".join(f"{info['name']} ({info['memory_mb']:.0f} MB)" for info in get_loaded_models())
+                logger.info(f"Załadowane modele Whisper: {loaded or 'brak'}")
+            if self.transcription_mode.get() == "local":
+                self.transcribe_button.config(
+                    text="📝 Transkrybuj Lokalnie (Turbo)" if selected_model == "turbo" else "📝 Transkrybuj Lokalnie (Whisper)")
+                self._warm_up_selected_model()
+
+    def _warm_up_selected_model(self) -> None:
+        """
+        Ładuje i rozgrzewa wybrany model Whisper w tle.
+        
+        Transkrypcja zlecona w trakcie ładowania poczeka na ten sam model zamiast ładować go ponownie.
+        Ładowany jest tylko ostatnio wybrany model: zmiana wyboru anuluje poprzednie rozgrzewanie,
+        a kolejne ładowanie zaczyna się dopiero po zakończeniu trwającego (limit pamięci puli).
+        """
+        if not LOCAL_STT_MODULE_AVAILABLE or not self._background_tasks_started:
+            return
+        from modules.local_stt import warm_up_model, model_pool
+        
+        model_name = self.selected_whisper_model.get()
+        if model_pool.is_loaded(model_name):
+            self._set_model_status(model_name, True)
+            return
+        self.model_status_label.config(text="⏳ Ładowanie modelu...", foreground="#ff9800")
+        previous = self._warmup_job
+        if previous is not None and not previous.finished:
+            if self._warmup_model == model_name and not previous.token.cancelled:
+                return
+            self.jobs.cancel(previous.id)
+        
+        def warm_up_job(job: Job):
+            with self._warmup_lock:
+                job.token.raise_if_cancelled()
+                ready = warm_up_model(model_name, cancel_token=job.token)
+            self._update_gui(partial(self._set_model_status, model_name, ready))
+        
+        self._warmup_model = model_name
+        self._warmup_job = self._submit_job(f"Ładowanie modelu {model_name}", warm_up_job, key="warmup")
+
+    def _set_model_status(self, model_name: str, ready: bool) -> None:
+        """Aktualizuje wskaźnik gotowości modelu (jeśli wybór w międzyczasie się nie zmienił)."""
+        if model_name != self.selected_whisper_model.get():
+            return
+        if ready:
+            self.model_status_label.config(text="🟢 Model gotowy", foreground="#4caf50")
+        else:
+            self.model_status_label.config(text="🔴 Błąd ładowania modelu", foreground="#f44336")
+
+    def _on_save_recordings_toggled(self) -> None:
+        """Włącza lub wyłącza zapisywanie nagrań na dysku w tle."""
+        save = self.save_recordings.get()
+        # Bez zapisu na dysk rejestrator trzyma w pamięci całe nagranie, z zapisem - tylko końcówkę
+        self.recorder.stream_to_disk = save
+        self._save_settings({SAVE_RECORDINGS_CONFIG: save})
+        logger.info(f"Zapisywanie nagrań na dysku: {'włączone' if save else 'wyłączone'}")
 
     def _update_transcription_mode(self) -> None:
         """Aktualizuje widoczność sekcji w zależności od wybranego trybu transkrypcji."""
@@ -686,6 +1017,9 @@ class DictAItorApp:
                 self.transcribe_button.config(text="📝 Transkrybuj Lokalnie (Turbo)")
             else:
                 self.transcribe_button.config(text="📝 Transkrybuj Lokalnie (Whisper)")
+            
+            # Załaduj model w tle, aby pierwsza transkrypcja nie czekała na wczytanie z dysku
+            self._warm_up_selected_model()
                 
         elif mode == "openai" and OPENAI_AVAILABLE:
             self.language_options_container.pack(fill=tk.X, pady=5)
@@ -694,17 +1028,14 @@ class DictAItorApp:
     def _save_settings(self, settings: Dict[str, Any]) -> None:
         """
         Zapisuje ustawienia do konfiguracji.
+
+        Zmiana jest widoczna od razu; plik jest zapisywany w tle jednym zapisem
+        po serii szybkich zmian.
         
         Args:
             settings: Słownik z ustawieniami do zaktualizowania
         """
-        config = self.config.copy()
-        config.update(settings)
-        self.config = config
-        try:
-            save_config(config)
-        except Exception as e:
-            logger.error(f"Błąd zapisywania konfiguracji: {e}")
+        self.config.update(settings)
 
     def save_openai_key_action(self) -> None:
         """Zapisuje klucz API OpenAI i aktualizuje stan aplikacji."""
@@ -714,6 +1045,8 @@ class DictAItorApp:
             return
         
         self._save_settings({OPENAI_KEY_CONFIG: key})
+        # Klucz zapisz od razu, a nie z opóźnieniem jak pozostałe ustawienia
+        self.config.flush()
         self.openai_key_value = key
         if OPENAI_AVAILABLE and hasattr(self, 'openai_client'):
             self.openai_client.update_api_key(key)
@@ -731,6 +1064,15 @@ class DictAItorApp:
         else:
             self._stop_recording()
 
+    def _on_recording_interrupted(self, error: Optional[Exception]) -> None:
+        """Kończy nagrywanie, gdy źródło dźwięku zatrzymało się samo (np. odłączony mikrofon)."""
+        if not self.is_recording_app_state:
+            return
+        self._stop_recording()
+        if error is not None:
+            self._show_message("warning", "Nagrywanie Przerwane",
+                               f"Nagrywanie zostało przerwane: {error}\nZachowano nagranie do tej chwili.")
+
     def _start_recording(self) -> None:
         """Rozpoczyna nagrywanie dźwięku."""
         if not self.recorder.start_recording():
@@ -753,44 +1095,132 @@ class DictAItorApp:
         
         # Zresetuj wybrany plik
         self.last_recorded_file = None
+        self.last_recording_in_memory = False
         self.file_path_label.config(text="Brak wybranego pliku", foreground="gray")
+        
+        if self.live_captions.get() and self.transcription_mode.get() == "local" and LOCAL_STT_MODULE_AVAILABLE:
+            self._start_live_captions()
+
+    def _start_live_captions(self) -> None:
+        """Uruchamia transkrypcję na żywo w trakcie nagrywania."""
+        from modules.live_transcriber import LiveTranscriber
+        
+        language_code = self.selected_language_code.get()
+        self.live_transcriber = LiveTranscriber(
+            self.recorder,
+            self.selected_whisper_model.get(),
+            language=language_code if language_code else None,
+            on_update=lambda committed, unstable: self._update_gui(
+                partial(self._show_live_caption, committed, unstable)
+            )
+        )
+        self._update_status("Nagrywanie (napisy na żywo)...")
+        
+        def start_live_job(job: Job):
+            # Ładowanie modelu może potrwać - nie blokuj GUI
+            if not self.live_transcriber or not self.live_transcriber.start():
+                self._update_gui(lambda: self._update_status("Nagrywanie... (napisy na żywo niedostępne)"))
+        
+        self._submit_job("Napisy na żywo", start_live_job, key="live_start")
+
+    def _show_live_caption(self, committed: str, unstable: str) -> None:
+        """
+        Wyświetla napisy na żywo - tekst zatwierdzony i (wyszarzony) tekst tymczasowy.
+        
+        Args:
+            committed: Tekst zatwierdzony
+            unstable: Tekst tymczasowy, który może się jeszcze zmienić
+        """
+        if not self.is_recording_app_state:
+            return
+        self.transcription_text.config(state=tk.NORMAL)
+        self.transcription_text.delete(1.0, tk.END)
+        self.transcription_text.insert(tk.END, committed)
+        if unstable:
+            self.transcription_text.insert(tk.END, (" " if committed else "") + unstable, "unstable")
+        self.transcription_text.see(tk.END)
+        self.transcription_text.config(state=tk.DISABLED)
 
     def _stop_recording(self) -> None:
         """Zatrzymuje nagrywanie i zapisuje plik."""
         self._update_status("Zapisywanie nagrania...")
         
-        # Zatrzymanie nagrywania w głównym wątku - operacja I/O
-        def stop_recording_thread():
+        # Pomiar od zatrzymania do gotowego nagrania (przy napisach na żywo - do transkrypcji w schowku)
+        timer = JobTimer("live" if self.live_transcriber is not None else "recording",
+                         model=self.selected_whisper_model.get() if self.live_transcriber is not None else None,
+                         source="microphone")
+        
+        # Zatrzymanie rejestratora w głównym wątku - nie może zostać odrzucone przez limit zadań
+        # (zamknięcie źródła i domknięcie pliku WAV trwa krótko)
+        with timer.activate():
             filepath = self.recorder.stop_recording()
+        # Długie nagranie zapisywane na dysk nie mieści się w buforze - transkrypcja czyta wtedy plik
+        in_memory = self.recorder.holds_full_recording()
+        live_transcriber, self.live_transcriber = self.live_transcriber, None
+        
+        def finish_recording(live_transcript: Optional[str] = None):
+            self.is_recording_app_state = False
+            self.record_button.config(text="🎙️ Rejestruj Mowę")
+            self.last_recording_in_memory = in_memory
             
-            def finish_recording():
-                self.is_recording_app_state = False
-                self.record_button.config(text="🎙️ Rejestruj Mowę")
-                
-                if filepath:
-                    self.last_recorded_file = filepath
-                    self.file_path_label.config(
-                        text=f"Nagranie: {os.path.basename(filepath)}",
-                        foreground="white"  # Zmieniono kolor na biały dla ciemnego motywu
-                    )
-                    self._update_status(f"Nagranie zapisane ({os.path.basename(filepath)})")
-                    self.transcribe_button.config(state=tk.NORMAL)
-                    # Usunięto komunikat - tylko log
-                    logger.info(f"Nagranie zostało zapisane jako: {filepath}")
-                else:
-                    self._update_status("Błąd zapisu nagrania.")
-                    self.file_path_label.config(text="Błąd zapisu nagrania", foreground="red")
-                    # Komunikat błędu zostawiamy, bo jest krytyczny
-                    self._show_message("error", "Błąd Zapisu", "Nie udało się zapisać nagrania.")
-                    self.transcribe_button.config(state=tk.DISABLED)
+            if filepath:
+                self.last_recorded_file = filepath
+                self.file_path_label.config(
+                    text=f"Nagranie: {os.path.basename(filepath)}",
+                    foreground="white"  # Zmieniono kolor na biały dla ciemnego motywu
+                )
+                self._update_status(f"Nagranie zapisane ({os.path.basename(filepath)})")
+                self.transcribe_button.config(state=tk.NORMAL)
+                # Usunięto komunikat - tylko log
+                logger.info(f"Nagranie zostało zapisane jako: {filepath}")
+            elif in_memory:
+                self.file_path_label.config(
+                    text=f"Nagranie w pamięci ({self.recorder.get_duration():.1f} s, niezapisane)",
+                    foreground="white"
+                )
+                self._update_status("Nagranie gotowe do transkrypcji")
+                self.transcribe_button.config(state=tk.NORMAL)
+            else:
+                self._update_status("Błąd zapisu nagrania.")
+                self.file_path_label.config(text="Błąd zapisu nagrania", foreground="red")
+                # Komunikat błędu zostawiamy, bo jest krytyczny
+                self._show_message("error", "Błąd Zapisu", "Nie udało się zapisać nagrania.")
+                self.transcribe_button.config(state=tk.DISABLED)
             
-            self._update_gui(finish_recording)
+            if live_transcript is not None:
+                self._handle_successful_transcription(live_transcript)
+            self._complete_job_metrics(None if filepath or in_memory else "Błąd zapisu nagrania")
         
-        self._run_in_thread(stop_recording_thread)
+        if live_transcriber is None:
+            with timer.activate():
+                self._update_gui(finish_recording)
+            return
+        
+        def finish_live_job(job: Job):
+            with timer.activate():
+                self._update_gui(lambda: self._update_status("Dekodowanie ostatniego fragmentu..."))
+                live_transcript = None
+                try:
+                    with timer.stage("live_finish"):
+                        live_transcript = live_transcriber.finish()
+                except Exception as e:
+                    logger.error(f"Błąd podczas kończenia transkrypcji na żywo: {e}")
+                self._update_gui(partial(finish_recording, live_transcript))
+        
+        if self._submit_job("Dekodowanie ostatniego fragmentu", finish_live_job, key="live_finish") is None:
+            # Pełna kolejka zadań - nagranie jest gotowe, transkrypcję można zlecić przyciskiem
+            live_transcriber.stop()
+            
+            def finish_without_live():
+                finish_recording()
+                self._update_status("Kolejka zadań pełna - napisy na żywo przerwane. Użyj przycisku Transkrybuj.")
+            
+            with timer.activate():
+                self._update_gui(finish_without_live)
 
     def transcribe_action(self) -> None:
         """Rozpoczyna proces transkrypcji nagrania."""
-        if not self.last_recorded_file:
+        if not self.last_recorded_file and not self.last_recording_in_memory:
             self._show_message("warning", "Brak Nagrania", "Najpierw nagraj lub wskaż plik audio.")
             return
         
@@ -837,9 +1267,12 @@ class DictAItorApp:
         self.transcribe_button.config(state=tk.DISABLED)
         self.record_button.config(state=tk.DISABLED)
         
-        # Uruchom transkrypcję w osobnym wątku
-        self._run_in_thread(
-            partial(self._transcribe_local_thread, self.last_recorded_file, selected_model, language_code)
+        # Uruchom transkrypcję jako zadanie w tle
+        self._submit_transcription_job(
+            f"Transkrypcja lokalna ({selected_model})",
+            partial(self._transcribe_local_thread, audio_path=self.last_recorded_file, model_name=selected_model,
+                    language_code=language_code, use_recorder_buffer=self.last_recording_in_memory),
+            JobTimer("local", model=selected_model, source="memory" if self.last_recording_in_memory else "file")
         )
 
     def _transcribe_with_openai(self) -> None:
@@ -860,23 +1293,54 @@ class DictAItorApp:
         self.transcribe_button.config(state=tk.DISABLED)
         self.record_button.config(state=tk.DISABLED)
         
-        # Uruchom transkrypcję w osobnym wątku
-        self._run_in_thread(
-            partial(self._transcribe_openai_thread, self.last_recorded_file, language_code)
+        # Uruchom transkrypcję jako zadanie w tle
+        self._submit_transcription_job(
+            "Transkrypcja OpenAI",
+            partial(self._transcribe_openai_thread, audio_path=self.last_recorded_file, language_code=language_code),
+            JobTimer("openai", model=self.openai_client.MODEL_NAME,
+                     source="memory" if self.last_recording_in_memory else "file")
         )
 
-    def _transcribe_local_thread(self, audio_path: str, model_name: str, language_code: str) -> None:
+    def _submit_transcription_job(self, name: str, func: Callable[[Job], None], timer: JobTimer) -> None:
         """
-        Wątek wykonujący lokalną transkrypcję audio.
+        Zleca transkrypcję; przy odrzuceniu (trwa już inna transkrypcja) odblokowuje przyciski.
         
         Args:
-            audio_path: Ścieżka do pliku audio
+            name: Nazwa zadania na liście
+            func: Funkcja zadania wywoływana jako func(job)
+            timer: Pomiar etapów - od kliknięcia do skopiowania wyniku do schowka
+        """
+        def timed_job(job: Job):
+            timer.add_stage("queue_wait", job.wait_seconds)
+            with timer.activate():
+                func(job)
+        
+        if self._submit_job(name, timed_job, key="transcription") is None:
+            self._update_status("Transkrypcja już trwa - poczekaj lub anuluj ją na liście zadań.")
+            self._restore_action_buttons()
+
+    def _transcribe_local_thread(self, job: Job, audio_path: Optional[str], model_name: str, language_code: str,
+                                 use_recorder_buffer: bool = False) -> None:
+        """
+        Zadanie wykonujące lokalną transkrypcję audio.
+        
+        Args:
+            job: Zadanie (token anulowania i raportowanie postępu)
+            audio_path: Ścieżka do pliku audio (może być None dla nagrania w pamięci)
             model_name: Nazwa modelu Whisper
             language_code: Kod języka (może być pusty)
+            use_recorder_buffer: Czy przekazać nagranie wprost z bufora rejestratora
         """
+        if use_recorder_buffer and LOCAL_STT_MODULE_AVAILABLE:
+            self._transcribe_recorder_buffer_thread(job, model_name, language_code)
+            return
+        
         logger.info(f"Rozpoczynanie lokalnej transkrypcji pliku: {audio_path} z modelem Whisper: {model_name}, język: {language_code or 'auto'}")
         
         try:
+            if not audio_path:
+                raise FileNotFoundError("Nagranie nie zostało zapisane na dysku.")
+            
             # Sprawdź czy plik istnieje
             if not os.path.exists(audio_path):
                 raise FileNotFoundError(f"Plik audio nie istnieje: {audio_path}")
@@ -891,7 +1355,13 @@ class DictAItorApp:
                 transcript, error_msg = transcribe_audio_local(
                     audio_path, 
                     model_name=model_name, 
-                    language=language_code if language_code else None
+                    language=language_code if language_code else None,
+                    vad_aggressiveness=self._get_vad_aggressiveness(),
+                    workers=self.config.get(PARALLEL_WORKERS_CONFIG, 1),
+                    threads_per_worker=self.config.get(THREADS_PER_WORKER_CONFIG, 0),
+                    use_cache=self.use_transcription_cache,
+                    cancel_token=job.token,
+                    progress_callback=job.report
                 )
             else:
                 # Bezpośrednie użycie Whisper, jeśli moduł local_stt jest niedostępny
@@ -929,6 +1399,9 @@ class DictAItorApp:
             
             self._update_gui(update_transcription_ui)
             
+        except JobCancelled:
+            self._update_gui(self._handle_transcription_cancelled)
+            raise
         except ImportError:
             logger.error("Moduł 'whisper' nie został znaleziony.")
             self._update_gui(lambda: self._handle_transcription_error(
@@ -943,17 +1416,74 @@ class DictAItorApp:
                 lambda: self._handle_transcription_error(f"Błąd podczas lokalnej transkrypcji: {str(e)}")
             )
 
-    def _transcribe_openai_thread(self, audio_path: str, language_code: str) -> None:
+    def _transcribe_recorder_buffer_thread(self, job: Job, model_name: str, language_code: str) -> None:
         """
-        Wątek wykonujący transkrypcję audio przez OpenAI Whisper API.
+        Zadanie wykonujące lokalną transkrypcję nagrania bezpośrednio z bufora rejestratora.
         
         Args:
-            audio_path: Ścieżka do pliku audio
+            job: Zadanie (token anulowania i raportowanie postępu)
+            model_name: Nazwa modelu Whisper
             language_code: Kod języka (może być pusty)
         """
+        logger.info(f"Rozpoczynanie lokalnej transkrypcji nagrania z pamięci z modelem Whisper: {model_name}, język: {language_code or 'auto'}")
+        
+        try:
+            from modules.local_stt import transcribe_array_local
+            audio = self.recorder.get_audio_array()
+            transcript, error_msg = transcribe_array_local(
+                audio,
+                model_name=model_name,
+                language=language_code if language_code else None,
+                vad_aggressiveness=self._get_vad_aggressiveness(),
+                workers=self.config.get(PARALLEL_WORKERS_CONFIG, 1),
+                threads_per_worker=self.config.get(THREADS_PER_WORKER_CONFIG, 0),
+                use_cache=self.use_transcription_cache,
+                cancel_token=job.token,
+                progress_callback=job.report
+            )
+        except JobCancelled:
+            self._update_gui(self._handle_transcription_cancelled)
+            raise
+        except Exception as e:
+            transcript = None
+            error_msg = f"Błąd podczas lokalnej transkrypcji: {str(e)}"
+            logger.error(error_msg)
+        
+        def update_transcription_ui():
+            if error_msg:
+                self._handle_transcription_error(error_msg)
+            elif transcript is not None:
+                self._handle_successful_transcription(transcript)
+            else:
+                self._handle_transcription_error("Wystąpił nieznany błąd podczas transkrypcji.")
+            
+            # Zawsze odblokuj przyciski
+            self.transcribe_button.config(state=tk.NORMAL)
+            self.record_button.config(state=tk.NORMAL)
+        
+        self._update_gui(update_transcription_ui)
+
+    def _transcribe_openai_thread(self, job: Job, audio_path: Optional[str], language_code: str) -> None:
+        """
+        Zadanie wykonujące transkrypcję audio przez OpenAI Whisper API.
+        
+        Args:
+            job: Zadanie (token anulowania i raportowanie postępu)
+            audio_path: Ścieżka do pliku audio (None - nagranie w pamięci zostanie zapisane)
+            language_code: Kod języka (może być pusty)
+        """
+        if not audio_path and self.last_recording_in_memory:
+            # API wymaga pliku - zapisz nagranie z pamięci na żądanie
+            audio_path = self.recorder.save_to_file()
+            if audio_path:
+                self._update_gui(partial(self._set_recorded_file, audio_path))
+        
         logger.info(f"Rozpoczynanie transkrypcji OpenAI pliku: {audio_path}, język: {language_code or 'auto'}")
         
         try:
+            if not audio_path:
+                raise FileNotFoundError("Nagranie nie zostało zapisane na dysku.")
+            
             # Sprawdź czy plik istnieje
             if not os.path.exists(audio_path):
                 raise FileNotFoundError(f"Plik audio nie istnieje: {audio_path}")
@@ -965,7 +1495,9 @@ class DictAItorApp:
             # Wykonaj transkrypcję
             transcript, error_msg = self.openai_client.transcribe_audio(
                 audio_path, 
-                language=language_code if language_code else None
+                language=language_code if language_code else None,
+                cancel_token=job.token,
+                progress_callback=job.report
             )
             
             def update_transcription_ui():
@@ -982,11 +1514,27 @@ class DictAItorApp:
             
             self._update_gui(update_transcription_ui)
             
+        except JobCancelled:
+            self._update_gui(self._handle_transcription_cancelled)
+            raise
         except Exception as e:
             logger.error(f"Wyjątek podczas transkrypcji OpenAI: {str(e)}")
             self._update_gui(
                 lambda: self._handle_transcription_error(f"Błąd podczas transkrypcji OpenAI: {str(e)}")
             )
+            # Odblokuj przyciski
+            self._update_gui(lambda: self.transcribe_button.config(state=tk.NORMAL if self.last_recorded_file else tk.DISABLED))
+            self._update_gui(lambda: self.record_button.config(state=tk.NORMAL))
+
+    def _set_recorded_file(self, filepath: str) -> None:
+        """
+        Ustawia zapisany plik nagrania jako bieżący.
+        
+        Args:
+            filepath: Ścieżka do pliku nagrania
+        """
+        self.last_recorded_file = filepath
+        self.file_path_label.config(text=f"Nagranie: {os.path.basename(filepath)}", foreground="white")
 
     def _handle_successful_transcription(self, transcript: str) -> None:
         """
@@ -1008,6 +1556,7 @@ class DictAItorApp:
         
         # Usunięto komunikat - tylko log
         logger.info("Transkrypcja zakończona pomyślnie i skopiowana do schowka.")
+        self._complete_job_metrics()
 
     def _handle_transcription_error(self, error_msg: str) -> None:
         """
@@ -1022,6 +1571,25 @@ class DictAItorApp:
         self.transcription_text.delete(1.0, tk.END)  # Wyczyść przed dodaniem błędu
         self.transcription_text.insert(tk.END, f"--- BŁĄD ---\n{error_msg}\n")
         self.transcription_text.config(state=tk.DISABLED)
+        self._complete_job_metrics(error_msg)
+
+    def _handle_transcription_cancelled(self) -> None:
+        """Obsługuje anulowanie transkrypcji przez użytkownika."""
+        self._update_status("Transkrypcja anulowana.")
+        self._restore_action_buttons()
+        self._complete_job_metrics("anulowano")
+
+    def _complete_job_metrics(self, error: Optional[str] = None) -> None:
+        """Oznacza wynik mierzonego zadania (rekord jest zapisywany po zakończeniu aktualizacji GUI)."""
+        timer = current_timer()
+        if timer is not None:
+            timer.complete(error)
+
+    def _restore_action_buttons(self) -> None:
+        """Odblokowuje przyciski nagrywania i transkrypcji po zakończeniu zadania."""
+        has_recording = self.last_recorded_file or self.last_recording_in_memory
+        self.transcribe_button.config(state=tk.NORMAL if has_recording else tk.DISABLED)
+        self.record_button.config(state=tk.NORMAL)
 
     def _update_status(self, message: str) -> None:
         """
@@ -1049,42 +1617,108 @@ class DictAItorApp:
         elif msg_type == "error":
             messagebox.showerror(title, message)
 
-    def _run_in_thread(self, func: Callable, daemon: bool = True) -> None:
+    def _submit_job(self, name: str, func: Callable[[Job], Any], key: Optional[str] = None) -> Optional[Job]:
         """
-        Uruchamia funkcję w osobnym wątku.
+        Zleca funkcję jako zadanie w tle.
         
         Args:
-            func: Funkcja do uruchomienia
-            daemon: Czy wątek ma być demonem (kończy się wraz z głównym wątkiem)
+            name: Nazwa wyświetlana na liście zadań
+            func: Funkcja wywoływana jako func(job)
+            key: Klucz zadania - drugie takie samo zadanie nie zostanie dodane, dopóki pierwsze trwa
+            
+        Returns:
+            Optional[Job]: Zadanie lub None, jeśli zostało odrzucone
         """
-        thread = threading.Thread(target=func, daemon=daemon)
-        thread.start()
+        return self.jobs.submit(name, func, key=key)
 
-    def _update_gui(self, func: Callable) -> None:
+    def _update_gui(self, func: Callable, timed: bool = True) -> None:
         """
         Bezpiecznie aktualizuje GUI z głównego wątku.
         
+        Wywołana z mierzonego zadania (JobTimer) dolicza oczekiwanie w kolejce Tk i samą
+        aktualizację do etapu "gui_update"; po oznaczeniu wyniku zadania zapisuje jego rekord.
+        
         Args:
             func: Funkcja aktualizująca GUI
+            timed: Czy doliczać aktualizację do pomiaru bieżącego zadania
         """
-        self.root.after(0, func)
+        if self._closing:
+            return
+        timer = current_timer() if timed else None
+        if timer is not None:
+            func = partial(self._run_timed_gui_update, func, timer, time.perf_counter())
+        try:
+            self.root.after(0, func)
+        except (RuntimeError, tk.TclError):
+            # Okno zostało już zniszczone
+            pass
+
+    def _run_timed_gui_update(self, func: Callable, timer: JobTimer, scheduled: float) -> None:
+        """Wykonuje aktualizację GUI zleconą przez mierzone zadanie i dolicza jej czas."""
+        with timer.activate():
+            func()
+        timer.add_stage("gui_update", time.perf_counter() - scheduled)
+        if timer.completed:
+            timer.finish()
+
+    def _on_close(self) -> None:
+        """
+        Zamyka aplikację: kończy nagrywanie (domyka plik WAV), anuluje zadania i czeka,
+        aż trwające zadania dojdą do najbliższego punktu anulowania.
+        """
+        if self._closing:
+            return
+        self._closing = True
+        self._update_status("Zamykanie...")
+        
+        live_transcriber, self.live_transcriber = self.live_transcriber, None
+        if live_transcriber is not None:
+            live_transcriber.stop()
+        # is_active() jest False już po samoistnym zakończeniu źródła, zanim GUI obsłuży to zdarzenie
+        if self.recorder.needs_stop():
+            filepath = self.recorder.stop_recording()
+            if filepath:
+                logger.info(f"Nagranie zapisane przy zamykaniu: {filepath}")
+        
+        # Oczekujące zadania są anulowane, trwające kończą bieżący etap - okno czeka na nie bez blokowania
+        self.jobs.shutdown(wait=False, cancel=True)
+        self._finish_close()
+
+    def _finish_close(self) -> None:
+        """Niszczy okno, gdy wszystkie zadania się zakończą (sprawdzane co CLOSE_POLL_MS)."""
+        if self.jobs.active_count() > 0:
+            self.root.after(CLOSE_POLL_MS, self._finish_close)
+            return
+        if LOCAL_STT_MODULE_AVAILABLE:
+            from modules.parallel_stt import shutdown_worker_pool
+            from modules.local_stt import model_pool
+            shutdown_worker_pool()
+            model_pool.unload()
+        self.config.flush()
+        self.root.destroy()
 
 
 if __name__ == "__main__":
-    # Sprawdź czy moduł Whisper jest dostępny i jakie modele są zainstalowane
-    if WHISPER_AVAILABLE:
-        try:
-            import whisper
-            available_models = whisper.available_models()
-            logger.info(f"Dostępne modele Whisper: {', '.join(available_models)}")
-            
-            # Sprawdź czy model "turbo" jest dostępny
-            if "turbo" in available_models:
-                logger.info("Model 'turbo' jest dostępny!")
-            
-        except Exception as e:
-            logger.warning(f"Nie można sprawdzić dostępnych modeli Whisper: {e}")
+    # --startup-profile: wypisz czasy etapów uruchamiania po wyświetleniu okna i zakończ
+    # (kod wyjścia 1 przy przekroczeniu budżetu STARTUP_BUDGET_SECONDS)
+    profile_startup = "--startup-profile" in sys.argv[1:]
     
     root = tk.Tk()
+    startup_profiler.mark("utworzenie okna Tk")
     app = DictAItorApp(root)
-    root.mainloop()
\ No newline at end of file
+    startup_profiler.mark("budowa interfejsu (DictAItorApp)")
+    
+    def on_first_frame():
+        root.update_idletasks()
+        startup_profiler.mark("pierwsza klatka okna")
+        logger.info(f"Okno gotowe po {startup_profiler.elapsed:.2f} s od startu")
+        if profile_startup:
+            print(startup_profiler.report(STARTUP_BUDGET_SECONDS), flush=True)
+            root.after(0, root.destroy)
+        else:
+            app.start_background_tasks()
+    
+    root.after_idle(on_first_frame)
+    root.mainloop()
+    if profile_startup:
+        sys.exit(0 if startup_profiler.within_budget(STARTUP_BUDGET_SECONDS) else 1)
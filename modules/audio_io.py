@@ -0,0 +1,485 @@
+# X:\Aplikacje\dictaitor\modules\audio_io.py
+import io
+import wave
+import struct
+import logging
+from typing import Tuple, Optional, BinaryIO, Iterator
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Częstotliwość próbkowania oczekiwana przez Whisper
+WHISPER_SAMPLE_RATE = 16000
+
+# Formaty danych WAV obsługiwane bez librosa (pole wFormatTag nagłówka "fmt ")
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+# Resampler: liczba próbek wejścia po każdej stronie (długość filtra sinc = 2 * RESAMPLE_HALF_TAPS)
+RESAMPLE_HALF_TAPS = 16
+# Ile próbek wyjścia liczyć naraz (ogranicza pamięć pomocniczą resamplera)
+RESAMPLE_BLOCK = 1 << 16
+# Długość bloków, w których MappedWav przetwarza cały plik (skrót, VAD, podgląd przebiegu)
+MAPPED_BLOCK_SECONDS = 60
+
+# Kodeki dla wysyłanego audio: nazwa -> (format kontenera ffmpeg, kodek ffmpeg, rozszerzenie, stratny)
+UPLOAD_CODECS = {
+    "wav": (None, None, "wav", False),
+    "flac": ("flac", "flac", "flac", False),
+    "opus": ("ogg", "libopus", "ogg", True),
+    "mp3": ("mp3", "libmp3lame", "mp3", True),
+}
+DEFAULT_BITRATE_KBPS = 32
+
+
+class WavInfo:
+    """Parametry danych PCM pliku WAV odczytane z nagłówka."""
+
+    def __init__(self, format_tag: int, channels: int, rate: int, bits: int, data_offset: int, data_size: int):
+        self.format_tag = format_tag
+        self.channels = channels
+        self.rate = rate
+        self.bits = bits
+        self.data_offset = data_offset
+        self.data_size = data_size
+
+    @property
+    def frame_bytes(self) -> int:
+        return self.channels * self.bits // 8
+
+    @property
+    def frames(self) -> int:
+        return self.data_size // self.frame_bytes
+
+    @property
+    def duration(self) -> float:
+        return self.frames / self.rate
+
+    @property
+    def supported(self) -> bool:
+        """Czy dane można przekształcić bez librosa (PCM 8/16/24/32-bit lub float 32/64-bit)."""
+        if self.format_tag == WAVE_FORMAT_PCM:
+            return self.bits in (8, 16, 24, 32)
+        if self.format_tag == WAVE_FORMAT_IEEE_FLOAT:
+            return self.bits in (32, 64)
+        return False
+
+    @property
+    def dtype(self) -> Optional[str]:
+        """Typ próbek NumPy (None dla 24-bit - brak odpowiednika)."""
+        if self.format_tag == WAVE_FORMAT_IEEE_FLOAT:
+            return "<f4" if self.bits == 32 else "<f8"
+        return {8: "u1", 16: "<i2", 32: "<i4"}.get(self.bits)
+
+
+def parse_wav_header(f: BinaryIO) -> Optional[WavInfo]:
+    """
+    Odczytuje nagłówek RIFF/WAVE (chunki "fmt " i "data") bez wczytywania danych.
+
+    Args:
+        f: Plik otwarty w trybie binarnym, ustawiony na początku
+
+    Returns:
+        Optional[WavInfo]: Parametry lub None, jeśli to nie jest plik WAV
+    """
+    header = f.read(12)
+    if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+        return None
+    fmt = None
+    while True:
+        chunk = f.read(8)
+        if len(chunk) < 8:
+            return None
+        chunk_id, chunk_size = chunk[:4], struct.unpack("<I", chunk[4:])[0]
+        if chunk_id == b"fmt ":
+            body = f.read(chunk_size + (chunk_size & 1))
+            format_tag, channels, rate, _, _, bits = struct.unpack("<HHIIHH", body[:16])
+            if format_tag == WAVE_FORMAT_EXTENSIBLE and len(body) >= 26:
+                # Właściwy format to pierwsze 2 bajty identyfikatora SubFormat
+                format_tag = struct.unpack("<H", body[24:26])[0]
+            fmt = (format_tag, channels, rate, bits)
+        elif chunk_id == b"data":
+            if fmt is None:
+                return None
+            data_offset = f.tell()
+            # Nagrania przerwane przed domknięciem nagłówka mają rozmiar 0 lub 0xFFFFFFFF
+            f.seek(0, io.SEEK_END)
+            available = f.tell() - data_offset
+            data_size = chunk_size if 0 < chunk_size <= available else available
+            return WavInfo(*fmt, data_offset=data_offset, data_size=data_size)
+        else:
+            f.seek(chunk_size + (chunk_size & 1), io.SEEK_CUR)
+
+
+def read_wav_info(path: str) -> Optional[WavInfo]:
+    """Odczytuje nagłówek pliku WAV (None dla innych formatów lub błędu odczytu)."""
+    try:
+        with open(path, "rb") as f:
+            return parse_wav_header(f)
+    except (OSError, struct.error):
+        return None
+
+
+def pcm_to_float(data: bytes, info: WavInfo) -> np.ndarray:
+    """
+    Przekształca surowe dane WAV w próbki float32 [-1, 1] o kształcie (klatki, kanały).
+    """
+    data = data[:len(data) - len(data) % info.frame_bytes]
+    if info.format_tag == WAVE_FORMAT_IEEE_FLOAT:
+        samples = np.frombuffer(data, dtype="<f4" if info.bits == 32 else "<f8").astype(np.float32)
+    elif info.bits == 8:
+        samples = (np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif info.bits == 16:
+        samples = np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768.0
+    elif info.bits == 24:
+        raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3)
+        # Trzy bajty little-endian w górnej części int32 - przesunięcie zachowuje znak
+        samples = (raw[:, 0].astype(np.int32) << 8 | raw[:, 1].astype(np.int32) << 16
+                   | raw[:, 2].astype(np.int32) << 24).astype(np.float32) / 2147483648.0
+    else:
+        samples = np.frombuffer(data, dtype="<i4").astype(np.float32) / 2147483648.0
+    return samples.reshape(-1, info.channels)
+
+
+def to_mono(frames: np.ndarray) -> np.ndarray:
+    """Miksuje kanały (klatki, kanały) do mono."""
+    if frames.shape[1] == 1:
+        return frames[:, 0]
+    return frames.mean(axis=1, dtype=np.float32)
+
+
+def resample(audio: np.ndarray, orig_sr: int, target_sr: int) -> np.ndarray:
+    """
+    Zmienia częstotliwość próbkowania filtrem polifazowym (sinc z oknem Hanna).
+
+    Przy zmniejszaniu częstotliwości filtr tłumi pasmo powyżej nowej częstotliwości Nyquista
+    (bez aliasingu). Dla stosunku częstotliwości L/M (po skróceniu) wyjście dzieli się na L faz;
+    każda faza to iloczyn okien wejścia (widok bez kopiowania, krok M) ze stałym filtrem,
+    liczony w blokach po RESAMPLE_BLOCK próbek.
+
+    Args:
+        audio: Próbki mono float32
+        orig_sr: Częstotliwość wejściowa
+        target_sr: Częstotliwość docelowa
+
+    Returns:
+        np.ndarray: Próbki float32 o częstotliwości target_sr
+    """
+    if orig_sr == target_sr or len(audio) == 0:
+        return audio.astype(np.float32, copy=False)
+    divisor = np.gcd(orig_sr, target_sr)
+    up, down = target_sr // divisor, orig_sr // divisor
+    cutoff = min(1.0, target_sr / orig_sr)
+    half = int(np.ceil(RESAMPLE_HALF_TAPS / cutoff))
+    taps = np.arange(-half + 1, half + 1)
+    padded = np.concatenate([np.zeros(half, np.float32), audio.astype(np.float32, copy=False),
+                             np.zeros(half + 1, np.float32)])
+    # windows[i] = próbki wejścia od i - half + 1 do i + half (indeksy oryginału)
+    windows = np.lib.stride_tricks.sliding_window_view(padded, len(taps))[1:]
+
+    total = len(audio) * up // down
+    output = np.empty(total, dtype=np.float32)
+    for phase in range(min(up, total)):
+        # Wyjścia phase, phase + up, ...: pozycja w wejściu phase * down / up + k * down
+        base, remainder = divmod(phase * down, up)
+        distance = remainder / up - taps
+        weights = (cutoff * np.sinc(cutoff * distance)
+                   * (0.5 + 0.5 * np.cos(np.pi * distance / half))).astype(np.float32)
+        rows = windows[base::down]
+        count = len(range(phase, total, up))
+        for start in range(0, count, RESAMPLE_BLOCK):
+            block = rows[start:min(count, start + RESAMPLE_BLOCK)]
+            output[phase + start * up:phase + (start + len(block)) * up:up] = block @ weights
+    return output
+
+
+def decode_wav(f: BinaryIO, sr: int = WHISPER_SAMPLE_RATE) -> Optional[np.ndarray]:
+    """
+    Dekoduje plik WAV bez librosa: próbki PCM są przekształcane wprost, a inne
+    częstotliwości i nagrania wielokanałowe - miksowane i przepróbkowane wektorowo.
+
+    Args:
+        f: Plik WAV otwarty w trybie binarnym
+        sr: Docelowa częstotliwość próbkowania
+
+    Returns:
+        Optional[np.ndarray]: Próbki mono float32 lub None, jeśli format wymaga pełnego dekodera
+    """
+    info = parse_wav_header(f)
+    if info is None or not info.supported:
+        return None
+    f.seek(info.data_offset)
+    audio = to_mono(pcm_to_float(f.read(info.data_size), info))
+    if info.rate != sr:
+        logger.info(f"Przepróbkowanie WAV {info.rate} Hz -> {sr} Hz")
+        audio = resample(audio, info.rate, sr)
+    return audio
+
+
+class MappedWav:
+    """
+    Plik WAV zmapowany do pamięci (np.memmap od początku danych) z dostępem do dowolnego fragmentu.
+
+    Zachowuje się jak jednowymiarowa tablica próbek mono o częstotliwości sr: len() i wycinki
+    [start:stop] zwracają tylko żądany fragment, dekodowany (i przepróbkowany) dopiero przy
+    odczycie. Dzięki temu długie nagrania można dzielić, analizować i transkrybować fragmentami
+    przy ograniczonym zużyciu pamięci - dane pliku wczytuje system w miarę potrzeb.
+
+    Przepróbkowany fragment jest liczony z zapasem próbek wokół granic, więc jest zgodny
+    z wynikiem dekodowania całego pliku.
+    """
+
+    def __init__(self, path: str, sr: int = WHISPER_SAMPLE_RATE):
+        """
+        Args:
+            path: Ścieżka do pliku WAV (PCM 8/16/24/32-bit lub float)
+            sr: Częstotliwość próbkowania zwracanych próbek
+
+        Raises:
+            ValueError: Gdy plik nie jest obsługiwanym, niepustym plikiem WAV
+        """
+        info = read_wav_info(path)
+        if info is None or not info.supported or info.frames == 0:
+            raise ValueError(f"Plik nie jest obsługiwanym plikiem WAV z danymi: {path}")
+        self.path = path
+        self.info = info
+        self.sr = sr
+        self._data = np.memmap(path, dtype=np.uint8, mode="r", offset=info.data_offset,
+                               shape=(info.frames, info.frame_bytes))
+        divisor = np.gcd(info.rate, sr)
+        self._up, self._down = sr // divisor, info.rate // divisor
+        # Zapas próbek wejścia wokół fragmentu - zasięg filtra resamplera
+        self._context = int(np.ceil(RESAMPLE_HALF_TAPS / min(1.0, sr / info.rate))) + 1
+
+    @property
+    def rate(self) -> int:
+        """Częstotliwość próbkowania pliku."""
+        return self.info.rate
+
+    @property
+    def duration(self) -> float:
+        return self.info.duration
+
+    def __len__(self) -> int:
+        return self.info.frames * self._up // self._down
+
+    def __getitem__(self, index: slice) -> np.ndarray:
+        if not isinstance(index, slice):
+            raise TypeError("MappedWav obsługuje tylko wycinki [start:stop]")
+        start, stop, step = index.indices(len(self))
+        if step != 1:
+            raise ValueError("MappedWav nie obsługuje wycinków z krokiem")
+        if stop <= start:
+            return np.zeros(0, dtype=np.float32)
+        if self._up == self._down:
+            return to_mono(self._decode_frames(start, stop))
+
+        # Początek fragmentu wejścia - wielokrotność `down`, aby fazy filtra pokrywały się z całym plikiem
+        first = max(0, start * self._down // self._up - self._context) // self._down * self._down
+        last = min(self.info.frames, -(-stop * self._down // self._up) + self._context)
+        audio = resample(to_mono(self._decode_frames(first, last)), self.rate, self.sr)
+        offset = first * self._up // self._down
+        return audio[start - offset:stop - offset]
+
+    def window(self, start_s: float, end_s: float) -> np.ndarray:
+        """Próbki mono float32 (częstotliwość sr) z przedziału czasu [start_s, end_s)."""
+        return self[int(round(start_s * self.sr)):int(round(end_s * self.sr))]
+
+    def raw_window(self, start_s: float, end_s: float) -> np.ndarray:
+        """
+        Surowe klatki pliku z przedziału czasu - widok na zmapowane dane, bez kopiowania.
+
+        Returns:
+            np.ndarray: Tablica (klatki, kanały) w typie próbek pliku; dla 24-bit
+                        tablica bajtów (klatki, kanały, 3)
+        """
+        frames = self._data[int(round(start_s * self.rate)):int(round(end_s * self.rate))]
+        if self.info.dtype is None:
+            return frames.reshape(len(frames), self.info.channels, 3)
+        return frames.view(self.info.dtype)
+
+    def iter_blocks(self, block_samples: Optional[int] = None) -> Iterator[np.ndarray]:
+        """Kolejne fragmenty całego nagrania (domyślnie po MAPPED_BLOCK_SECONDS)."""
+        block_samples = block_samples or MAPPED_BLOCK_SECONDS * self.sr
+        for start in range(0, len(self), block_samples):
+            yield self[start:start + block_samples]
+
+    def read(self) -> np.ndarray:
+        """Dekoduje całe nagranie do pamięci."""
+        return self[:]
+
+    def peaks(self, num_bins: int) -> np.ndarray:
+        """
+        Minimum i maksimum sygnału (mono) w num_bins równych przedziałach - do podglądu przebiegu.
+
+        Returns:
+            np.ndarray: Tablica (przedziały, 2) z kolumnami (minimum, maksimum)
+        """
+        num_bins = max(1, min(num_bins, self.info.frames))
+        edges = np.linspace(0, self.info.frames, num_bins + 1).astype(np.int64)
+        result = np.empty((num_bins, 2), dtype=np.float32)
+        bins_per_block = max(1, MAPPED_BLOCK_SECONDS * self.rate * num_bins // self.info.frames)
+        for first in range(0, num_bins, bins_per_block):
+            last = min(num_bins, first + bins_per_block)
+            mono = to_mono(self._decode_frames(edges[first], edges[last]))
+            starts = edges[first:last] - edges[first]
+            result[first:last, 0] = np.minimum.reduceat(mono, starts)
+            result[first:last, 1] = np.maximum.reduceat(mono, starts)
+        return result
+
+    def close(self) -> None:
+        """
+        Zwalnia mapowanie pliku (na Windows blokuje ono usunięcie pliku).
+
+        Mapowanie jest zamykane, gdy znikną też widoki zwrócone przez raw_window.
+        """
+        self._data = None
+
+    def __enter__(self) -> "MappedWav":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def _decode_frames(self, first: int, last: int) -> np.ndarray:
+        """Klatki first..last jako float32 (klatki, kanały)."""
+        return pcm_to_float(self._data[first:last].reshape(-1), self.info)
+
+
+def load_audio_bytes(data: bytes, sr: int = WHISPER_SAMPLE_RATE) -> Optional[np.ndarray]:
+    """Dekoduje WAV przekazany w pamięci (None, jeśli to inny format)."""
+    return decode_wav(io.BytesIO(data), sr)
+
+
+def load_audio(path: str, sr: int = WHISPER_SAMPLE_RATE) -> np.ndarray:
+    """
+    Wczytuje plik audio jako tablicę float32 (mono, częstotliwość sr).
+
+    Pliki WAV PCM są dekodowane bezpośrednio (bez importu librosa); pozostałe formaty
+    przez librosa, a gdy jej brak lub dekodowanie się nie powiedzie - dekoderem
+    Whisper (ffmpeg).
+
+    Args:
+        path: Ścieżka do pliku audio
+        sr: Docelowa częstotliwość próbkowania
+
+    Returns:
+        np.ndarray: Próbki audio w zakresie [-1, 1]
+    """
+    try:
+        with open(path, "rb") as f:
+            audio = decode_wav(f, sr)
+        if audio is not None:
+            return audio
+    except (OSError, struct.error, ValueError) as e:
+        logger.warning(f"Nie można odczytać WAV bezpośrednio: {e}, próbuję librosa")
+
+    try:
+        import librosa
+        logger.info("Wczytywanie pliku audio przez librosa")
+        audio, _ = librosa.load(path, sr=sr, mono=True)
+        return audio.astype(np.float32, copy=False)
+    except ImportError:
+        logger.info("Użycie standardowej metody wczytywania audio")
+    except Exception as e:
+        logger.warning(f"Błąd wczytywania przez librosa: {e}, próbuję standardową metodę")
+
+    import whisper
+    if sr != WHISPER_SAMPLE_RATE:
+        raise ValueError(f"Dekoder Whisper obsługuje tylko {WHISPER_SAMPLE_RATE} Hz")
+    return whisper.load_audio(path)
+
+
+def get_audio_duration(path: str) -> Optional[float]:
+    """
+    Zwraca długość nagrania w sekundach bez dekodowania całego pliku.
+
+    Odczytuje nagłówek WAV, a dla innych formatów korzysta z librosa lub ffprobe.
+
+    Args:
+        path: Ścieżka do pliku audio
+
+    Returns:
+        Optional[float]: Długość w sekundach lub None, jeśli nie udało się jej ustalić
+    """
+    info = read_wav_info(path)
+    if info is not None and info.rate and info.frame_bytes:
+        return info.duration
+    try:
+        import librosa
+        return float(librosa.get_duration(path=path))
+    except Exception:
+        pass
+    try:
+        import ffmpeg
+        return float(ffmpeg.probe(path)["format"]["duration"])
+    except Exception as e:
+        logger.warning(f"Nie można ustalić długości pliku {path}: {e}")
+        return None
+
+
+def encode_wav(audio: np.ndarray, rate: int = WHISPER_SAMPLE_RATE) -> bytes:
+    """
+    Koduje próbki float32 (mono) do pliku WAV 16-bit PCM w pamięci.
+
+    Args:
+        audio: Próbki w zakresie [-1, 1]
+        rate: Częstotliwość próbkowania
+
+    Returns:
+        bytes: Zawartość pliku WAV
+    """
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767.0).astype(np.int16)
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+def encode_audio(audio: np.ndarray, rate: int = WHISPER_SAMPLE_RATE, codec: str = "wav",
+                 bitrate_kbps: int = DEFAULT_BITRATE_KBPS) -> Tuple[bytes, str]:
+    """
+    Koduje próbki float32 (mono) w pamięci w wybranym formacie.
+
+    Kompresja odbywa się przez potoki ffmpeg (bez plików tymczasowych). Jeśli
+    ffmpeg jest niedostępny lub kodowanie się nie powiedzie, zwracany jest WAV.
+
+    Args:
+        audio: Próbki w zakresie [-1, 1]
+        rate: Częstotliwość próbkowania
+        codec: Jeden z UPLOAD_CODECS ("wav", "flac", "opus", "mp3")
+        bitrate_kbps: Przepływność dla kodeków stratnych
+
+    Returns:
+        Tuple[bytes, str]: (zakodowane dane, rozszerzenie pliku)
+    """
+    if codec not in UPLOAD_CODECS:
+        logger.warning(f"Nieznany kodek '{codec}', używam WAV. Dostępne: {', '.join(UPLOAD_CODECS)}")
+        codec = "wav"
+    container, ffmpeg_codec, extension, lossy = UPLOAD_CODECS[codec]
+    if container is None:
+        return encode_wav(audio, rate), extension
+
+    try:
+        import ffmpeg
+        pcm = (np.clip(audio, -1.0, 1.0) * 32767.0).astype(np.int16).tobytes()
+        output_options = {"format": container, "acodec": ffmpeg_codec}
+        if lossy:
+            output_options["audio_bitrate"] = f"{bitrate_kbps}k"
+        encoded, _ = (
+            ffmpeg
+            .input("pipe:", format="s16le", ac=1, ar=rate)
+            .output("pipe:", **output_options)
+            .run(input=pcm, capture_stdout=True, capture_stderr=True, quiet=True)
+        )
+        return encoded, extension
+    except ImportError:
+        logger.warning("Biblioteka ffmpeg-python nie jest zainstalowana - wysyłam nieskompresowany WAV.")
+    except Exception as e:
+        stderr = getattr(e, "stderr", b"") or b""
+        logger.warning(f"Błąd kodowania audio do {codec}: {e} {stderr.decode(errors='ignore')[-300:]} - wysyłam WAV.")
+    return encode_wav(audio, rate), "wav"
@@ -1,10 +1,17 @@
 # X:\Aplikacje\dictaitor\modules\audio_recorder.py
-import pyaudio
 import wave
+import queue
+import struct
 import threading
 import time
 import os
 import logging
+from typing import Iterator, Optional, Callable
+
+import numpy as np
+
+from modules import metrics
+from modules.audio_sources import AudioSource, PyAudioSource
 
 logger = logging.getLogger(__name__)
 
@@ -12,28 +19,306 @@ logger = logging.getLogger(__name__)
 APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 RECORDINGS_DIR = os.path.join(APP_DIR, "recordings")
 
+# Co ile sekund aktualizować nagłówek WAV podczas nagrywania strumieniowego,
+# aby przerwane nagranie (np. awaria aplikacji) nadal dało się odtworzyć
+HEADER_UPDATE_INTERVAL = 1.0
+# Ile porcji może czekać na zapis pliku (ok. minuta nagrania przy porcjach 64 ms) - dysk,
+# który nie nadąża dłużej, jest traktowany jak błąd zapisu
+WAV_WRITER_MAX_QUEUED = 1000
+
+# Bufor nagrania w pamięci: długość bloku i zakładki między kolejnymi blokami (zob. PcmArena)
+ARENA_BLOCK_SECONDS = 300.0
+ARENA_OVERLAP_SECONDS = 30.0
+# Przy zapisie na dysk w pamięci zostaje tylko tyle ostatnich bloków (~10 min) - dla napisów
+# na żywo i get_recent_pcm; starszą część nagrania get_audio_array czyta z pliku WAV
+STREAMING_ARENA_BLOCKS = 2
+
+
+class PcmArena:
+    """
+    Bufor próbek int16 nagrania w pamięci: jeden wątek zapisujący, czytelnicy bez blokad.
+
+    Porcje z mikrofonu są kopiowane do zaalokowanych z góry bloków numpy o długości
+    ARENA_BLOCK_SECONDS. Nowy blok powstaje raz na kilka minut nagrania, więc wątek
+    nagrywania nie przepisuje rosnącego bufora i nie alokuje pamięci przy każdej porcji.
+    Każdy blok zaczyna się od kopii ostatnich ARENA_OVERLAP_SECONDS poprzedniego - zakres
+    nie dłuższy niż zakładka (np. "ostatnie 10 s") leży zawsze w jednym bloku i jest
+    zwracany jako widok bez kopiowania.
+
+    Liczba próbek jest publikowana dopiero po skopiowaniu danych, a zapisane próbki nie są
+    nigdy nadpisywane, więc inne wątki (napisy na żywo, VAD, wskaźnik poziomu) czytają
+    bufor bez blokady. Zapisywać może tylko jeden wątek.
+
+    Przy max_blocks > 0 bufor trzyma tylko tyle ostatnich bloków - starsze są zwalniane,
+    a zakresy sprzed start_frame nie są już dostępne (zużycie pamięci nie rośnie z czasem
+    nagrania). Zwolniony blok nie jest używany ponownie - każdy nowy blok to nowa tablica,
+    więc pobrany wcześniej widok zachowuje swoje dane. Odczyt, w trakcie którego wątek
+    zapisujący zwolnił potrzebny blok, jest ponawiany od nowego start_frame.
+    """
+
+    def __init__(self, rate: int, channels: int = 1, block_seconds: float = ARENA_BLOCK_SECONDS,
+                 overlap_seconds: float = ARENA_OVERLAP_SECONDS, max_blocks: int = 0):
+        self.rate = rate
+        self.channels = channels
+        self.overlap = int(overlap_seconds * rate)
+        self.capacity = max(int(block_seconds * rate), 2 * self.overlap, 1)
+        # Blok i zaczyna się od próbki i * step
+        self.step = self.capacity - self.overlap
+        # 0 - bez limitu; co najmniej 2 bloki, aby ostatnie `step` próbek było zawsze dostępne
+        self.max_blocks = max(2, max_blocks) if max_blocks else 0
+        self._blocks = [np.empty((self.capacity, channels), dtype=np.int16)]
+        self._first_block = 0  # Indeks najstarszego zachowanego bloku
+        self._frames = 0
+
+    def __len__(self) -> int:
+        """Liczba zapisanych próbek (na kanał), łącznie ze zwolnionymi blokami."""
+        return self._frames
+
+    @property
+    def start_frame(self) -> int:
+        """Pierwsza próbka dostępna w buforze (0, dopóki żaden blok nie został zwolniony)."""
+        return self._first_block * self.step
+
+    @property
+    def nbytes(self) -> int:
+        """Pamięć zajmowana przez zachowane bloki."""
+        return sum(block.nbytes for block in self._blocks[self._first_block:])
+
+    def write(self, data: bytes) -> None:
+        """Dopisuje porcję PCM int16 (z przeplotem kanałów). Wywoływać tylko z wątku nagrywania."""
+        samples = np.frombuffer(data, dtype=np.int16).reshape(-1, self.channels)
+        frames = self._frames
+        written = 0
+        while written < len(samples):
+            block = self._blocks[-1]
+            offset = frames - (len(self._blocks) - 1) * self.step
+            if offset == self.capacity:
+                block = self._grow(block)
+                offset = self.overlap
+            count = min(len(samples) - written, self.capacity - offset)
+            block[offset:offset + count] = samples[written:written + count]
+            written += count
+            frames += count
+            self._frames = frames
+
+    def _grow(self, block: np.ndarray) -> np.ndarray:
+        """Alokuje kolejny blok zaczynający się od zakładki poprzedniego."""
+        new_block = np.empty_like(block)
+        new_block[:self.overlap] = block[self.step:]
+        # Blok jest widoczny dla czytelników dopiero z gotową zakładką
+        self._blocks.append(new_block)
+        if self.max_blocks and len(self._blocks) - self._first_block > self.max_blocks:
+            # Najpierw przesuń początek bufora, potem zwolnij blok - czytelnicy nie dostaną pustego bloku
+            self._first_block += 1
+            self._blocks[self._first_block - 1] = None
+        return new_block
+
+    def view(self, start: int = 0, end: int | None = None) -> np.ndarray:
+        """
+        Zwraca próbki [start, end) jako tablicę int16 o kształcie (próbki, kanały).
+
+        Zakres mieszczący się w jednym bloku (zawsze - gdy nie jest dłuższy niż zakładka)
+        jest widokiem bez kopiowania; dłuższe zakresy są sklejane w nową tablicę.
+        """
+        views = self._views(start, end)
+        if not views:
+            return np.empty((0, self.channels), dtype=np.int16)
+        if len(views) == 1:
+            return views[0]
+        return np.concatenate(views)
+
+    def iter_views(self, start: int = 0, end: int | None = None) -> Iterator[np.ndarray]:
+        """Kolejne widoki (bez kopiowania) pokrywające zakres [start, end) bez powtórzeń."""
+        return iter(self._views(start, end))
+
+    def _views(self, start: int, end: int | None) -> list:
+        """Widoki zakresu; bloki są pobierane od razu, więc zwolnienie bloku później nie przeszkadza."""
+        while True:
+            generation = self._first_block
+            first, last = self._clamp(start, end)
+            views = []
+            position = first
+            while position < last:
+                index = min(position // self.step, len(self._blocks) - 1)
+                block = self._blocks[index]
+                if block is None:
+                    break
+                offset = position - index * self.step
+                count = min(last - position, self.capacity - offset)
+                views.append(block[offset:offset + count])
+                position += count
+            else:
+                return views
+            # Wątek zapisujący zwolnił blok w trakcie odczytu - ponów od nowego początku bufora
+            logger.debug(f"PcmArena: blok zwolniony w trakcie odczytu (start_frame {generation * self.step} -> "
+                         f"{self.start_frame}), ponawiam odczyt")
+
+    def last(self, frames: int) -> np.ndarray:
+        """Ostatnie `frames` próbek (widok bez kopiowania dla zakresu do zakładki)."""
+        total = self._frames
+        return self.view(max(0, total - frames), total)
+
+    def _clamp(self, start: int, end: int | None) -> tuple:
+        total = self._frames
+        end = total if end is None else max(0, min(end, total))
+        return max(self.start_frame, min(start, end)), end
+
+
+class StreamingWavWriter:
+    """
+    Zapisuje ramki PCM do pliku WAV na bieżąco, w osobnym wątku zapisującym.
+
+    Nagłówek jest tworzony od razu przy otwarciu pliku i okresowo aktualizowany
+    (rozmiary RIFF/data), więc w razie przerwania nagrywania na dysku zostaje
+    poprawny, odtwarzalny plik z dotychczas nagranym dźwiękiem.
+
+    Po błędzie zapisu (lub przepełnieniu kolejki) ustawiane jest `error`, a kolejne ramki
+    są pomijane - plik zawiera nagranie do chwili błędu.
+    """
+
+    _HEADER_SIZE = 44
+
+    def __init__(self, filepath: str, rate: int, channels: int, sample_width: int):
+        self.filepath = filepath
+        self.rate = rate
+        self.channels = channels
+        self.sample_width = sample_width
+        self.bytes_written = 0
+        self.error: Optional[Exception] = None
+
+        self._queue = queue.Queue(maxsize=WAV_WRITER_MAX_QUEUED)
+        self._file = None
+        self._thread = None
+        self._last_header_update = 0.0
+
+    def open(self) -> None:
+        """Tworzy plik z nagłówkiem WAV i uruchamia wątek zapisujący."""
+        self._file = open(self.filepath, 'wb')
+        self._write_header()
+        self._last_header_update = time.monotonic()
+        self._thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self._thread.start()
+
+    def write(self, data: bytes) -> None:
+        """Przekazuje ramkę do zapisu (nie blokuje wątku nagrywania; po błędzie zapisu - pomija ją)."""
+        if self.error is not None:
+            return
+        try:
+            self._queue.put_nowait(data)
+        except queue.Full:
+            self._fail(OSError(f"Zapis na dysk nie nadąża za nagrywaniem ({WAV_WRITER_MAX_QUEUED} porcji w kolejce)"))
+
+    def close(self) -> int:
+        """
+        Zapisuje zaległe ramki, uzupełnia nagłówek i zamyka plik.
+
+        Returns:
+            int: Liczba zapisanych bajtów danych audio
+        """
+        if self._thread is not None:
+            # Sygnał końca dla wątku zapisującego (po błędzie wątek kończy się sam)
+            while self._thread.is_alive():
+                try:
+                    self._queue.put(None, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+            self._thread.join()
+            self._thread = None
+        if self._file is not None:
+            try:
+                self._write_header()
+            finally:
+                self._file.close()
+                self._file = None
+        return self.bytes_written
+
+    def _writer_loop(self) -> None:
+        while True:
+            data = self._queue.get()
+            if data is None or self.error is not None:
+                break
+            try:
+                self._file.write(data)
+                self.bytes_written += len(data)
+                now = time.monotonic()
+                if now - self._last_header_update >= HEADER_UPDATE_INTERVAL:
+                    self._write_header()
+                    self._last_header_update = now
+            except Exception as e:
+                self._fail(e)
+                break
+        # Opróżnij kolejkę, aby nie blokować nagrywania po błędzie zapisu
+        while not self._queue.empty():
+            self._queue.get_nowait()
+
+    def _fail(self, error: Exception) -> None:
+        if self.error is None:
+            self.error = error
+            logger.error(f"Błąd zapisu danych audio do {self.filepath}: {error}")
+
+    def _write_header(self) -> None:
+        """Zapisuje (lub nadpisuje) nagłówek WAV z aktualnymi rozmiarami danych."""
+        block_align = self.channels * self.sample_width
+        header = struct.pack(
+            '<4sI4s4sIHHIIHH4sI',
+            b'RIFF', 36 + self.bytes_written, b'WAVE',
+            b'fmt ', 16, 1, self.channels, self.rate,
+            self.rate * block_align, block_align, self.sample_width * 8,
+            b'data', self.bytes_written
+        )
+        position = self._file.tell()
+        self._file.seek(0)
+        self._file.write(header)
+        self._file.seek(max(position, self._HEADER_SIZE))
+        self._file.flush()
+
 
 class AudioRecorder:
+    """
+    Nagrywa dźwięk ze źródła (domyślnie mikrofon przez PyAudio) do bufora w pamięci
+    i/lub pliku WAV zapisywanego na bieżąco.
+
+    Źródło przekazuje porcje przez funkcję zwrotną, więc rejestrator nie ma własnego wątku
+    odpytującego. Zamiast mikrofonu można podać dowolne AudioSource, np. ArraySource
+    odtwarzające plik - do testów i pomiarów bez urządzenia audio.
+    """
+
     def __init__(self, filename_prefix="recording", 
                  # Zoptymalizowane parametry nagrywania
                  rate=16000,     # Zmniejszono z domyślnego 44100/48000 do 16kHz 
                  channels=1,     # Mono zamiast stereo
                  chunk_size=1024,
-                 sample_width=2  # 16-bit, optymalny dla rozpoznawania mowy
+                 sample_width=2,  # 16-bit, optymalny dla rozpoznawania mowy
+                 stream_to_disk=True,  # Zapis pliku WAV na bieżąco w tle
+                 keep_in_memory=None,  # Bufor PCM w pamięci: None - całe nagranie tylko bez zapisu na dysk,
+                                       # przy zapisie ostatnie STREAMING_ARENA_BLOCKS bloków; True - zawsze całe
+                 source: Optional[AudioSource] = None  # Źródło dźwięku (None - mikrofon przez PyAudio)
                 ):
         self.filename_prefix = filename_prefix
         self.filepath = "" # Pełna ścieżka do pliku zostanie ustawiona przy starcie nagrywania
+        if source is not None:
+            # Format nagrania wyznacza źródło
+            rate, channels, chunk_size = source.rate, source.channels, source.chunk_size
+        self.source = source or PyAudioSource(rate, channels, chunk_size)
         self.rate = rate
         self.channels = channels
-        self.format = pyaudio.paInt16  # 16-bit PCM (odpowiada sample_width=2)
         self.chunk_size = chunk_size
         self.sample_width = sample_width
+        self.stream_to_disk = stream_to_disk
+        self.keep_in_memory = keep_in_memory
         
-        self.audio_interface = None
-        self.stream = None
-        self.frames = []
+        self.pcm_arena = PcmArena(rate, channels)
+        self.saved_filepath = None
+        self.wav_writer = None
         self.is_recording = False
-        self.recording_thread = None
+        # Wywoływane (w wątku źródła) z błędem lub None, gdy źródło zakończy się samo,
+        # oraz z błędem zapisu, gdy nie da się zapisywać pliku nagrania
+        self.on_source_stopped: Optional[Callable[[Optional[Exception]], None]] = None
+        # Czy źródło zostało uruchomione i nie zwolniono go jeszcze w stop_recording
+        self._source_open = False
+        # Próbki (na kanał) przyjęte w bieżącym nagraniu - także te, które trafiły tylko do pliku
+        self._recorded_frames = 0
 
         self._ensure_recordings_dir_exists()
         logger.info(f"Inicjalizacja AudioRecorder z parametrami: {rate}Hz, {channels} kanał(y), {sample_width*8}-bit")
@@ -59,91 +344,152 @@ class AudioRecorder:
             logger.warning("Próba rozpoczęcia nagrywania, gdy już jest aktywne.")
             return False
 
+        self.filepath = self._get_unique_filename() # Ustaw ścieżkę pliku
+        self.saved_filepath = None
+        self._recorded_frames = 0
+        # Nowy bufor dla każdego nagrania - widoki poprzedniego nagrania pozostają aktualne.
+        # Przy zapisie na dysk bufor ma stały rozmiar - całość nagrania jest w pliku
+        full_buffer = self.keep_in_memory or not self.stream_to_disk
+        self.pcm_arena = PcmArena(self.rate, self.channels,
+                                  max_blocks=0 if full_buffer else STREAMING_ARENA_BLOCKS)
+        if self.stream_to_disk:
+            try:
+                self.wav_writer = StreamingWavWriter(self.filepath, self.rate, self.channels, self.sample_width)
+                self.wav_writer.open()
+            except Exception as e:
+                logger.error(f"Nie można utworzyć pliku nagrania {self.filepath}: {e}")
+                self.wav_writer = None
+                return False
+
+        # Bufor i plik muszą być gotowe przed startem - źródło od razu przekazuje porcje
+        self.is_recording = True
         try:
-            self.audio_interface = pyaudio.PyAudio()
-            self.stream = self.audio_interface.open(format=self.format,
-                                                  channels=self.channels,
-                                                  rate=self.rate,
-                                                  input=True,
-                                                  frames_per_buffer=self.chunk_size)
+            self.source.start(self._on_chunk, self._on_source_stopped)
         except Exception as e:
             logger.error(f"Nie można otworzyć strumienia audio: {e}")
-            if self.audio_interface:
-                self.audio_interface.terminate()
-                self.audio_interface = None
+            self.is_recording = False
+            if self.wav_writer is not None:
+                self.wav_writer.close()
+                self.wav_writer = None
+                try:
+                    os.remove(self.filepath)
+                except OSError:
+                    pass
             return False # Nie udało się rozpocząć
-
-        self.filepath = self._get_unique_filename() # Ustaw ścieżkę pliku
-        self.is_recording = True
-        self.frames = []
-        self.recording_thread = threading.Thread(target=self._record_loop, daemon=True)
-        self.recording_thread.start()
+        self._source_open = True
         logger.info(f"Rozpoczęto nagrywanie. Plik: {self.filepath}")
         return True
 
-    def _record_loop(self):
-        logger.debug("Pętla nagrywania uruchomiona.")
-        while self.is_recording:
-            try:
-                data = self.stream.read(self.chunk_size, exception_on_overflow=False)
-                self.frames.append(data)
-            except IOError as e: # Np. odłączenie mikrofonu
-                logger.error(f"Błąd wejścia/wyjścia podczas nagrywania: {e}")
-                self.is_recording = False # Przerwij pętlę w przypadku błędu IO
-                break 
-            except Exception as e:
-                logger.error(f"Nieoczekiwany błąd w pętli nagrywania: {e}")
-                # Rozważ czy przerwać pętlę, czy próbować kontynuować
-                self.is_recording = False 
-                break
-        logger.debug("Pętla nagrywania zakończona.")
-        self._cleanup_stream()
+    def _on_chunk(self, data: bytes) -> None:
+        """Przyjmuje porcję ze źródła (w wątku źródła - jedynym zapisującym do bufora)."""
+        if not self.is_recording:
+            return
+        self._recorded_frames += len(data) // (self.channels * self.sample_width)
+        if self.wav_writer is not None:
+            self.wav_writer.write(data)
+            if self.wav_writer.error is not None:
+                # Plik nagrania nie rośnie - zakończ nagrywanie zamiast gubić dźwięk po cichu
+                logger.error(f"Nagrywanie przerwane przez błąd zapisu pliku: {self.wav_writer.error}")
+                self._interrupt(self.wav_writer.error)
+                return
+        if self.keep_in_memory is not False or not self.stream_to_disk:
+            self.pcm_arena.write(data)
+
+    def _on_source_stopped(self, error: Optional[Exception]) -> None:
+        """Źródło zakończyło się samo (koniec pliku, odłączenie mikrofonu)."""
+        if error is not None:
+            logger.error(f"Nagrywanie przerwane przez błąd źródła dźwięku: {error}")
+        else:
+            logger.info("Źródło dźwięku zakończyło nadawanie.")
+        self._interrupt(error)
+
+    def _interrupt(self, error: Optional[Exception]) -> None:
+        """Kończy przyjmowanie porcji i powiadamia aplikację (stop_recording domknie plik i zwolni źródło)."""
+        self.is_recording = False
+        if self.on_source_stopped is not None:
+            self.on_source_stopped(error)
 
     def stop_recording(self) -> str | None:
-        if not self.is_recording:
+        """
+        Zatrzymuje nagrywanie.
+
+        Returns:
+            str | None: Ścieżka zapisanego pliku WAV lub None, jeśli nagranie nie
+                        zostało zapisane na dysk (przy stream_to_disk=False nagranie
+                        pozostaje dostępne przez get_audio_array() i save_to_file())
+        """
+        # Źródło mogło zakończyć się samo (błąd, koniec pliku) - wtedy nadal trzeba je zwolnić
+        # i domknąć plik strumieniowy
+        if not self._source_open:
             logger.warning("Próba zatrzymania nagrywania, gdy nie jest aktywne.")
             return None
 
-        self.is_recording = False # Sygnał dla pętli nagrywania, aby się zakończyła
+        self.is_recording = False # Porcje, które dotrą przed zatrzymaniem źródła, są pomijane
         
-        if self.recording_thread and self.recording_thread.is_alive():
-            logger.debug("Oczekiwanie na zakończenie wątku nagrywania...")
-            self.recording_thread.join(timeout=2) # Dajmy wątkowi chwilę na zakończenie
-            if self.recording_thread.is_alive():
-                logger.warning("Wątek nagrywania nie zakończył się w oczekiwanym czasie.")
+        with metrics.stage("stop_stream"):
+            self.source.stop()
+            self._source_open = False
 
-        self._cleanup_stream() # Upewnij się, że strumień jest zamknięty
+        # Przy keep_in_memory=False bufor jest pusty - długość liczona z przyjętych porcji
+        metrics.annotate(audio_seconds=self._recorded_frames / self.rate)
+        if self.wav_writer is not None:
+            with metrics.stage("finalize_wav"):
+                return self._finalize_stream_file()
 
-        if self.audio_interface:
-            self.audio_interface.terminate()
-            self.audio_interface = None
-            logger.debug("Zakończono interfejs PyAudio.")
+        if not self.has_audio():
+            logger.warning("Brak klatek audio do zapisania.")
+        else:
+            logger.info(f"Nagranie zachowane w pamięci ({self.get_duration():.2f} sekund)")
+        return None
+
+    def _finalize_stream_file(self) -> str | None:
+        """Domyka plik zapisywany strumieniowo i zwraca jego ścieżkę."""
+        writer = self.wav_writer
+        self.wav_writer = None
+        try:
+            data_bytes = writer.close()
+        except Exception as e:
+            logger.error(f"Błąd podczas domykania pliku WAV {self.filepath}: {e}")
+            return None
 
-        if not self.frames:
+        if data_bytes == 0:
             logger.warning("Brak klatek audio do zapisania.")
+            try:
+                os.remove(self.filepath)
+            except OSError:
+                pass
             return None
 
-        return self._save_to_file()
+        self._log_recording_info(data_bytes)
+        metrics.annotate(bytes=data_bytes)
+        self.saved_filepath = self.filepath
+        return self.filepath
 
-    def _cleanup_stream(self):
-        if self.stream and self.stream.is_active(): # Sprawdź czy strumień jest aktywny
-            try:
-                self.stream.stop_stream()
-                logger.debug("Strumień audio zatrzymany.")
-            except Exception as e:
-                logger.error(f"Błąd podczas zatrzymywania strumienia: {e}")
-        if self.stream:
-            try:
-                self.stream.close()
-                logger.debug("Strumień audio zamknięty.")
-            except Exception as e:
-                logger.error(f"Błąd podczas zamykania strumienia: {e}")
-        self.stream = None
+    def _log_recording_info(self, data_bytes: int) -> None:
+        """Loguje rozmiar pliku i długość nagrania."""
+        file_size_mb = os.path.getsize(self.filepath) / (1024 * 1024)
+        logger.info(f"Nagranie zapisano jako {self.filepath} (rozmiar: {file_size_mb:.2f} MB)")
+
+        duration_seconds = data_bytes / (self.channels * self.sample_width) / self.rate
+        logger.info(f"Długość nagrania: {duration_seconds:.2f} sekund")
 
+    def save_to_file(self) -> str | None:
+        """
+        Zapisuje nagranie z bufora w pamięci do pliku WAV (jeśli nie zostało już zapisane).
 
-    def _save_to_file(self) -> str | None:
-        if not self.frames:
-            logger.warning("Brak klatek do zapisania (frames).")
+        Returns:
+            str | None: Ścieżka do pliku lub None w przypadku błędu
+        """
+        if self.saved_filepath:
+            return self.saved_filepath
+        if self.is_recording:
+            logger.warning("Nie można zapisać pliku w trakcie nagrywania.")
+            return None
+        if not self.has_audio():
+            logger.warning("Brak klatek do zapisania.")
+            return None
+        if not self.holds_full_recording():
+            logger.error("Bufor w pamięci nie zawiera początku nagrania - nie można zapisać pliku.")
             return None
         if not self.filepath:
             logger.error("Ścieżka pliku nie została ustawiona przed zapisem.")
@@ -154,23 +500,91 @@ class AudioRecorder:
             wf.setnchannels(self.channels)
             wf.setsampwidth(self.sample_width)  # Używamy ustawionej wartości zamiast pobierania przez PyAudio
             wf.setframerate(self.rate)
-            wf.writeframes(b''.join(self.frames))
+            data_bytes = 0
+            for block in self.pcm_arena.iter_views():
+                wf.writeframes(block.tobytes())
+                data_bytes += block.nbytes
             wf.close()
             
-            # Logowanie informacji o rozmiarze pliku
-            file_size_bytes = os.path.getsize(self.filepath)
-            file_size_mb = file_size_bytes / (1024 * 1024)
-            logger.info(f"Nagranie zapisano jako {self.filepath} (rozmiar: {file_size_mb:.2f} MB)")
-            
-            # Oblicz długość nagrania w sekundach
-            frames_count = len(b''.join(self.frames)) / (self.channels * self.sample_width)
-            duration_seconds = frames_count / self.rate
-            logger.info(f"Długość nagrania: {duration_seconds:.2f} sekund")
-            
+            self._log_recording_info(data_bytes)
+            self.saved_filepath = self.filepath
             return self.filepath
         except Exception as e:
             logger.error(f"Błąd podczas zapisywania pliku WAV {self.filepath}: {e}")
             return None
 
+    def has_audio(self) -> bool:
+        """Czy w buforze pamięci znajduje się nagranie."""
+        return len(self.pcm_arena) > 0
+
+    def holds_full_recording(self) -> bool:
+        """Czy bufor pamięci zawiera całe nagranie (przy zapisie na dysk - tylko krótkie nagrania)."""
+        return self.has_audio() and self.pcm_arena.start_frame == 0
+
+    def get_sample_count(self) -> int:
+        """Liczba próbek (na kanał) zgromadzonych w buforze pamięci."""
+        return len(self.pcm_arena)
+
+    def get_duration(self) -> float:
+        """Długość nagrania w buforze pamięci w sekundach."""
+        return self.get_sample_count() / self.rate
+
+    def get_recent_pcm(self, seconds: float) -> np.ndarray:
+        """
+        Ostatnie `seconds` sekund nagrania jako próbki int16 o kształcie (próbki, kanały).
+
+        Dla okien nie dłuższych niż ARENA_OVERLAP_SECONDS zwracany jest widok na bufor
+        nagrywania bez kopiowania (np. dla wskaźnika poziomu lub VAD w trakcie nagrywania).
+        """
+        return self.pcm_arena.last(int(seconds * self.rate))
+
+    def get_pcm_since(self, start_sample: int) -> np.ndarray:
+        """Nagranie od próbki start_sample do bieżącej chwili (int16, kształt (próbki, kanały))."""
+        return self.pcm_arena.view(start_sample)
+
+    def get_audio_array(self, start_sample: int = 0, end_sample: int | None = None) -> np.ndarray:
+        """
+        Zwraca nagranie z bufora jako tablicę float32 w zakresie [-1, 1], gotową dla Whisper.
+
+        Próbki int16 są przeliczane wprost z bloków bufora nagrywania (bez zapisu i ponownego
+        dekodowania pliku WAV ani pośredniej kopii). Kanały są uśredniane do mono.
+        Bufor jest czytany bez blokady - nagrywanie może w tym czasie trwać. Część nagrania
+        sprzed początku bufora o ograniczonym rozmiarze jest czytana z zapisanego pliku WAV
+        (zmapowanego do pamięci); w trakcie nagrywania jest pomijana.
+
+        Args:
+            start_sample: Indeks pierwszej próbki
+            end_sample: Indeks za ostatnią próbką (None - do bieżącego końca nagrania)
+
+        Returns:
+            np.ndarray: Próbki audio (float32, mono, częstotliwość self.rate)
+        """
+        first_buffered = self.pcm_arena.start_frame
+        head = None
+        if start_sample < first_buffered and self.saved_filepath:
+            from modules.audio_io import MappedWav
+            head_end = first_buffered if end_sample is None else min(end_sample, first_buffered)
+            head = MappedWav(self.saved_filepath, sr=self.rate)[start_sample:head_end]
+
+        blocks = list(self.pcm_arena.iter_views(start_sample, end_sample))
+        offset = len(head) if head is not None else 0
+        audio = np.empty(offset + sum(len(block) for block in blocks), dtype=np.float32)
+        position = offset
+        for block in blocks:
+            target = audio[position:position + len(block)]
+            if self.channels > 1:
+                np.mean(block, axis=1, dtype=np.float32, out=target)
+            else:
+                target[:] = block[:, 0]
+            position += len(block)
+        audio[offset:] /= 32768.0
+        if head is not None:
+            audio[:offset] = head
+        return audio
+
     def is_active(self) -> bool:
-        return self.is_recording
\ No newline at end of file
+        return self.is_recording
+
+    def needs_stop(self) -> bool:
+        """Czy źródło jest nadal otwarte - także po samoistnym zakończeniu nagrywania (błąd, koniec pliku)."""
+        return self._source_open
\ No newline at end of file
@@ -0,0 +1,263 @@
+# X:\Aplikacje\dictaitor\modules\audio_sources.py
+import threading
+import time
+import logging
+from abc import ABC, abstractmethod
+from typing import Optional, Callable
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Co ile sekund sprawdzać, czy strumień mikrofonu nadal działa (odłączenie urządzenia
+# zatrzymuje strumień bez wywołania funkcji zwrotnej)
+STREAM_WATCH_INTERVAL = 0.5
+
+# Funkcje zwrotne źródła: porcja PCM int16 (z przeplotem kanałów) oraz zakończenie
+# (None - koniec danych, wyjątek - błąd urządzenia)
+ChunkCallback = Callable[[bytes], None]
+StopCallback = Callable[[Optional[Exception]], None]
+
+
+class AudioSource(ABC):
+    """
+    Źródło dźwięku dla AudioRecorder.
+
+    Źródło samo dostarcza porcje PCM int16 do on_chunk - zawsze z jednego wątku naraz
+    (rejestrator zapisuje je do bufora z jednym wątkiem zapisującym). Gdy źródło kończy
+    się samo (koniec pliku, odłączenie mikrofonu), wywołuje on_stop.
+    """
+
+    def __init__(self, rate: int = 16000, channels: int = 1, chunk_size: int = 1024):
+        self.rate = rate
+        self.channels = channels
+        self.chunk_size = chunk_size
+        self.sample_width = 2  # PCM 16-bit
+
+    @abstractmethod
+    def start(self, on_chunk: ChunkCallback, on_stop: Optional[StopCallback] = None) -> None:
+        """
+        Rozpoczyna dostarczanie porcji.
+
+        Raises:
+            Exception: Jeśli nie można otworzyć źródła (np. brak mikrofonu)
+        """
+
+    @abstractmethod
+    def stop(self) -> None:
+        """Zatrzymuje źródło i zwalnia zasoby (bezpieczne przy wielokrotnym wywołaniu)."""
+
+    @abstractmethod
+    def is_active(self) -> bool:
+        """Czy źródło nadal dostarcza porcje."""
+
+
+class PyAudioSource(AudioSource):
+    """
+    Mikrofon przez PyAudio w trybie funkcji zwrotnej.
+
+    PortAudio przekazuje każdą porcję z własnego wątku audio, gdy tylko jest gotowa - nie ma
+    wątku odpytującego blokującym stream.read, więc porcje docierają z mniejszym rozrzutem
+    opóźnień. Biblioteka pyaudio jest importowana dopiero przy starcie nagrywania.
+    Wątek nadzorczy co STREAM_WATCH_INTERVAL sprawdza, czy strumień nie zatrzymał się sam
+    (odłączenie mikrofonu, błąd sterownika), i zgłasza to przez on_stop.
+    """
+
+    def __init__(self, rate: int = 16000, channels: int = 1, chunk_size: int = 1024,
+                 device_index: Optional[int] = None):
+        super().__init__(rate, channels, chunk_size)
+        self.device_index = device_index
+        # Liczba porcji, przy których PortAudio zgłosił przepełnienie bufora wejściowego
+        self.overflows = 0
+        self._interface = None
+        self._stream = None
+        self._on_chunk = None
+        self._on_stop = None
+        self._stop_event = threading.Event()
+        self._stop_reported = threading.Event()
+        self._watch_thread = None
+
+    def start(self, on_chunk: ChunkCallback, on_stop: Optional[StopCallback] = None) -> None:
+        import pyaudio
+
+        self._on_chunk = on_chunk
+        self._on_stop = on_stop
+        self.overflows = 0
+        self._stop_event.clear()
+        self._stop_reported.clear()
+        self._interface = pyaudio.PyAudio()
+        try:
+            self._stream = self._interface.open(format=pyaudio.paInt16,
+                                                channels=self.channels,
+                                                rate=self.rate,
+                                                input=True,
+                                                input_device_index=self.device_index,
+                                                frames_per_buffer=self.chunk_size,
+                                                stream_callback=self._callback)
+        except Exception:
+            self._interface.terminate()
+            self._interface = None
+            raise
+        self._watch_thread = threading.Thread(target=self._watch_loop, args=(self._stream,), daemon=True)
+        self._watch_thread.start()
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        import pyaudio
+
+        if status & pyaudio.paInputOverflow:
+            self.overflows += 1
+        try:
+            self._on_chunk(in_data)
+        except Exception as e:
+            logger.error(f"Błąd przetwarzania porcji audio: {e}")
+            self._report_stop(e)
+            return None, pyaudio.paAbort
+        return None, pyaudio.paContinue
+
+    def _watch_loop(self, stream) -> None:
+        """Zgłasza zatrzymanie strumienia, którego nie zlecono przez stop()."""
+        while not self._stop_event.wait(STREAM_WATCH_INTERVAL):
+            try:
+                active = stream.is_active()
+            except Exception as e:
+                self._report_stop(e)
+                return
+            if not active:
+                if not self._stop_event.is_set():
+                    self._report_stop(RuntimeError("Strumień audio zatrzymał się (odłączone urządzenie?)"))
+                return
+
+    def _report_stop(self, error: Optional[Exception]) -> None:
+        """Wywołuje on_stop najwyżej raz na nagranie."""
+        if self._stop_reported.is_set():
+            return
+        self._stop_reported.set()
+        if self._on_stop is not None:
+            self._on_stop(error)
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._watch_thread is not None and self._watch_thread is not threading.current_thread():
+            self._watch_thread.join()
+        self._watch_thread = None
+        if self._stream is not None:
+            try:
+                if self._stream.is_active():
+                    self._stream.stop_stream()
+                self._stream.close()
+                logger.debug("Strumień audio zamknięty.")
+            except Exception as e:
+                logger.error(f"Błąd podczas zamykania strumienia: {e}")
+            self._stream = None
+        if self._interface is not None:
+            self._interface.terminate()
+            self._interface = None
+            logger.debug("Zakończono interfejs PyAudio.")
+        if self.overflows:
+            logger.warning(f"Przepełnienia bufora wejściowego podczas nagrywania: {self.overflows}")
+
+    def is_active(self) -> bool:
+        return self._stream is not None and self._stream.is_active()
+
+
+class ArraySource(AudioSource):
+    """
+    Odtwarza nagranie z pamięci (lub pliku - from_file) jako źródło dla AudioRecorder.
+
+    Porcje są wysyłane w tempie czasu rzeczywistego pomnożonym przez `speed` (0 - tak
+    szybko, jak rejestrator je przyjmuje). Tempo wyznaczają terminy liczone od startu,
+    więc pojedyncze opóźnienie nie przesuwa kolejnych porcji. Pozwala testować rejestrator
+    (przepustowość, opóźnienia, czytelników bufora) bez mikrofonu.
+    """
+
+    def __init__(self, audio: np.ndarray, rate: int = 16000, chunk_size: int = 1024,
+                 speed: float = 1.0, loop: bool = False):
+        """
+        Args:
+            audio: Próbki int16 lub float32 w zakresie [-1, 1]; kształt (próbki,) lub (próbki, kanały)
+            rate: Częstotliwość próbkowania
+            chunk_size: Liczba próbek (na kanał) w porcji
+            speed: Krotność czasu rzeczywistego (0 - bez czekania)
+            loop: Czy po końcu nagrania zaczynać od początku (do wywołania stop)
+        """
+        audio = np.asarray(audio)
+        if len(audio) == 0:
+            raise ValueError("ArraySource wymaga niepustego nagrania.")
+        if audio.ndim == 1:
+            audio = audio[:, None]
+        super().__init__(rate, audio.shape[1], chunk_size)
+        if audio.dtype != np.int16:
+            audio = np.round(np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+        self.audio = np.ascontiguousarray(audio)
+        self.speed = speed
+        self.loop = loop
+        # Opóźnienie porcji względem terminu (przy speed > 0): największe i liczba spóźnionych
+        # o więcej niż połowę porcji
+        self.max_lag = 0.0
+        self.late_chunks = 0
+        self.finished = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_file(cls, path: str, rate: int = 16000, chunk_size: int = 1024,
+                  speed: float = 1.0, loop: bool = False) -> "ArraySource":
+        """Źródło odtwarzające plik audio (dekodowany do mono, częstotliwość `rate`)."""
+        from modules.audio_io import load_audio
+        return cls(load_audio(path, sr=rate), rate, chunk_size, speed, loop)
+
+    def start(self, on_chunk: ChunkCallback, on_stop: Optional[StopCallback] = None) -> None:
+        self.stop()
+        self.max_lag = 0.0
+        self.late_chunks = 0
+        self.finished.clear()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._replay_loop, args=(on_chunk, on_stop), daemon=True)
+        self._thread.start()
+
+    def _replay_loop(self, on_chunk: ChunkCallback, on_stop: Optional[StopCallback]) -> None:
+        interval = self.chunk_size / self.rate / self.speed if self.speed > 0 else 0.0
+        started = time.perf_counter()
+        total = len(self.audio)
+        sent = 0
+        position = 0  # Pozycja następnej porcji w nagraniu
+        error = None
+        try:
+            while not self._stop_event.is_set():
+                if position >= total:
+                    break
+                if interval:
+                    # Porcja jest "nagrana" dopiero po upływie swojego czasu
+                    deadline = started + (sent + 1) * interval
+                    delay = deadline - time.perf_counter()
+                    if delay > 0 and self._stop_event.wait(delay):
+                        break
+                    lag = -delay
+                    self.max_lag = max(self.max_lag, lag)
+                    if lag > interval / 2:
+                        self.late_chunks += 1
+                if self.loop and position + self.chunk_size > total:
+                    # Porcja na granicy zapętlenia - koniec nagrania i dalej od początku
+                    chunk = self.audio[(position + np.arange(self.chunk_size)) % total]
+                else:
+                    chunk = self.audio[position:position + self.chunk_size]
+                position += self.chunk_size
+                if self.loop:
+                    position %= total
+                on_chunk(chunk.tobytes())
+                sent += 1
+        except Exception as e:
+            logger.error(f"Błąd przetwarzania porcji audio: {e}")
+            error = e
+        self.finished.set()
+        if on_stop is not None and not self._stop_event.is_set():
+            on_stop(error)
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def is_active(self) -> bool:
+        return self._thread is not None and not self.finished.is_set()
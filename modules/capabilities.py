@@ -0,0 +1,109 @@
+# X:\Aplikacje\dictaitor\modules\capabilities.py
+import os
+import sys
+import json
+import time
+import logging
+import importlib.util
+from typing import Optional, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_DIR = os.path.join(APP_DIR, "config")
+CAPABILITIES_PATH = os.path.join(CONFIG_DIR, "capabilities.json")
+
+# Pakiety, których obecność (i wersja na dysku) decyduje o ważności zapisanych wyników
+PROBED_PACKAGES = ("whisper", "torch", "librosa", "requests", "ffmpeg")
+
+
+def _fingerprint() -> Dict[str, Any]:
+    """
+    Odcisk środowiska: wersja Pythona oraz położenie i czas modyfikacji pakietów.
+
+    Wyznaczany bez importowania pakietów (importlib.util.find_spec), więc jest szybki.
+    """
+    fingerprint: Dict[str, Any] = {"python": sys.version, "executable": sys.executable}
+    for name in PROBED_PACKAGES:
+        try:
+            spec = importlib.util.find_spec(name)
+        except (ImportError, ValueError):
+            spec = None
+        origin = spec.origin if spec is not None else None
+        try:
+            mtime = os.stat(origin).st_mtime_ns if origin else None
+        except OSError:
+            mtime = None
+        fingerprint[name] = [origin, mtime]
+    return fingerprint
+
+
+def load_cached_capabilities() -> Optional[Dict[str, Any]]:
+    """
+    Zwraca zapisane wyniki sprawdzenia możliwości, jeśli środowisko się nie zmieniło.
+
+    Returns:
+        Optional[Dict[str, Any]]: Wyniki z config/capabilities.json lub None (brak lub nieaktualne)
+    """
+    try:
+        with open(CAPABILITIES_PATH, "r", encoding="utf-8") as f:
+            capabilities = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if capabilities.get("fingerprint") != _fingerprint():
+        logger.info("Zmieniło się środowisko Pythona - zapisane możliwości wymagają ponownego sprawdzenia.")
+        return None
+    return capabilities
+
+
+def probe_capabilities() -> Dict[str, Any]:
+    """
+    Sprawdza dostępność Whisper (importując go wraz z torch), listę modeli i CUDA,
+    a następnie zapisuje wynik w config/capabilities.json.
+
+    Operacja trwa kilka sekund - należy ją wykonywać w tle.
+
+    Returns:
+        Dict[str, Any]: Wyniki sprawdzenia
+    """
+    started = time.perf_counter()
+    fingerprint = _fingerprint()
+    capabilities: Dict[str, Any] = {
+        "fingerprint": fingerprint,
+        "packages": {name: fingerprint[name][0] is not None for name in PROBED_PACKAGES},
+        "whisper_importable": False,
+        "whisper_error": None,
+        "whisper_models": [],
+        "cuda_available": False,
+        "probed_at": time.time(),
+    }
+
+    try:
+        import whisper
+        capabilities["whisper_models"] = list(whisper.available_models())
+        capabilities["whisper_importable"] = True
+    except Exception as e:
+        capabilities["whisper_error"] = str(e)
+        logger.warning(f"Biblioteka Whisper nie jest dostępna: {e}")
+
+    try:
+        import torch
+        capabilities["cuda_available"] = bool(torch.cuda.is_available())
+    except Exception:
+        pass
+
+    _save_capabilities(capabilities)
+    logger.info(f"Sprawdzono możliwości środowiska w {time.perf_counter() - started:.2f} s")
+    return capabilities
+
+
+def _save_capabilities(capabilities: Dict[str, Any]) -> None:
+    """Zapisuje wyniki atomowo (plik tymczasowy + os.replace)."""
+    temp_path = f"{CAPABILITIES_PATH}.tmp"
+    try:
+        os.makedirs(CONFIG_DIR, exist_ok=True)
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(capabilities, f, indent=4)
+        os.replace(temp_path, CAPABILITIES_PATH)
+    except OSError as e:
+        logger.error(f"Nie można zapisać {CAPABILITIES_PATH}: {e}")
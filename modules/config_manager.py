@@ -1,7 +1,11 @@
 # X:\Aplikacje\dictaitor\modules\config_manager.py
 import json
 import os
+import time
+import atexit
 import logging
+import tempfile
+import threading
 from typing import Dict, Any, Optional
 
 logger = logging.getLogger(__name__)
@@ -10,6 +14,10 @@ logger = logging.getLogger(__name__)
 APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # Główny katalog aplikacji
 CONFIG_DIR = os.path.join(APP_DIR, "config")
 CONFIG_FILE_PATH = os.path.join(CONFIG_DIR, "settings.json")
+# Ile sekund po ostatniej zmianie zapisać plik (seria zmian daje jeden zapis)
+SAVE_DELAY_SECONDS = 1.0
+# Jak często (najwyżej) sprawdzać, czy plik nie został zmieniony z zewnątrz
+MTIME_CHECK_INTERVAL = 2.0
 
 def ensure_config_dir_exists():
     """Upewnia się, że katalog 'config' istnieje."""
@@ -22,6 +30,164 @@ def ensure_config_dir_exists():
             # Można rzucić wyjątek, jeśli katalog jest krytyczny
             raise
 
+class ConfigStore:
+    """
+    Konfiguracja aplikacji trzymana w pamięci z odroczonym, atomowym zapisem na dysk.
+
+    Odczyty nie dotykają dysku (poza sprawdzeniem czasu modyfikacji pliku co
+    MTIME_CHECK_INTERVAL s - zmiany wprowadzone z zewnątrz są wczytywane ponownie).
+    Seria szybkich zmian (np. kolejne wybory w listach rozwijanych) kończy się jednym
+    zapisem po SAVE_DELAY_SECONDS od ostatniej zmiany. Plik jest zapisywany do pliku
+    tymczasowego i podmieniany (os.replace), więc przerwany zapis nie uszkadza ustawień.
+    """
+
+    def __init__(self, path: str = CONFIG_FILE_PATH, save_delay: float = SAVE_DELAY_SECONDS):
+        self.path = path
+        self.save_delay = save_delay
+        self._lock = threading.RLock()
+        self._data: Dict[str, Any] = {}
+        # Klucze zmienione od ostatniego zapisu (nakładane na plik zmieniony z zewnątrz)
+        self._pending: Dict[str, Any] = {}
+        self._timer: Optional[threading.Timer] = None
+        self._mtime_ns: Optional[int] = None
+        self._last_check = 0.0
+        self._load()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Zwraca wartość ustawienia (bez odczytu pliku)."""
+        with self._lock:
+            self._reload_if_changed()
+            return self._data.get(key, default)
+
+    def data(self) -> Dict[str, Any]:
+        """Kopia całej konfiguracji."""
+        with self._lock:
+            self._reload_if_changed()
+            return dict(self._data)
+
+    def update(self, settings: Dict[str, Any]) -> None:
+        """Zmienia ustawienia w pamięci i planuje zapis pliku."""
+        with self._lock:
+            self._data.update(settings)
+            self._pending.update(settings)
+            self._schedule_save()
+
+    def set(self, key: str, value: Any) -> None:
+        self.update({key: value})
+
+    def replace(self, config_data: Dict[str, Any]) -> None:
+        """Zastępuje całą konfigurację i planuje zapis pliku."""
+        with self._lock:
+            self._data = dict(config_data)
+            self._pending = dict(config_data)
+            self._schedule_save()
+
+    def flush(self) -> bool:
+        """
+        Zapisuje oczekujące zmiany natychmiast.
+
+        Returns:
+            bool: True jeśli nie było zmian lub zapis się powiódł
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending:
+                return True
+            # Ktoś mógł zmienić plik od ostatniego odczytu - nie nadpisuj jego zmian
+            self._reload_if_changed(force=True)
+            if not self._write(self._data):
+                return False
+            self._pending = {}
+            return True
+
+    def _schedule_save(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(self.save_delay, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _load(self) -> None:
+        """Wczytuje plik (przy błędzie zostawia bieżące ustawienia)."""
+        self._mtime_ns = self._stat_mtime()
+        if self._mtime_ns is None:
+            logger.warning(f"Plik konfiguracyjny {self.path} nie istnieje. Używam pustej konfiguracji.")
+            return
+        try:
+            with open(self.path, 'r') as f:
+                loaded = json.load(f)
+        except json.JSONDecodeError as e:
+            logger.error(f"Błąd dekodowania JSON w pliku {self.path}: {e}. Pomijam zawartość pliku.")
+            return
+        except (IOError, OSError) as e:
+            logger.error(f"Błąd podczas wczytywania konfiguracji z {self.path}: {e}")
+            return
+        if not isinstance(loaded, dict):
+            logger.error(f"Plik {self.path} nie zawiera obiektu JSON. Pomijam zawartość pliku.")
+            return
+        self._data = {**loaded, **self._pending}
+        logger.info(f"Konfiguracja wczytana z {self.path}")
+
+    def _reload_if_changed(self, force: bool = False) -> None:
+        """Wczytuje plik ponownie, jeśli zmienił się od ostatniego odczytu lub zapisu."""
+        now = time.monotonic()
+        if not force and now - self._last_check < MTIME_CHECK_INTERVAL:
+            return
+        self._last_check = now
+        mtime_ns = self._stat_mtime()
+        if mtime_ns is not None and mtime_ns != self._mtime_ns:
+            logger.info(f"Plik {self.path} został zmieniony z zewnątrz - wczytuję ponownie")
+            self._load()
+
+    def _stat_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _write(self, config_data: Dict[str, Any]) -> bool:
+        """Zapisuje konfigurację atomowo (plik tymczasowy w tym samym katalogu + os.replace)."""
+        directory = os.path.dirname(self.path)
+        temp_path = None
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(prefix=".settings-", suffix=".tmp", dir=directory)
+            with os.fdopen(fd, 'w') as f:
+                json.dump(config_data, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+            self._mtime_ns = self._stat_mtime()
+            logger.info(f"Konfiguracja zapisana w {self.path}")
+            return True
+        except (IOError, OSError) as e:
+            logger.error(f"Błąd podczas zapisywania konfiguracji do {self.path}: {e}")
+        except Exception as e:
+            logger.error(f"Nieoczekiwany błąd podczas zapisywania konfiguracji: {e}")
+        if temp_path is not None and os.path.exists(temp_path):
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+        return False
+
+
+_config_store = None
+_config_store_lock = threading.Lock()
+
+
+def get_config_store() -> ConfigStore:
+    """Zwraca wspólny magazyn konfiguracji (zmiany są zapisywane także przy zamykaniu programu)."""
+    global _config_store
+    with _config_store_lock:
+        if _config_store is None:
+            _config_store = ConfigStore()
+            atexit.register(_config_store.flush)
+        return _config_store
+
+
 def save_config(config_data: Dict[str, Any]) -> bool:
     """
     Zapisuje kompletną konfigurację do pliku JSON.
@@ -32,44 +198,18 @@ def save_config(config_data: Dict[str, Any]) -> bool:
     Returns:
         bool: True jeśli zapisano pomyślnie, False w przypadku błędu
     """
-    ensure_config_dir_exists()
-    try:
-        with open(CONFIG_FILE_PATH, 'w') as f:
-            json.dump(config_data, f, indent=4)
-        logger.info(f"Konfiguracja zapisana w {CONFIG_FILE_PATH}")
-        return True
-    except IOError as e:
-        logger.error(f"Błąd podczas zapisywania konfiguracji do {CONFIG_FILE_PATH}: {e}")
-        return False
-    except Exception as e:
-        logger.error(f"Nieoczekiwany błąd podczas zapisywania konfiguracji: {e}")
-        return False
+    store = get_config_store()
+    store.replace(config_data)
+    return store.flush()
 
 def load_config() -> Dict[str, Any]:
     """
-    Wczytuje dane konfiguracyjne z pliku JSON.
+    Zwraca kopię konfiguracji (z pamięci - plik jest czytany tylko po zmianie).
     
     Returns:
         Dict[str, Any]: Słownik z konfiguracją lub pusty słownik jeśli nie ma pliku
     """
-    ensure_config_dir_exists() # Upewnij się, że katalog istnieje nawet przy wczytywaniu
-    if not os.path.exists(CONFIG_FILE_PATH):
-        logger.warning(f"Plik konfiguracyjny {CONFIG_FILE_PATH} nie istnieje. Zwracam pustą konfigurację.")
-        return {}  # Zwróć pusty słownik, jeśli plik nie istnieje
-    try:
-        with open(CONFIG_FILE_PATH, 'r') as f:
-            config = json.load(f)
-            logger.info(f"Konfiguracja wczytana z {CONFIG_FILE_PATH}")
-            return config
-    except json.JSONDecodeError as e:
-        logger.error(f"Błąd dekodowania JSON w pliku {CONFIG_FILE_PATH}: {e}. Zwracam pustą konfigurację.")
-        return {} # Zwróć pusty słownik w przypadku błędu formatu
-    except IOError as e:
-        logger.error(f"Błąd podczas wczytywania konfiguracji z {CONFIG_FILE_PATH}: {e}")
-        return {}
-    except Exception as e:
-        logger.error(f"Nieoczekiwany błąd podczas wczytywania konfiguracji: {e}")
-        return {}
+    return get_config_store().data()
 
 def save_api_key(api_key: str) -> bool:
     """
@@ -81,9 +221,9 @@ def save_api_key(api_key: str) -> bool:
     Returns:
         bool: True jeśli zapisano pomyślnie, False w przypadku błędu
     """
-    config = load_config() # Wczytaj istniejącą konfigurację
-    config['openrouter_api_key'] = api_key
-    return save_config(config)
+    store = get_config_store()
+    store.set('openrouter_api_key', api_key)
+    return store.flush()
 
 def load_api_key() -> Optional[str]:
     """
@@ -92,8 +232,7 @@ def load_api_key() -> Optional[str]:
     Returns:
         Optional[str]: Klucz API lub None, jeśli nie ma klucza
     """
-    config = load_config()
-    return config.get('openrouter_api_key')
+    return get_config_store().get('openrouter_api_key')
 
 # Funkcje do zapisywania i wczytywania klucza OpenAI API
 def save_openai_api_key(api_key: str) -> bool:
@@ -106,9 +245,9 @@ def save_openai_api_key(api_key: str) -> bool:
     Returns:
         bool: True jeśli zapisano pomyślnie, False w przypadku błędu
     """
-    config = load_config()
-    config['openai_api_key'] = api_key
-    return save_config(config)
+    store = get_config_store()
+    store.set('openai_api_key', api_key)
+    return store.flush()
 
 def load_openai_api_key() -> Optional[str]:
     """
@@ -117,8 +256,7 @@ def load_openai_api_key() -> Optional[str]:
     Returns:
         Optional[str]: Klucz API lub None, jeśli nie ma klucza
     """
-    config = load_config()
-    return config.get('openai_api_key')
+    return get_config_store().get('openai_api_key')
 
 # Prosty test działania (można zakomentować po sprawdzeniu)
 if __name__ == '__main__':
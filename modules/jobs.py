@@ -0,0 +1,257 @@
+# X:\Aplikacje\dictaitor\modules\jobs.py
+import time
+import itertools
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Callable, Dict, List, Any
+
+logger = logging.getLogger(__name__)
+
+# Stany zadania
+JOB_PENDING = "oczekuje"
+JOB_RUNNING = "w toku"
+JOB_DONE = "zakończone"
+JOB_FAILED = "błąd"
+JOB_CANCELLED = "anulowane"
+FINISHED_STATES = (JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+
+# Domyślne limity wykonawcy
+DEFAULT_MAX_WORKERS = 3
+DEFAULT_MAX_PENDING = 4
+# Ile zakończonych zadań przechowywać na liście
+MAX_FINISHED_JOBS = 20
+
+
+class JobCancelled(Exception):
+    """Zgłaszany w zadaniu, gdy użytkownik je anulował."""
+
+
+class CancellationToken:
+    """Flaga anulowania sprawdzana przez zadanie między etapami pracy (fragmentami, wysyłkami)."""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self) -> None:
+        """Przerywa zadanie wyjątkiem JobCancelled, jeśli zostało anulowane."""
+        if self._event.is_set():
+            raise JobCancelled()
+
+    def wait(self, timeout: float) -> bool:
+        """Czeka do `timeout` s lub do anulowania. Zwraca True, jeśli zadanie anulowano."""
+        return self._event.wait(timeout)
+
+
+class Job:
+    """Zadanie wykonywane w tle: stan, postęp, czasy i token anulowania."""
+
+    def __init__(self, job_id: int, name: str, func: Callable[["Job"], Any], key: Optional[str] = None):
+        self.id = job_id
+        self.name = name
+        self.key = key
+        self.func = func
+        self.state = JOB_PENDING
+        self.progress = 0.0
+        self.message = ""
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.token = CancellationToken()
+        self.created_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._on_change: Optional[Callable[["Job"], None]] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.state in FINISHED_STATES
+
+    @property
+    def wait_seconds(self) -> float:
+        """Czas oczekiwania w kolejce."""
+        return (self.started_at or time.monotonic()) - self.created_at
+
+    @property
+    def run_seconds(self) -> float:
+        """Czas wykonywania (do teraz, jeśli zadanie trwa)."""
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    def report(self, progress: Optional[float] = None, message: Optional[str] = None) -> None:
+        """
+        Aktualizuje postęp zadania (wywoływane z wnętrza zadania).
+
+        Args:
+            progress: Postęp w zakresie 0-1 (None - bez zmian)
+            message: Opis bieżącego etapu (None - bez zmian)
+        """
+        if progress is not None:
+            self.progress = max(0.0, min(1.0, progress))
+        if message is not None:
+            self.message = message
+        self._notify()
+
+    def _notify(self) -> None:
+        if self._on_change is not None:
+            try:
+                self._on_change(self)
+            except Exception as e:
+                logger.error(f"Błąd w obsłudze zmiany zadania '{self.name}': {e}")
+
+
+class JobExecutor:
+    """
+    Ograniczona pula wątków dla zadań aplikacji.
+
+    Liczba równocześnie wykonywanych i oczekujących zadań jest ograniczona, a zadanie
+    z kluczem (np. "transcription") nie zostanie dodane, jeśli takie samo już trwa -
+    wielokrotne kliknięcia nie tworzą lawiny wątków. Wątki nie są demonami, więc
+    shutdown() pozwala zadaniom dokończyć bieżący etap zamiast przerywać je w połowie.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS, max_pending: int = DEFAULT_MAX_PENDING,
+                 on_change: Optional[Callable[[Job], None]] = None):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.on_change = on_change
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dictaitor-job")
+        self._jobs: Dict[int, Job] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._shutting_down = False
+
+    def submit(self, name: str, func: Callable[[Job], Any], key: Optional[str] = None) -> Optional[Job]:
+        """
+        Dodaje zadanie do kolejki.
+
+        Args:
+            name: Nazwa wyświetlana na liście zadań
+            func: Funkcja wywoływana jako func(job); może używać job.report() i job.token
+            key: Klucz zadania - drugie niezakończone (i nieanulowane) zadanie z tym samym kluczem
+                 jest odrzucane
+
+        Returns:
+            Optional[Job]: Zadanie lub None, jeśli zostało odrzucone (limit, duplikat, zamykanie)
+        """
+        with self._lock:
+            if self._shutting_down:
+                return None
+            active = [job for job in self._jobs.values() if not job.finished]
+            if key is not None and self._has_active_key(active, key):
+                logger.info(f"Zadanie '{name}' jest już w toku - pomijam.")
+                return None
+            if len(active) >= self.max_workers + self.max_pending:
+                logger.warning(f"Zbyt wiele zadań w kolejce - odrzucono '{name}'.")
+                return None
+            job = Job(next(self._ids), name, func, key)
+            job._on_change = self.on_change
+            self._jobs[job.id] = job
+            self._prune_finished()
+
+        self._executor.submit(self._run, job)
+        job._notify()
+        return job
+
+    def cancel(self, job_id: int) -> bool:
+        """Anuluje zadanie (oczekujące nie zostanie uruchomione, trwające przerwie się na najbliższym etapie)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or job.finished:
+            return False
+        job.token.cancel()
+        job.report(message="Anulowanie...")
+        return True
+
+    def jobs(self) -> List[Job]:
+        """Zwraca listę zadań (od najstarszego)."""
+        with self._lock:
+            return list(self._jobs.values())
+
+    def has_active(self, key: str) -> bool:
+        """Czy trwa (lub czeka w kolejce) nieanulowane zadanie o podanym kluczu."""
+        with self._lock:
+            return self._has_active_key([job for job in self._jobs.values() if not job.finished], key)
+
+    @staticmethod
+    def _has_active_key(active: List[Job], key: str) -> bool:
+        # Anulowane zadanie, które jeszcze dochodzi do punktu anulowania, nie blokuje nowego
+        return any(job.key == key and not job.token.cancelled for job in active)
+
+    def active_count(self) -> int:
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job.finished)
+
+    def shutdown(self, wait: bool = True, cancel: bool = True) -> None:
+        """
+        Zamyka wykonawcę.
+
+        Args:
+            wait: Czy czekać na zakończenie trwających zadań
+            cancel: Czy anulować oczekujące i trwające zadania
+        """
+        with self._lock:
+            self._shutting_down = True
+            jobs = list(self._jobs.values())
+        if cancel:
+            for job in jobs:
+                if not job.finished:
+                    job.token.cancel()
+        self._executor.shutdown(wait=wait, cancel_futures=cancel)
+        # Zadania usunięte z kolejki przez cancel_futures nie przeszły przez _run
+        for job in jobs:
+            if job.state == JOB_PENDING:
+                self._finish(job, JOB_CANCELLED)
+
+    def _run(self, job: Job) -> None:
+        if job.token.cancelled:
+            self._finish(job, JOB_CANCELLED)
+            return
+        job.state = JOB_RUNNING
+        job.started_at = time.monotonic()
+        job._notify()
+        try:
+            job.result = job.func(job)
+            self._finish(job, JOB_CANCELLED if job.token.cancelled else JOB_DONE)
+        except JobCancelled:
+            self._finish(job, JOB_CANCELLED)
+        except Exception as e:
+            logger.error(f"Zadanie '{job.name}' zakończone błędem: {e}")
+            job.error = str(e)
+            self._finish(job, JOB_FAILED)
+
+    def _finish(self, job: Job, state: str) -> None:
+        job.state = state
+        job.finished_at = time.monotonic()
+        if state == JOB_DONE:
+            job.progress = 1.0
+        logger.info(f"Zadanie '{job.name}': {state} (oczekiwanie {job.wait_seconds:.2f} s, "
+                    f"wykonanie {job.run_seconds:.2f} s)")
+        job._notify()
+
+    def _prune_finished(self) -> None:
+        """Usuwa najstarsze zakończone zadania ponad MAX_FINISHED_JOBS (wywoływać pod blokadą)."""
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+
+def raise_if_cancelled(token: Optional[CancellationToken]) -> None:
+    """Skrót dla funkcji przyjmujących opcjonalny token anulowania."""
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+def sleep_unless_cancelled(token: Optional[CancellationToken], seconds: float) -> None:
+    """Czeka `seconds` s; anulowanie przerywa oczekiwanie wyjątkiem JobCancelled."""
+    if token is None:
+        time.sleep(seconds)
+    elif token.wait(seconds):
+        raise JobCancelled()
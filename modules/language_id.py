@@ -0,0 +1,212 @@
+# X:\Aplikacje\dictaitor\modules\language_id.py
+import hashlib
+import threading
+import logging
+from collections import Counter
+from typing import Optional, Tuple, Dict, Callable, Union
+
+import numpy as np
+
+from modules.audio_io import MappedWav, WHISPER_SAMPLE_RATE
+from modules.vad import trim_silence
+from modules.transcription_cache import get_default_cache
+from modules import metrics
+
+logger = logging.getLogger(__name__)
+
+# Okno próbne: tyle sekund mowy z początku nagrania wystarcza do rozpoznania języka
+PROBE_SECONDS = 10.0
+# W jakiej części początku nagrania szukać mowy do okna próbnego
+PROBE_SEARCH_SECONDS = 60.0
+# Wynik mniej pewny niż ten próg nie jest używany ani zapamiętywany - język wykrywa Whisper
+MIN_PROBABILITY = 0.6
+# Nauka języka użytkownika: liczba ostatnich nagrań branych pod uwagę, minimalna liczba
+# nagrań w historii i udział najczęstszego języka, od którego uznajemy go za nauczony
+HISTORY_SIZE = 30
+LEARN_MIN_RECORDINGS = 5
+LEARN_MIN_SHARE = 0.9
+# Co które nagranie mimo nauczonego języka wykrywać go ponownie (historia nadąża za zmianami)
+LEARN_RECHECK_INTERVAL = 10
+
+# Nazwy języków zwracane przez API OpenAI (verbose_json), gdy biblioteka whisper nie jest zainstalowana
+LANGUAGE_NAME_CODES = {
+    "polish": "pl", "english": "en", "german": "de", "french": "fr", "spanish": "es",
+    "italian": "it", "russian": "ru", "ukrainian": "uk", "czech": "cs", "dutch": "nl",
+    "portuguese": "pt", "japanese": "ja", "chinese": "zh",
+}
+
+# Języki rozpoznane w tej sesji (skrót audio -> kod języka)
+_session: Dict[str, str] = {}
+_session_lock = threading.Lock()
+_learning_enabled = False
+# Liczba kolejnych nagrań, dla których użyto nauczonego języka bez detekcji
+_learned_uses = 0
+
+
+def set_language_learning_enabled(enabled: bool) -> None:
+    """Włącza używanie języka nauczonego z historii w trybie automatycznym (bez detekcji)."""
+    global _learning_enabled
+    _learning_enabled = bool(enabled)
+
+
+def language_learning_enabled() -> bool:
+    return _learning_enabled
+
+
+def normalize_language_code(language: Optional[str]) -> Optional[str]:
+    """Kod języka Whisper z kodu lub nazwy języka ("pl", "Polish" -> "pl"); None dla nieznanych."""
+    if not language:
+        return None
+    language = language.strip().lower()
+    try:
+        from whisper.tokenizer import LANGUAGES, TO_LANGUAGE_CODE
+    except ImportError:
+        return language if len(language) <= 3 else LANGUAGE_NAME_CODES.get(language)
+    if language in LANGUAGES:
+        return language
+    return TO_LANGUAGE_CODE.get(language)
+
+
+def probe_audio(audio: Union[np.ndarray, MappedWav], rate: int = WHISPER_SAMPLE_RATE) -> np.ndarray:
+    """
+    Wycina okno próbne: pierwsze PROBE_SECONDS mowy (bez pauz) z początku nagrania.
+
+    Returns:
+        np.ndarray: Próbki okna próbnego (puste, jeśli na początku nagrania nie ma mowy)
+    """
+    head = np.asarray(audio[:int(PROBE_SEARCH_SECONDS * rate)], dtype=np.float32)
+    speech, _ = trim_silence(head, rate, 2)
+    return speech[:int(PROBE_SECONDS * rate)]
+
+
+def detect_language(model, audio: np.ndarray) -> Tuple[Optional[str], float]:
+    """
+    Rozpoznaje język okna próbnego jednym przebiegiem kodera Whisper (bez dekodowania tekstu).
+
+    Args:
+        model: Załadowany model Whisper
+        audio: Próbki float32, mono, 16 kHz (np. z probe_audio)
+
+    Returns:
+        Tuple[Optional[str], float]: (kod języka, prawdopodobieństwo)
+    """
+    if not getattr(model, "is_multilingual", True):
+        return "en", 1.0
+    if len(audio) == 0:
+        return None, 0.0
+    import whisper
+    mel = whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), n_mels=model.dims.n_mels).to(model.device)
+    _, probs = model.detect_language(mel)
+    language = max(probs, key=probs.get)
+    return language, float(probs[language])
+
+
+def learned_language() -> Optional[str]:
+    """Język zdecydowanej większości ostatnich nagrań (przy włączonej nauce), inaczej None."""
+    if not _learning_enabled:
+        return None
+    cache = get_default_cache()
+    history = cache.recent_languages(HISTORY_SIZE) if cache is not None else []
+    if len(history) < LEARN_MIN_RECORDINGS:
+        return None
+    language, count = Counter(history).most_common(1)[0]
+    return language if count / len(history) >= LEARN_MIN_SHARE else None
+
+
+def known_language(audio_hash: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Język nagrania ustalony bez uruchamiania modelu.
+
+    Kolejno: język rozpoznany dla tego audio w bieżącej sesji, zapamiętany w pamięci
+    podręcznej, a przy włączonej nauce - najczęstszy język z historii (co
+    LEARN_RECHECK_INTERVAL nagrań zwracane jest None, aby ponownie wykryć język).
+
+    Args:
+        audio_hash: Skrót audio lub None
+
+    Returns:
+        Tuple[Optional[str], Optional[str]]: (kod języka, źródło: "session", "stored" lub "learned");
+                                             (None, None), jeśli język trzeba wykryć
+    """
+    global _learned_uses
+    if audio_hash:
+        with _session_lock:
+            language = _session.get(audio_hash)
+        if language:
+            return language, "session"
+        cache = get_default_cache()
+        language = cache.get_language(audio_hash) if cache is not None else None
+        if language:
+            with _session_lock:
+                _session[audio_hash] = language
+            return language, "stored"
+
+    language = learned_language()
+    if language:
+        with _session_lock:
+            _learned_uses += 1
+            recheck = _learned_uses >= LEARN_RECHECK_INTERVAL
+            if recheck:
+                _learned_uses = 0
+        if not recheck:
+            return language, "learned"
+    return None, None
+
+
+def remember_language(audio_hash: Optional[str], language: Optional[str],
+                      probability: Optional[float] = None) -> None:
+    """Zapamiętuje język nagrania w sesji i w pamięci podręcznej (trafia też do historii)."""
+    language = normalize_language_code(language)
+    if not audio_hash or not language:
+        return
+    with _session_lock:
+        _session[audio_hash] = language
+    cache = get_default_cache()
+    if cache is not None:
+        cache.put_language(audio_hash, language, probability)
+
+
+def resolve_language(audio: Union[np.ndarray, MappedWav],
+                     detector: Callable[[np.ndarray], Tuple[Optional[str], float]],
+                     audio_hash: Optional[str] = None, rate: int = WHISPER_SAMPLE_RATE) -> Optional[str]:
+    """
+    Ustala język nagrania w trybie automatycznym - raz, na krótkim oknie próbnym.
+
+    Bez tego Whisper wykrywa język przy każdym wywołaniu (a przy transkrypcji równoległej
+    w każdym fragmencie osobno). Wynik jest zapamiętywany dla skrótu audio, więc ponowna
+    transkrypcja tego samego nagrania (np. innym modelem) nie wykrywa go ponownie.
+
+    Args:
+        audio: Próbki float32, mono (lub plik zmapowany MappedWav)
+        detector: Funkcja (okno próbne) -> (kod języka, prawdopodobieństwo),
+                  np. functools.partial(detect_language, model)
+        audio_hash: Skrót audio (None - liczony z okna próbnego)
+        rate: Częstotliwość próbkowania
+
+    Returns:
+        Optional[str]: Kod języka lub None, jeśli wynik jest niepewny (język wykryje Whisper)
+    """
+    probe = None
+    if audio_hash is None:
+        probe = probe_audio(audio, rate)
+        if len(probe) == 0:
+            return None
+        audio_hash = "probe:" + hashlib.sha256(probe.tobytes()).hexdigest()
+
+    language, source = known_language(audio_hash)
+    if language is None:
+        if probe is None:
+            probe = probe_audio(audio, rate)
+        if len(probe) == 0:
+            return None
+        language, probability = detector(probe)
+        if language is None or probability < MIN_PROBABILITY:
+            logger.info(f"Niepewne rozpoznanie języka ({language}: {probability:.2f}) - język wykryje Whisper")
+            metrics.annotate(language_source="whisper")
+            return None
+        source = "probe"
+        remember_language(audio_hash, language, probability)
+
+    logger.info(f"Język nagrania: {language} (źródło: {source})")
+    metrics.annotate(language=language, language_source=source)
+    return language
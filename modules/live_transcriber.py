@@ -0,0 +1,187 @@
+# X:\Aplikacje\dictaitor\modules\live_transcriber.py
+import threading
+import time
+import logging
+from typing import Optional, Callable
+
+import numpy as np
+
+from modules.language_id import learned_language
+from modules.vad import detect_speech_frames
+
+logger = logging.getLogger(__name__)
+
+# Domyślne parametry transkrypcji na żywo
+UPDATE_INTERVAL = 1.5      # Co ile sekund odświeżać napisy
+MIN_WINDOW_SECONDS = 1.0   # Minimalna ilość nowego audio, aby uruchomić dekodowanie
+COMMIT_AFTER_SECONDS = 8.0 # Od tej długości okna zatwierdzamy wszystkie segmenty poza ostatnim
+MAX_WINDOW_SECONDS = 25.0  # Powyżej tej długości zatwierdzamy całe okno (Whisper dekoduje 30 s naraz)
+PROMPT_CHARS = 200         # Ile znaków zatwierdzonego tekstu podawać jako kontekst
+
+
+class LiveTranscriber:
+    """
+    Transkrypcja na żywo w przesuwanym oknie nad buforem AudioRecorder.
+
+    Co kilka sekund dekoduje niezatwierdzoną końcówkę nagrania załadowanym modelem
+    Whisper. Segmenty, które nie mogą się już zmienić (wszystkie poza ostatnim),
+    są zatwierdzane, a początek okna przesuwa się za nie. Dzięki temu po zatrzymaniu
+    nagrywania trzeba zdekodować jedynie ostatnie, niezatwierdzone okno.
+    """
+
+    def __init__(self, recorder, model_name: str, language: Optional[str] = None,
+                 on_update: Optional[Callable[[str, str], None]] = None,
+                 update_interval: float = UPDATE_INTERVAL):
+        """
+        Args:
+            recorder: Aktywny AudioRecorder z włączonym buforem w pamięci
+            model_name: Nazwa modelu Whisper
+            language: Kod języka lub None (język nauczony z historii, a bez niego - wykrywany
+                      przy pierwszym przebiegu)
+            on_update: Wywoływane z (tekst_zatwierdzony, tekst_niestabilny) po każdym przebiegu;
+                       wywołanie następuje w wątku roboczym
+            update_interval: Odstęp między przebiegami w sekundach
+        """
+        self.recorder = recorder
+        self.model_name = model_name
+        self.language = language or learned_language()
+        self.on_update = on_update
+        self.update_interval = update_interval
+
+        self.committed_text = ""
+        self.unstable_text = ""
+        self._committed_sample = 0
+        self._model = None
+        self._inference_lock = None
+        self._stop_event = threading.Event()
+        self._start_lock = threading.Lock()
+        self._thread = None
+
+    def start(self) -> bool:
+        """Ładuje model i uruchamia wątek napisów na żywo."""
+        from modules.local_stt import load_whisper_model, model_pool
+
+        with self._start_lock:
+            # Model jest współdzielony z innymi zadaniami - dekodowanie pod blokadą modelu
+            self._inference_lock = model_pool.inference_lock(self.model_name)
+            self._model = load_whisper_model(self.model_name)
+            if self._model is None:
+                logger.error(f"Transkrypcja na żywo niedostępna - nie załadowano modelu '{self.model_name}'.")
+                return False
+            if self._stop_event.is_set():
+                # Nagrywanie zakończyło się w trakcie ładowania modelu - finish() zdekoduje całość
+                return False
+
+            self._thread = threading.Thread(target=self._live_loop, daemon=True)
+            self._thread.start()
+        logger.info(f"Uruchomiono transkrypcję na żywo (model: {self.model_name}, język: {self.language or 'auto'})")
+        return True
+
+    def finish(self) -> Optional[str]:
+        """
+        Zatrzymuje napisy na żywo i dekoduje ostatnie niezatwierdzone okno.
+
+        Wywoływać po zatrzymaniu nagrywania.
+
+        Returns:
+            Optional[str]: Pełna transkrypcja nagrania lub None, jeśli model nie został załadowany
+        """
+        self._stop_event.set()
+        with self._start_lock:  # Poczekaj na ewentualnie trwające ładowanie modelu
+            pass
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        if self._model is None:
+            return None
+
+        total = self.recorder.get_sample_count()
+        if total - self._committed_sample > 0:
+            started = time.monotonic()
+            segments = self._decode_window(self.recorder.get_audio_array(self._committed_sample, total))
+            self._commit(" ".join(segment["text"].strip() for segment in segments))
+            logger.info(f"Zdekodowano ostatnie okno ({(total - self._committed_sample) / self.recorder.rate:.1f} s) "
+                        f"w {time.monotonic() - started:.2f} s")
+            self._committed_sample = total
+        self.unstable_text = ""
+        return self.committed_text
+
+    def stop(self) -> None:
+        """Zatrzymuje napisy na żywo bez dekodowania ostatniego okna (np. przy zamykaniu aplikacji)."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _live_loop(self) -> None:
+        while not self._stop_event.wait(self.update_interval):
+            try:
+                self._live_pass()
+            except Exception as e:
+                logger.error(f"Błąd podczas transkrypcji na żywo: {e}")
+
+    def _live_pass(self) -> None:
+        rate = self.recorder.rate
+        end = self.recorder.get_sample_count()
+        window_seconds = (end - self._committed_sample) / rate
+        if window_seconds < MIN_WINDOW_SECONDS:
+            return
+
+        audio = self.recorder.get_audio_array(self._committed_sample, end)
+        if not detect_speech_frames(audio, rate).any():
+            # Sama cisza - przesuń początek okna, aby nie rósł w czasie pauzy
+            self._skip_window(end)
+            return
+
+        segments = self._decode_window(audio)
+        if not segments:
+            if window_seconds >= MAX_WINDOW_SECONDS:
+                # Whisper nic nie rozpoznał w pełnym oknie - nie dekoduj go ponownie
+                self._skip_window(end)
+            return
+
+        if window_seconds >= MAX_WINDOW_SECONDS:
+            stable, unstable = segments, []
+        elif window_seconds >= COMMIT_AFTER_SECONDS and len(segments) > 1:
+            stable, unstable = segments[:-1], segments[-1:]
+        else:
+            stable, unstable = [], segments
+
+        if stable:
+            self._commit(" ".join(segment["text"].strip() for segment in stable))
+            committed_until = self._committed_sample + int(stable[-1]["end"] * rate)
+            self._committed_sample = min(committed_until, end)
+
+        self.unstable_text = " ".join(segment["text"].strip() for segment in unstable)
+        if self.on_update:
+            self.on_update(self.committed_text, self.unstable_text)
+
+    def _skip_window(self, end: int) -> None:
+        """Przesuwa początek okna do `end` bez zatwierdzania tekstu."""
+        self._committed_sample = end
+        if self.unstable_text:
+            self.unstable_text = ""
+            if self.on_update:
+                self.on_update(self.committed_text, self.unstable_text)
+
+    def _decode_window(self, audio: np.ndarray) -> list:
+        """Dekoduje niezatwierdzone okno nagrania (próbki float32 z get_audio_array)."""
+        options = {"fp16": False, "condition_on_previous_text": False}
+        if self.language:
+            options["language"] = self.language
+        if self.committed_text:
+            options["initial_prompt"] = self.committed_text[-PROMPT_CHARS:]
+
+        with self._inference_lock:
+            result = self._model.transcribe(audio, **options)
+        if not self.language and result.get("language"):
+            # Ustal język po pierwszym przebiegu, aby kolejne okna były spójne
+            self.language = result["language"]
+            logger.info(f"Transkrypcja na żywo - wykryty język: {self.language}")
+        return result.get("segments", [])
+
+    def _commit(self, text: str) -> None:
+        text = text.strip()
+        if text:
+            self.committed_text = f"{self.committed_text} {text}".strip()
@@ -1,52 +1,426 @@
 # X:\Aplikacje\dictaitor\modules\local_stt.py
 import os
+import gc
+import importlib.util
+import time
+import threading
 import logging
-from typing import Optional, Tuple, List
+from collections import OrderedDict
+from functools import partial
+from typing import Optional, Tuple, List, Dict, Any, Callable
+
+import numpy as np
+
+from modules.audio_io import load_audio, read_wav_info, MappedWav, WHISPER_SAMPLE_RATE
+from modules.vad import trim_silence
+from modules.transcription_cache import get_default_cache
+from modules.capabilities import load_cached_capabilities, probe_capabilities
+from modules.jobs import JobCancelled, CancellationToken, raise_if_cancelled
+from modules.thread_tuning import apply_thread_settings
+from modules.language_id import resolve_language, detect_language, remember_language
+from modules import metrics
 
 logger = logging.getLogger(__name__)
 
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Przyrostek nazwy modelu z dynamiczną kwantyzacją int8 warstw liniowych (np. "small-int8").
+# Na CPU zwykle przyspiesza transkrypcję i zmniejsza zużycie pamięci kosztem niewielkiej utraty dokładności.
+QUANTIZED_SUFFIX = "-int8"
+# Skwantyzowane modele zapisane na dysku - kolejne ładowania pomijają konwersję
+QUANTIZED_MODELS_DIR = os.path.join(APP_DIR, "config", "quantized_models")
+
 # Dostępne modele Whisper (od najmniejszego/najszybszego do największego/najdokładniejszego)
 # Dodano model 'turbo', który jest szybszy niż 'large' i bardzo dokładny
-AVAILABLE_WHISPER_MODELS = ["tiny", "base", "small", "medium", "large", "large-v2", "large-v3", "turbo"]
+BASE_WHISPER_MODELS = ["tiny", "base", "small", "medium", "large", "large-v2", "large-v3", "turbo"]
+AVAILABLE_WHISPER_MODELS = BASE_WHISPER_MODELS + [name + QUANTIZED_SUFFIX for name in BASE_WHISPER_MODELS]
+
+# Domyślne limity puli modeli: budżet pamięci na wszystkie załadowane modele
+# oraz czas bezczynności, po którym model jest zwalniany (0 - nigdy)
+DEFAULT_MODEL_MEMORY_BUDGET_MB = 4096
+DEFAULT_MODEL_IDLE_TIMEOUT = 30 * 60
+# Transkrypcja wsadowa: liczba nagrań w jednym przebiegu kodera/dekodera i maksymalna
+# długość nagrania (jedno okno Whisper) - dłuższe są transkrybowane pojedynczo
+DEFAULT_BATCH_SIZE = 8
+BATCH_MAX_SECONDS = 30.0
+# Progi jak w model.transcribe: wynik partii podejrzany o zapętlenie lub niepewny jest
+# liczony ponownie pojedynczo (z podnoszeniem temperatury), a cisza daje pusty tekst
+COMPRESSION_RATIO_THRESHOLD = 2.4
+LOGPROB_THRESHOLD = -1.0
+NO_SPEECH_THRESHOLD = 0.6
+
+# Przybliżony rozmiar modeli w pamięci (MB), gdy nie da się go zmierzyć
+MODEL_SIZE_ESTIMATES_MB = {
+    "tiny": 75, "base": 145, "small": 480, "medium": 1500,
+    "large": 3000, "large-v2": 3000, "large-v3": 3000, "turbo": 1600,
+}
+
+# Dostępność Whisper jest sprawdzana bez importu whisper/torch: wyniki pełnego sprawdzenia
+# są przechowywane w config/capabilities.json (zob. refresh_capabilities)
+_capabilities = load_cached_capabilities()
+
+def _apply_capabilities(capabilities: Optional[Dict[str, Any]]) -> None:
+    """Ustawia WHISPER_INSTALLED i AVAILABLE_WHISPER_MODELS na podstawie wyników sprawdzenia."""
+    global WHISPER_INSTALLED, AVAILABLE_WHISPER_MODELS
+    if capabilities is None:
+        # Brak zapisanych wyników - zakładamy, że zainstalowana biblioteka działa
+        WHISPER_INSTALLED = importlib.util.find_spec("whisper") is not None
+    else:
+        WHISPER_INSTALLED = capabilities["whisper_importable"]
+        whisper_available_models = capabilities["whisper_models"]
+        # Sprawdź czy model turbo jest dostępny w zainstalowanej wersji
+        if WHISPER_INSTALLED and "turbo" not in whisper_available_models and "turbo" in AVAILABLE_WHISPER_MODELS:
+            logger.info("Model 'turbo' nie jest dostępny w tej wersji Whisper. Dostępne modele: " + ", ".join(whisper_available_models))
+            # Warianty "-int8" nie występują w whisper.available_models() - sprawdzamy model bazowy
+            AVAILABLE_WHISPER_MODELS = [model for model in AVAILABLE_WHISPER_MODELS
+                                        if model.removesuffix(QUANTIZED_SUFFIX) in whisper_available_models]
+
+    if WHISPER_INSTALLED:
+        logger.info("Biblioteka Whisper jest dostępna. Dostępne modele: " + ", ".join(AVAILABLE_WHISPER_MODELS))
+    else:
+        error = capabilities.get("whisper_error") if capabilities else None
+        logger.warning(f"Biblioteka Whisper nie jest zainstalowana. Lokalna transkrypcja nie będzie dostępna. Błąd: {error or 'brak modułu whisper'}")
+
+_apply_capabilities(_capabilities)
+
+def capabilities_cached() -> bool:
+    """Czy dostępność Whisper pochodzi z aktualnego pełnego sprawdzenia (a nie z założenia)."""
+    return _capabilities is not None
+
+def refresh_capabilities() -> List[str]:
+    """
+    Wykonuje pełne sprawdzenie dostępności Whisper (importując whisper i torch),
+    zapisuje je w config/capabilities.json i aktualizuje stan modułu.
+
+    Trwa kilka sekund - wywoływać w tle.
+
+    Returns:
+        List[str]: Dostępne modele (jak get_available_models)
+    """
+    global _capabilities
+    _capabilities = probe_capabilities()
+    _apply_capabilities(_capabilities)
+    return get_available_models()
+
+class WhisperModelPool:
+    """
+    Pula załadowanych modeli Whisper.
+
+    Trzyma kilka modeli jednocześnie w granicach budżetu pamięci - przy jego
+    przekroczeniu zwalnia najdawniej używane. Modele nieużywane dłużej niż
+    idle_timeout są zwalniane w tle.
+
+    Model z puli jest współdzielony przez wątki (transkrypcje, napisy na żywo, rozgrzewanie),
+    a model.transcribe / whisper.decode instalują haki pamięci kv na jego modułach - każde
+    wywołanie modelu musi odbywać się pod inference_lock(nazwa).
+    """
+
+    def __init__(self, memory_budget_mb: int = DEFAULT_MODEL_MEMORY_BUDGET_MB,
+                 idle_timeout: float = DEFAULT_MODEL_IDLE_TIMEOUT):
+        self.memory_budget_mb = memory_budget_mb
+        self.idle_timeout = idle_timeout
+        # nazwa -> [model, rozmiar w bajtach, czas ostatniego użycia]; kolejność = od najdawniej używanego
+        self._models: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.RLock()
+        # Modele w trakcie ładowania: nazwa -> zdarzenie ustawiane po zakończeniu
+        self._loading: Dict[str, threading.Event] = {}
+        # Blokady inferencji: nazwa -> blokada (zachowywana także po zwolnieniu modelu)
+        self._inference_locks: Dict[str, threading.Lock] = {}
+        self._reaper_thread = None
+
+    def get(self, model_name: str):
+        """
+        Zwraca model, ładując go, jeśli nie ma go w puli.
+
+        Args:
+            model_name: Nazwa modelu Whisper
 
-# Globalna zmienna do przechowywania załadowanego modelu, aby nie ładować go wielokrotnie
-_loaded_model = None
-_current_model_name = None
+        Returns:
+            Model Whisper lub None w przypadku błędu
+        """
+        while True:
+            with self._lock:
+                model = self._touch(model_name)
+                if model is not None:
+                    logger.info(f"Model Whisper '{model_name}' jest już załadowany.")
+                    return model
+                in_flight = self._loading.get(model_name)
+                if in_flight is None:
+                    loaded_event = self._loading[model_name] = threading.Event()
+                    break
+            # Ten model już się ładuje (np. w tle przy starcie) - poczekaj zamiast ładować drugi raz
+            logger.info(f"Oczekiwanie na trwające ładowanie modelu Whisper '{model_name}'...")
+            in_flight.wait()
+            with self._lock:
+                if model_name not in self._models:
+                    return None  # Ładowanie się nie powiodło
 
-# Sprawdź czy Whisper jest dostępny i które modele są zainstalowane
-try:
+        try:
+            logger.info(f"Ładowanie modelu Whisper: '{model_name}'... To może chwilę potrwać przy pierwszym uruchomieniu.")
+            started = time.monotonic()
+            model = _load_model(model_name)
+            size = _model_memory_bytes(model, model_name)
+            with self._lock:
+                self._models[model_name] = [model, size, time.monotonic()]
+                self._evict_over_budget(keep=model_name)
+                pooled = ", ".join(self._models)
+            logger.info(f"Model Whisper '{model_name}' załadowany pomyślnie w {time.monotonic() - started:.1f} s "
+                        f"({size / 2**20:.0f} MB, w puli: {pooled})")
+        except Exception as e:
+            logger.error(f"Nie udało się załadować modelu Whisper '{model_name}': {e}")
+            model = None
+        finally:
+            with self._lock:
+                del self._loading[model_name]
+            loaded_event.set()
+
+        if model is not None:
+            self._start_reaper()
+        return model
+
+    def inference_lock(self, model_name: str) -> threading.Lock:
+        """Blokada, pod którą wolno wywoływać model z puli (jedno wywołanie modelu naraz)."""
+        with self._lock:
+            lock = self._inference_locks.get(model_name)
+            if lock is None:
+                lock = self._inference_locks[model_name] = threading.Lock()
+            return lock
+
+    def is_loaded(self, model_name: str) -> bool:
+        """Czy model jest już w puli (bez czekania na trwające ładowanie)."""
+        with self._lock:
+            return model_name in self._models
+
+    def unload(self, model_name: Optional[str] = None) -> None:
+        """Zwalnia wskazany model lub wszystkie modele (model_name=None)."""
+        with self._lock:
+            names = [model_name] if model_name else list(self._models)
+            for name in names:
+                if self._models.pop(name, None) is not None:
+                    logger.info(f"Zwolniono model Whisper '{name}'")
+        _release_memory()
+
+    def loaded_models(self) -> List[Dict[str, Any]]:
+        """
+        Zwraca informacje o załadowanych modelach (od najdawniej używanego).
+
+        Returns:
+            List[Dict[str, Any]]: {"name", "memory_mb", "idle_seconds"} dla każdego modelu
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {"name": name, "memory_mb": round(size / 2**20, 1), "idle_seconds": round(now - last_used, 1)}
+                for name, (_, size, last_used) in self._models.items()
+            ]
+
+    def _touch(self, model_name: str):
+        """Zwraca model z puli i oznacza go jako ostatnio używany."""
+        with self._lock:
+            entry = self._models.get(model_name)
+            if entry is None:
+                return None
+            entry[2] = time.monotonic()
+            self._models.move_to_end(model_name)
+            return entry[0]
+
+    def _evict_over_budget(self, keep: str) -> None:
+        """Zwalnia najdawniej używane modele, dopóki suma rozmiarów przekracza budżet."""
+        budget = self.memory_budget_mb * 2**20
+        evicted = False
+        while sum(size for _, size, _ in self._models.values()) > budget:
+            name = next((name for name in self._models if name != keep), None)
+            if name is None:
+                logger.warning(f"Model '{keep}' sam przekracza budżet pamięci puli ({self.memory_budget_mb} MB)")
+                break
+            del self._models[name]
+            evicted = True
+            logger.info(f"Zwolniono model Whisper '{name}' (przekroczony budżet {self.memory_budget_mb} MB)")
+        if evicted:
+            _release_memory()
+
+    def _start_reaper(self) -> None:
+        """Uruchamia wątek zwalniający bezczynne modele (jeden na pulę)."""
+        with self._lock:
+            if self._reaper_thread is not None or not self.idle_timeout:
+                return
+            self._reaper_thread = threading.Thread(target=self._reaper_loop, daemon=True)
+            self._reaper_thread.start()
+
+    def _reaper_loop(self) -> None:
+        while True:
+            time.sleep(max(1.0, min(60.0, self.idle_timeout / 4)) if self.idle_timeout else 60.0)
+            if not self.idle_timeout:
+                continue
+            now = time.monotonic()
+            with self._lock:
+                idle = [name for name, (_, _, last_used) in self._models.items()
+                        if now - last_used > self.idle_timeout]
+            for name in idle:
+                logger.info(f"Model Whisper '{name}' nieużywany od ponad {self.idle_timeout / 60:.0f} min")
+                self.unload(name)
+
+
+def is_quantized_model(model_name: str) -> bool:
+    """Czy nazwa oznacza wariant modelu z kwantyzacją int8."""
+    return model_name.endswith(QUANTIZED_SUFFIX)
+
+
+def base_model_name(model_name: str) -> str:
+    """Nazwa modelu Whisper bez przyrostka kwantyzacji ("small-int8" -> "small")."""
+    return model_name[:-len(QUANTIZED_SUFFIX)] if is_quantized_model(model_name) else model_name
+
+
+def is_multilingual_model(model_name: str) -> bool:
+    """Czy model rozpoznaje wiele języków (modele ".en" transkrybują tylko po angielsku)."""
+    return not base_model_name(model_name).endswith(".en")
+
+
+def _load_model(model_name: str):
+    """Ładuje model Whisper lub jego wariant int8 (bez użycia puli)."""
+    if is_quantized_model(model_name):
+        return _load_quantized_model(base_model_name(model_name))
+    # Import odroczony - whisper ładuje torch, co trwa kilka sekund
     import whisper
-    
-    # Sprawdź czy model turbo jest dostępny w zainstalowanej wersji
+    # Modele są pobierane automatycznie przy pierwszym użyciu i cache'owane
+    # Domyślny katalog cache: ~/.cache/whisper
+    return whisper.load_model(model_name)
+
+
+def quantized_model_path(model_name: str) -> str:
+    """
+    Ścieżka pliku ze skwantyzowanym modelem.
+
+    Nazwa zawiera wersje whisper i torch - plik zapisany przez inne wersje nie jest używany.
+    """
+    import torch
+    import whisper
+    torch_version = torch.__version__.split("+")[0]
+    whisper_version = getattr(whisper, "__version__", "0")
+    return os.path.join(QUANTIZED_MODELS_DIR,
+                        f"{base_model_name(model_name)}{QUANTIZED_SUFFIX}-whisper{whisper_version}-torch{torch_version}.pt")
+
+
+def quantize_model(model):
+    """
+    Zamienia warstwy liniowe modelu na dynamicznie kwantyzowane int8 (tylko CPU).
+
+    Wagi są przechowywane jako int8, a aktywacje kwantyzowane w locie przy każdym
+    mnożeniu. Osadzenia, normalizacje i splot wejściowy pozostają w float32.
+
+    Args:
+        model: Model Whisper załadowany na CPU
+
+    Returns:
+        Skwantyzowany model
+    """
+    import torch
+    from torch import nn
+
+    # Whisper używa własnej podklasy nn.Linear, której quantize_dynamic nie rozpoznaje -
+    # na CPU w float32 działa ona tak samo jak nn.Linear, więc podmieniamy ją przed kwantyzacją
+    for module in list(model.modules()):
+        for name, child in list(module.named_children()):
+            if isinstance(child, nn.Linear) and type(child) is not nn.Linear:
+                linear = nn.Linear(child.in_features, child.out_features, bias=child.bias is not None, device="meta")
+                linear.weight = child.weight
+                linear.bias = child.bias
+                setattr(module, name, linear)
+    model.eval()
+    return torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+
+def _load_quantized_model(model_name: str):
+    """
+    Ładuje model int8 z dysku, a jeśli go nie ma - kwantyzuje model float32 i zapisuje wynik.
+
+    Args:
+        model_name: Nazwa modelu Whisper (bez przyrostka)
+    """
+    import torch
+    import whisper
+
+    path = quantized_model_path(model_name)
+    if os.path.isfile(path):
+        try:
+            model = torch.load(path, map_location="cpu", weights_only=False)
+            logger.info(f"Wczytano skwantyzowany model '{model_name}' z {path}")
+            return model
+        except Exception as e:
+            logger.warning(f"Nie można wczytać skwantyzowanego modelu {path}: {e} - kwantyzuję ponownie")
+
+    model = whisper.load_model(model_name, device="cpu")
+    started = time.monotonic()
+    model = quantize_model(model)
+    logger.info(f"Kwantyzacja int8 modelu '{model_name}' trwała {time.monotonic() - started:.1f} s")
+    _save_quantized_model(model, path)
+    return model
+
+
+def _save_quantized_model(model, path: str) -> None:
+    """Zapisuje skwantyzowany model atomowo i usuwa pliki tego modelu z innych wersji bibliotek."""
+    import torch
+
+    prefix = os.path.basename(path).split("-whisper")[0] + "-whisper"
+    temp_path = path + ".tmp"
     try:
-        whisper_available_models = whisper.available_models()
-        if "turbo" not in whisper_available_models and "turbo" in AVAILABLE_WHISPER_MODELS:
-            logger.info("Model 'turbo' nie jest dostępny w tej wersji Whisper. Dostępne modele: " + ", ".join(whisper_available_models))
-            # Możemy tutaj zaktualizować listę dostępnych modeli, usuwając te niedostępne
-            AVAILABLE_WHISPER_MODELS = [model for model in AVAILABLE_WHISPER_MODELS if model in whisper_available_models]
+        os.makedirs(QUANTIZED_MODELS_DIR, exist_ok=True)
+        torch.save(model, temp_path)
+        os.replace(temp_path, path)
+        for name in os.listdir(QUANTIZED_MODELS_DIR):
+            if name.startswith(prefix) and name != os.path.basename(path):
+                os.remove(os.path.join(QUANTIZED_MODELS_DIR, name))
+        logger.info(f"Zapisano skwantyzowany model w {path}")
     except Exception as e:
-        logger.warning(f"Nie można pobrać listy dostępnych modeli Whisper: {e}")
-    
-    WHISPER_INSTALLED = True
-    logger.info("Biblioteka Whisper jest dostępna. Dostępne modele: " + ", ".join(AVAILABLE_WHISPER_MODELS))
-except ImportError as e:
-    WHISPER_INSTALLED = False
-    logger.warning(f"Biblioteka Whisper nie jest zainstalowana. Lokalna transkrypcja nie będzie dostępna. Błąd: {str(e)}")
+        logger.warning(f"Nie można zapisać skwantyzowanego modelu {path}: {e}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def _model_memory_bytes(model, model_name: str) -> int:
+    """Rozmiar modelu w pamięci: suma parametrów, buforów i wag int8 (lub przybliżenie z tabeli)."""
+    try:
+        tensors = list(model.parameters()) + list(model.buffers())
+        for module in model.modules():
+            # Wagi warstw skwantyzowanych nie są parametrami - są spakowane w _packed_params
+            packed = getattr(module, "_packed_params", None)
+            if packed is not None and hasattr(packed, "_weight_bias"):
+                tensors.extend(tensor for tensor in packed._weight_bias() if tensor is not None)
+        size = sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+        if size:
+            return size
+    except Exception:
+        pass
+    estimate_mb = MODEL_SIZE_ESTIMATES_MB.get(base_model_name(model_name), 0)
+    # Wagi int8 zajmują około czwartej części float32 (osadzenia zostają w float32)
+    return (estimate_mb // 3 if is_quantized_model(model_name) else estimate_mb) * 2**20
+
+
+def _release_memory() -> None:
+    """Oddaje pamięć zwolnionych modeli (także pamięć GPU, jeśli jest używana)."""
+    gc.collect()
+    try:
+        import torch
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    except ImportError:
+        pass
+
+
+# Wspólna pula modeli, aby nie ładować ich wielokrotnie
+model_pool = WhisperModelPool()
+
 
 def load_whisper_model(model_name: str = "base"):
     """
     Ładuje określony model Whisper.
-    Ponowne wywołanie z tą samą nazwą modelu nie będzie go ładować ponownie.
+    Modele są przechowywane w puli (model_pool) - ponowne wywołanie z tą samą
+    nazwą modelu nie będzie go ładować ponownie. Nazwa z przyrostkiem "-int8"
+    (np. "small-int8") ładuje wariant z dynamiczną kwantyzacją int8 na CPU.
     """
-    global _loaded_model, _current_model_name
-    
     if not WHISPER_INSTALLED:
         logger.error("Próba załadowania modelu Whisper, ale biblioteka nie jest zainstalowana")
         return None
-        
-    if _loaded_model is not None and _current_model_name == model_name:
-        logger.info(f"Model Whisper '{model_name}' jest już załadowany.")
-        return _loaded_model
     
     if model_name not in AVAILABLE_WHISPER_MODELS:
         logger.error(f"Nieznany model Whisper: {model_name}. Dostępne: {AVAILABLE_WHISPER_MODELS}")
@@ -59,19 +433,53 @@ def load_whisper_model(model_name: str = "base"):
             model_name = "base" 
             logger.warning(f"Używam domyślnego modelu Whisper: '{model_name}'")
 
+    return model_pool.get(model_name)
+
+def warm_up_model(model_name: str, cancel_token: Optional[CancellationToken] = None) -> bool:
+    """
+    Ładuje model i wykonuje krótką transkrypcję ciszy, aby rozgrzać jądra obliczeniowe i alokatory.
+
+    Przeznaczone do wywołania w tle (np. przy starcie aplikacji). Transkrypcje
+    zlecone w trakcie ładowania czekają na nie zamiast ładować model ponownie.
+    Jeśli model jest już używany (np. przez transkrypcję, która czekała na to samo
+    ładowanie), rozgrzewanie jest pomijane - nie czeka na zwolnienie modelu.
+
+    Args:
+        model_name: Nazwa modelu Whisper
+        cancel_token: Token anulowania sprawdzany przed ładowaniem i przed rozgrzewaniem
+
+    Returns:
+        bool: True, jeśli model jest gotowy do użycia
+    """
+    if not WHISPER_INSTALLED:
+        return False
+    if model_pool.is_loaded(model_name):
+        return True  # Model był już używany - nie trzeba go rozgrzewać
+
+    raise_if_cancelled(cancel_token)
+    model = load_whisper_model(model_name)
+    if model is None:
+        return False
+    raise_if_cancelled(cancel_token)
+    inference_lock = model_pool.inference_lock(model_name)
+    if not inference_lock.acquire(blocking=False):
+        logger.info(f"Model Whisper '{model_name}' jest już używany - pomijam rozgrzewanie")
+        return True
     try:
-        logger.info(f"Ładowanie modelu Whisper: '{model_name}'... To może chwilę potrwać przy pierwszym uruchomieniu.")
-        # Modele są pobierane automatycznie przy pierwszym użyciu i cache'owane
-        # Domyślny katalog cache: ~/.cache/whisper
-        _loaded_model = whisper.load_model(model_name)
-        _current_model_name = model_name
-        logger.info(f"Model Whisper '{model_name}' załadowany pomyślnie.")
-        return _loaded_model
+        started = time.monotonic()
+        options = _build_transcribe_options("en")
+        model.transcribe(np.zeros(WHISPER_SAMPLE_RATE, dtype=np.float32), temperature=0.0,
+                         condition_on_previous_text=False, **options)
+        logger.info(f"Rozgrzano model Whisper '{model_name}' w {time.monotonic() - started:.2f} s")
     except Exception as e:
-        logger.error(f"Nie udało się załadować modelu Whisper '{model_name}': {e}")
-        _loaded_model = None # Zresetuj w przypadku błędu
-        _current_model_name = None
-        return None
+        logger.warning(f"Rozgrzewanie modelu Whisper '{model_name}' nie powiodło się: {e}")
+    finally:
+        inference_lock.release()
+    return True
+
+def get_loaded_models() -> List[Dict[str, Any]]:
+    """Zwraca listę załadowanych modeli wraz z zajmowaną pamięcią (zob. WhisperModelPool.loaded_models)."""
+    return model_pool.loaded_models()
 
 def get_available_models() -> List[str]:
     """
@@ -82,12 +490,13 @@ def get_available_models() -> List[str]:
     """
     if not WHISPER_INSTALLED:
         return []
-        
-    try:
-        return whisper.available_models()
-    except Exception as e:
-        logger.error(f"Błąd podczas pobierania dostępnych modeli: {e}")
-        return AVAILABLE_WHISPER_MODELS
+    
+    # Lista z zapisanego sprawdzenia; bez niego - lista domyślna (bez importu whisper)
+    if _capabilities and _capabilities.get("whisper_models"):
+        models = list(_capabilities["whisper_models"])
+        # Warianty int8 tylko dla głównych modeli - bez nich lista byłaby dwa razy dłuższa
+        return models + [name + QUANTIZED_SUFFIX for name in BASE_WHISPER_MODELS if name in models]
+    return AVAILABLE_WHISPER_MODELS
 
 def normalize_path(path: str) -> str:
     """
@@ -111,15 +520,30 @@ def normalize_path(path: str) -> str:
     logger.info(f"Plik zweryfikowany - istnieje: {normalized_path}")
     return normalized_path
 
-def transcribe_audio_local(audio_file_path: str, model_name: str = "turbo", language: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]:
+def transcribe_audio_local(audio_file_path: str, model_name: str = "turbo", language: Optional[str] = None,
+                           vad_aggressiveness: int = 0, workers: int = 1,
+                           threads_per_worker: int = 0, use_cache: bool = True,
+                           cancel_token: Optional[CancellationToken] = None,
+                           progress_callback: Optional[Callable[[float, str], None]] = None) -> Tuple[Optional[str], Optional[str]]:
     """
     Przeprowadza transkrypcję pliku audio przy użyciu lokalnego modelu Whisper.
 
+    Wynik jest zapisywany w pamięci podręcznej transkrypcji. Ponowna transkrypcja
+    niezmienionego pliku (lub tego samego dźwięku z innego pliku) zwraca zapisany tekst.
+    Długie pliki WAV transkrybowane równolegle nie są wczytywane w całości - są mapowane
+    do pamięci i dekodowane fragmentami.
+
     Args:
         audio_file_path (str): Ścieżka do pliku audio.
         model_name (str): Nazwa modelu Whisper do użycia (np. "tiny", "base", "turbo").
         language (Optional[str]): Kod języka (np. "en", "pl") do transkrypcji. 
                                  Jeśli None, Whisper spróbuje wykryć automatycznie.
+        vad_aggressiveness (int): Poziom usuwania ciszy przed transkrypcją (0 - wyłączone, 1-3).
+        workers (int): Liczba procesów dla długich nagrań (1 - bez podziału na fragmenty).
+        threads_per_worker (int): Wątki obliczeniowe na proces (0 - automatycznie).
+        use_cache (bool): Czy korzystać z pamięci podręcznej transkrypcji.
+        cancel_token (Optional[CancellationToken]): Token anulowania sprawdzany między etapami.
+        progress_callback (Optional[Callable]): Wywoływane z (postęp 0-1, opis etapu).
 
     Returns:
         Tuple[Optional[str], Optional[str]]: (transkrypcja, błąd_wiadomość)
@@ -127,51 +551,58 @@ def transcribe_audio_local(audio_file_path: str, model_name: str = "turbo", lang
     if not WHISPER_INSTALLED:
         return None, "Biblioteka Whisper nie jest zainstalowana. Zainstaluj używając: pip install openai-whisper"
         
+    audio = None
     try:
         # Normalizuj ścieżkę do pliku
-        normalized_path = normalize_path(audio_file_path)
+        with metrics.stage("normalize_path"):
+            normalized_path = normalize_path(audio_file_path)
+        metrics.annotate(bytes=os.path.getsize(normalized_path))
         
         # Dodatkowe logowanie
         logger.info(f"Ścieżka znormalizowana: {normalized_path}")
         logger.info(f"Rozmiar pliku: {os.path.getsize(normalized_path) / 1024:.2f} KB")
         
-        model = load_whisper_model(model_name)
-        if model is None:
-            return None, f"Nie udało się załadować modelu Whisper '{model_name}'."
-
         logger.info(f"Rozpoczynanie lokalnej transkrypcji pliku: {normalized_path} (model: {model_name}, język: {language or 'auto'})")
         
-        # Opcje transkrypcji
-        transcribe_options = {"fp16": False} # Ustaw na True, jeśli masz GPU NVIDII i CUDA
-        if language:
-            transcribe_options["language"] = language
-        
         # Sprawdź jeszcze raz przed przekazaniem do Whisper
         if not os.path.exists(normalized_path):
             raise FileNotFoundError(f"Plik zniknął przed transkrypcją: {normalized_path}")
             
-        # Spróbuj alternatywne podejście z wczytywaniem przez librosa, jeśli jest dostępne
-        try:
-            import librosa
-            logger.info("Wczytywanie pliku audio przez librosa")
-            audio, sr = librosa.load(normalized_path, sr=16000, mono=True)
-            # Użyj metody transcribe na tablicy audio
-            result = model.transcribe(audio, **transcribe_options)
-        except ImportError:
-            # Jeśli nie ma librosa, użyj standardowej metody
-            logger.info("Użycie standardowej metody wczytywania audio")
-            result = model.transcribe(normalized_path, **transcribe_options)
-        except Exception as e:
-            # W przypadku błędu wczytywania przez librosa, użyj standardowej metody
-            logger.warning(f"Błąd wczytywania przez librosa: {e}, próbuję standardową metodę")
-            result = model.transcribe(normalized_path, **transcribe_options)
-        
-        transcription = result["text"]
-        
-        detected_lang = result.get("language", "nie wykryto")
-        logger.info(f"Lokalna transkrypcja zakończona. Wykryty język: {detected_lang}.")
-        return transcription.strip(), None
+        _report(progress_callback, 0.0, "Dekodowanie audio")
+        cache = get_default_cache() if use_cache else None
+        cache_key = None
+        audio_hash = None
+        if cache is not None:
+            # Skrót audio niezmienionego pliku jest zapamiętany - nie trzeba go ponownie dekodować
+            audio_hash = cache.lookup_file_hash(normalized_path)
+            if audio_hash is None:
+                with metrics.stage("load_audio"):
+                    audio = _open_audio_file(normalized_path, workers)
+                with metrics.stage("cache_lookup"):
+                    audio_hash = cache.audio_hash(audio)
+                    cache.remember_file_hash(normalized_path, audio_hash)
+            with metrics.stage("cache_lookup"):
+                cache_key, cached_text = _lookup_cache(cache, audio_hash, model_name, language, vad_aggressiveness)
+            if cached_text is not None:
+                return cached_text, None
+
+        if audio is None:
+            with metrics.stage("load_audio"):
+                audio = _open_audio_file(normalized_path, workers)
+        metrics.annotate(audio_seconds=len(audio) / WHISPER_SAMPLE_RATE)
+        result, error_msg = _run_transcription(model_name, audio, language, vad_aggressiveness,
+                                               workers, threads_per_worker, cancel_token, progress_callback,
+                                               audio_hash)
+        if error_msg:
+            return None, error_msg
+        transcript = _extract_transcription(result)
+        if cache_key is not None:
+            cache.put(cache_key, transcript, "local", model_name, language)
+        return transcript, None
         
+    except JobCancelled:
+        logger.info("Lokalna transkrypcja anulowana.")
+        raise
     except FileNotFoundError as e:
         error_msg = f"Nie można znaleźć pliku audio: {e}"
         logger.error(error_msg)
@@ -179,4 +610,378 @@ def transcribe_audio_local(audio_file_path: str, model_name: str = "turbo", lang
     except Exception as e:
         error_msg = f"Błąd podczas lokalnej transkrypcji pliku {audio_file_path}: {e}"
         logger.error(error_msg)
-        return None, error_msg
\ No newline at end of file
+        return None, error_msg
+    finally:
+        if isinstance(audio, MappedWav):
+            audio.close()
+
+def _open_audio_file(path: str, workers: int) -> Any:
+    """
+    Wczytuje plik audio do transkrypcji.
+
+    Długi plik WAV, który i tak trafi do transkrypcji równoległej, jest tylko mapowany
+    do pamięci (MappedWav) - fragmenty są dekodowane dopiero przed wysłaniem do procesów.
+
+    Returns:
+        np.ndarray lub MappedWav: Próbki mono 16 kHz
+    """
+    from modules.parallel_stt import PARALLEL_MIN_DURATION
+    if workers > 1:
+        info = read_wav_info(path)
+        if info is not None and info.supported and info.frames and info.duration >= PARALLEL_MIN_DURATION:
+            logger.info(f"Długi plik WAV ({info.duration / 60:.0f} min) - odczyt fragmentami przez mapowanie pamięci")
+            return MappedWav(path)
+    return load_audio(path)
+
+def transcribe_array_local(audio: Any, model_name: str = "turbo", language: Optional[str] = None,
+                           vad_aggressiveness: int = 0, workers: int = 1,
+                           threads_per_worker: int = 0, use_cache: bool = True,
+                           cancel_token: Optional[CancellationToken] = None,
+                           progress_callback: Optional[Callable[[float, str], None]] = None) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Przeprowadza transkrypcję próbek audio przekazanych bezpośrednio z pamięci.
+
+    Pomija zapis i dekodowanie pliku - próbki trafiają wprost do modelu.
+
+    Args:
+        audio (np.ndarray): Próbki audio float32, mono, 16 kHz, w zakresie [-1, 1].
+        model_name (str): Nazwa modelu Whisper do użycia.
+        language (Optional[str]): Kod języka lub None dla automatycznego wykrywania.
+        vad_aggressiveness (int): Poziom usuwania ciszy przed transkrypcją (0 - wyłączone, 1-3).
+        workers (int): Liczba procesów dla długich nagrań (1 - bez podziału na fragmenty).
+        threads_per_worker (int): Wątki obliczeniowe na proces (0 - automatycznie).
+        use_cache (bool): Czy korzystać z pamięci podręcznej transkrypcji.
+        cancel_token (Optional[CancellationToken]): Token anulowania sprawdzany między etapami.
+        progress_callback (Optional[Callable]): Wywoływane z (postęp 0-1, opis etapu).
+
+    Returns:
+        Tuple[Optional[str], Optional[str]]: (transkrypcja, błąd_wiadomość)
+    """
+    if not WHISPER_INSTALLED:
+        return None, "Biblioteka Whisper nie jest zainstalowana. Zainstaluj używając: pip install openai-whisper"
+
+    if audio is None or len(audio) == 0:
+        return None, "Brak danych audio do transkrypcji."
+
+    try:
+        logger.info(f"Rozpoczynanie lokalnej transkrypcji z pamięci: {len(audio) / WHISPER_SAMPLE_RATE:.2f} s audio (model: {model_name}, język: {language or 'auto'})")
+        metrics.annotate(audio_seconds=len(audio) / WHISPER_SAMPLE_RATE)
+        cache = get_default_cache() if use_cache else None
+        cache_key = None
+        audio_hash = None
+        if cache is not None:
+            with metrics.stage("cache_lookup"):
+                audio_hash = cache.audio_hash(audio)
+                cache_key, cached_text = _lookup_cache(cache, audio_hash, model_name, language, vad_aggressiveness)
+            if cached_text is not None:
+                return cached_text, None
+
+        result, error_msg = _run_transcription(model_name, audio, language, vad_aggressiveness,
+                                               workers, threads_per_worker, cancel_token, progress_callback,
+                                               audio_hash)
+        if error_msg:
+            return None, error_msg
+        transcript = _extract_transcription(result)
+        if cache_key is not None:
+            cache.put(cache_key, transcript, "local", model_name, language)
+        return transcript, None
+
+    except JobCancelled:
+        logger.info("Lokalna transkrypcja anulowana.")
+        raise
+    except Exception as e:
+        error_msg = f"Błąd podczas lokalnej transkrypcji nagrania z pamięci: {e}"
+        logger.error(error_msg)
+        return None, error_msg
+
+def transcribe_batch_local(clips: List[Any], model_name: str = "turbo", language: Optional[str] = None,
+                           vad_aggressiveness: int = 0, batch_size: int = DEFAULT_BATCH_SIZE,
+                           use_cache: bool = True, cancel_token: Optional[CancellationToken] = None,
+                           progress_callback: Optional[Callable[[float, str], None]] = None) -> List[Tuple[Optional[str], Optional[str]]]:
+    """
+    Transkrybuje wiele krótkich nagrań naraz - partiami w jednym przebiegu kodera i dekodera.
+
+    Zamiast osobnego model.transcribe dla każdego nagrania (pełny przebieg kodera na oknie
+    30 s i sekwencyjne dekodowanie) spektrogramy partii są łączone w jeden tensor, a dekoder
+    generuje tekst wszystkich nagrań jednocześnie; nagranie, które skończyło się wcześniej,
+    czeka tylko na zakończenie partii. Nagrania dłuższe niż BATCH_MAX_SECONDS i wyniki
+    niepewne (progi jak w model.transcribe) są transkrybowane pojedynczo.
+
+    Args:
+        clips (List): Ścieżki plików audio lub tablice float32 (mono, 16 kHz).
+        model_name (str): Nazwa modelu Whisper do użycia.
+        language (Optional[str]): Kod języka lub None (wykrywany osobno dla każdego nagrania).
+        vad_aggressiveness (int): Poziom usuwania ciszy przed transkrypcją (0 - wyłączone, 1-3).
+        batch_size (int): Liczba nagrań w jednym przebiegu modelu.
+        use_cache (bool): Czy korzystać z pamięci podręcznej transkrypcji.
+        cancel_token (Optional[CancellationToken]): Token anulowania sprawdzany między partiami.
+        progress_callback (Optional[Callable]): Wywoływane z (postęp 0-1, opis etapu).
+
+    Returns:
+        List[Tuple[Optional[str], Optional[str]]]: (transkrypcja, błąd_wiadomość) dla każdego
+                                                   nagrania, w kolejności wejściowej
+    """
+    outcomes = transcribe_batch_local_detailed(clips, model_name, language, vad_aggressiveness, batch_size,
+                                               use_cache, cancel_token, progress_callback)
+    return [(result["text"] if result is not None else None, error) for result, error in outcomes]
+
+def transcribe_batch_local_detailed(clips: List[Any], model_name: str = "turbo", language: Optional[str] = None,
+                                    vad_aggressiveness: int = 0, batch_size: int = DEFAULT_BATCH_SIZE,
+                                    use_cache: bool = True, cancel_token: Optional[CancellationToken] = None,
+                                    progress_callback: Optional[Callable[[float, str], None]] = None
+                                    ) -> List[Tuple[Optional[dict], Optional[str]]]:
+    """
+    Jak transcribe_batch_local, ale z językiem każdego nagrania.
+
+    W trybie automatycznym język pochodzi z detekcji Whisper w przebiegu partii (bez
+    dodatkowego przebiegu kodera), a dla wyniku z pamięci podręcznej - z zapamiętanego
+    języka nagrania. Wykryty język jest zapamiętywany (modules.language_id).
+
+    Returns:
+        List[Tuple[Optional[dict], Optional[str]]]: ({"text", "language"}, błąd_wiadomość) dla
+                                                    każdego nagrania, w kolejności wejściowej
+    """
+    if not WHISPER_INSTALLED:
+        error = "Biblioteka Whisper nie jest zainstalowana. Zainstaluj używając: pip install openai-whisper"
+        return [(None, error)] * len(clips)
+
+    results: List[Tuple[Optional[dict], Optional[str]]] = [(None, None)] * len(clips)
+    cache = get_default_cache() if use_cache else None
+    cache_keys: Dict[int, str] = {}
+    audio_hashes: Dict[int, str] = {}
+    # Indeks nagrania -> próbki do transkrypcji
+    pending: Dict[int, np.ndarray] = {}
+
+    _report(progress_callback, 0.0, "Dekodowanie audio")
+    for index, clip in enumerate(clips):
+        try:
+            if isinstance(clip, str):
+                with metrics.stage("load_audio"):
+                    audio = load_audio(normalize_path(clip))
+            else:
+                audio = clip
+            if cache is not None:
+                audio_hashes[index] = cache.audio_hash(audio)
+                with metrics.stage("cache_lookup"):
+                    cache_keys[index], cached_text = _lookup_cache(cache, audio_hashes[index], model_name,
+                                                                   language, vad_aggressiveness)
+                if cached_text is not None:
+                    results[index] = ({"text": cached_text,
+                                       "language": language or cache.get_language(audio_hashes[index])}, None)
+                    continue
+            if vad_aggressiveness:
+                with metrics.stage("vad"):
+                    audio, _ = trim_silence(audio, WHISPER_SAMPLE_RATE, vad_aggressiveness)
+            if len(audio) == 0:
+                results[index] = ({"text": "", "language": language}, None)
+                continue
+            pending[index] = audio
+        except Exception as e:
+            error_msg = f"Błąd podczas wczytywania nagrania {clip if isinstance(clip, str) else index}: {e}"
+            logger.error(error_msg)
+            results[index] = (None, error_msg)
+
+    if pending:
+        metrics.annotate(audio_seconds=sum(len(audio) for audio in pending.values()) / WHISPER_SAMPLE_RATE)
+        _report(progress_callback, 0.1, f"Ładowanie modelu {model_name}")
+        with metrics.stage("model_load"):
+            model = load_whisper_model(model_name)
+        if model is None:
+            error_msg = f"Nie udało się załadować modelu Whisper '{model_name}'."
+            for index in pending:
+                results[index] = (None, error_msg)
+            return results
+        apply_thread_settings(model_name)
+
+        # Podobna długość nagrań w partii - podobna liczba kroków dekodera
+        short = sorted((index for index, audio in pending.items()
+                        if len(audio) <= BATCH_MAX_SECONDS * WHISPER_SAMPLE_RATE),
+                       key=lambda index: len(pending[index]))
+        batches = [short[start:start + max(1, batch_size)] for start in range(0, len(short), max(1, batch_size))]
+        batched = set(short)
+        batches += [[index] for index in pending if index not in batched]
+        logger.info(f"Transkrypcja wsadowa: {len(pending)} nagrań w {len(batches)} partiach (model: {model_name}, "
+                    f"język: {language or 'auto'})")
+
+        done = 0
+        for batch in batches:
+            raise_if_cancelled(cancel_token)
+            try:
+                with metrics.stage("inference_batch"), model_pool.inference_lock(model_name):
+                    decoded = _transcribe_batch(model, [pending[index] for index in batch], language)
+                for index, (text, detected) in zip(batch, decoded):
+                    results[index] = ({"text": text, "language": language or detected}, None)
+                    if index in cache_keys:
+                        cache.put(cache_keys[index], text, "local", model_name, language)
+                    if language is None and index in audio_hashes:
+                        remember_language(audio_hashes[index], detected)
+            except JobCancelled:
+                raise
+            except Exception as e:
+                error_msg = f"Błąd podczas transkrypcji wsadowej: {e}"
+                logger.error(error_msg)
+                for index in batch:
+                    results[index] = (None, error_msg)
+            done += len(batch)
+            _report(progress_callback, 0.1 + 0.9 * done / len(pending), f"Nagrania {done}/{len(pending)}")
+        metrics.count("batch_items", len(pending))
+    return results
+
+def _transcribe_batch(model, audios: List[np.ndarray], language: Optional[str]) -> List[Tuple[str, Optional[str]]]:
+    """
+    Transkrybuje partię nagrań (każde najwyżej jedno okno 30 s) jednym wywołaniem whisper.decode.
+    Wywoływać pod model_pool.inference_lock modelu.
+
+    Returns:
+        List[Tuple[str, Optional[str]]]: (tekst, język) w kolejności nagrań
+    """
+    if len(audios) == 1 and len(audios[0]) > BATCH_MAX_SECONDS * WHISPER_SAMPLE_RATE:
+        result = model.transcribe(audios[0], **_build_transcribe_options(language))
+        return [(_extract_transcription(result), result.get("language"))]
+
+    import torch
+    import whisper
+
+    n_mels = model.dims.n_mels
+    mel = torch.stack([whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), n_mels=n_mels) for audio in audios])
+    options = whisper.DecodingOptions(language=language, temperature=0.0, without_timestamps=True, fp16=False)
+    decoded = whisper.decode(model, mel.to(model.device), options)
+
+    outcomes = []
+    for audio, result in zip(audios, decoded):
+        if result.no_speech_prob > NO_SPEECH_THRESHOLD and result.avg_logprob < LOGPROB_THRESHOLD:
+            outcomes.append(("", result.language))
+        elif result.compression_ratio > COMPRESSION_RATIO_THRESHOLD or result.avg_logprob < LOGPROB_THRESHOLD:
+            # Zapętlenie lub niepewny wynik - pełna procedura z podnoszeniem temperatury
+            single = model.transcribe(audio, **_build_transcribe_options(language))
+            outcomes.append((_extract_transcription(single), single.get("language")))
+        else:
+            outcomes.append((result.text.strip(), result.language))
+    return outcomes
+
+def _lookup_cache(cache, audio_hash: str, model_name: str, language: Optional[str],
+                  vad_aggressiveness: int) -> Tuple[str, Optional[str]]:
+    """
+    Sprawdza pamięć podręczną dla lokalnej transkrypcji.
+
+    Returns:
+        Tuple[str, Optional[str]]: (klucz wpisu, zapisana transkrypcja lub None)
+    """
+    cache_key = cache.make_key(audio_hash, "local", model_name, language, {"vad": vad_aggressiveness})
+    cached_text = cache.get(cache_key)
+    metrics.annotate(cache_hit=cached_text is not None)
+    if cached_text is not None:
+        logger.info(f"Transkrypcja pobrana z pamięci podręcznej (model: {model_name}, język: {language or 'auto'})")
+    return cache_key, cached_text
+
+def _run_transcription(model_name: str, audio: Any, language: Optional[str], vad_aggressiveness: int = 0,
+                       workers: int = 1, threads_per_worker: int = 0,
+                       cancel_token: Optional[CancellationToken] = None,
+                       progress_callback: Optional[Callable[[float, str], None]] = None,
+                       audio_hash: Optional[str] = None) -> Tuple[Optional[dict], Optional[str]]:
+    """
+    Uruchamia transkrypcję tablicy audio, opcjonalnie po usunięciu ciszy.
+
+    W trybie automatycznym (language None) język jest ustalany raz, na krótkim oknie
+    próbnym (modules.language_id) i zapamiętywany dla skrótu audio (audio_hash).
+
+    Długie nagrania (co najmniej PARALLEL_MIN_DURATION) przy workers > 1 są dzielone
+    na fragmenty i transkrybowane równolegle w puli procesów. Znaczniki czasu
+    segmentów w wyniku odnoszą się zawsze do oryginalnego audio. Anulowanie (cancel_token)
+    jest sprawdzane między etapami, między fragmentami transkrypcji równoległej i przed
+    dekodowaniem każdego okna 30 s transkrypcji w jednym procesie.
+
+    Returns:
+        Tuple[Optional[dict], Optional[str]]: (wynik w formacie model.transcribe, błąd_wiadomość)
+    """
+    raise_if_cancelled(cancel_token)
+    timestamp_map = None
+    if vad_aggressiveness:
+        _report(progress_callback, 0.05, "Usuwanie ciszy")
+        with metrics.stage("vad"):
+            audio, timestamp_map = trim_silence(audio, WHISPER_SAMPLE_RATE, vad_aggressiveness)
+        if len(audio) == 0:
+            # Sama cisza - nie uruchamiaj modelu (Whisper ma skłonność do halucynacji)
+            return {"text": "", "segments": [], "language": language}, None
+
+    raise_if_cancelled(cancel_token)
+    from modules.parallel_stt import transcribe_parallel, detect_language_parallel, PARALLEL_MIN_DURATION
+    if workers > 1 and len(audio) / WHISPER_SAMPLE_RATE >= PARALLEL_MIN_DURATION:
+        if language is None and is_multilingual_model(model_name):
+            # Jedna detekcja w procesie roboczym zamiast osobnej w każdym fragmencie
+            with metrics.stage("language_id"):
+                language = resolve_language(audio, partial(detect_language_parallel, model_name=model_name,
+                                                            workers=workers, threads_per_worker=threads_per_worker),
+                                            audio_hash)
+        with metrics.stage("inference_parallel"):
+            result = transcribe_parallel(audio, model_name, language, workers, threads_per_worker,
+                                         cancel_token=cancel_token, progress_callback=progress_callback)
+    else:
+        if isinstance(audio, MappedWav):
+            audio = audio.read()
+        _report(progress_callback, 0.1, f"Ładowanie modelu {model_name}")
+        with metrics.stage("model_load"):
+            model = load_whisper_model(model_name)
+        if model is None:
+            return None, f"Nie udało się załadować modelu Whisper '{model_name}'."
+        # Liczba wątków z kalibracji (dictaitor_tune.py); bez niej - ustawienia torch bez zmian
+        apply_thread_settings(model_name)
+        with model_pool.inference_lock(model_name):
+            if language is None and is_multilingual_model(model_name):
+                with metrics.stage("language_id"):
+                    language = resolve_language(audio, partial(detect_language, model), audio_hash)
+            raise_if_cancelled(cancel_token)
+            _report(progress_callback, 0.2, "Transkrypcja")
+            with metrics.stage("inference"):
+                result = _transcribe_cancellable(model, audio, language, cancel_token)
+    raise_if_cancelled(cancel_token)
+
+    if timestamp_map is not None:
+        timestamp_map.remap_segments(result.get("segments", []))
+    return result, None
+
+def _transcribe_cancellable(model, audio: np.ndarray, language: Optional[str],
+                            cancel_token: Optional[CancellationToken] = None) -> dict:
+    """
+    model.transcribe z anulowaniem sprawdzanym przed dekodowaniem każdego okna 30 s.
+
+    model.transcribe wywołuje model.decode dla każdego okna (także przy ponownych próbach
+    z wyższą temperaturą) - na czas wywołania jest on opakowany na instancji modelu.
+    Wywoływać pod model_pool.inference_lock modelu.
+
+    Returns:
+        dict: Wynik model.transcribe
+    """
+    options = _build_transcribe_options(language)
+    if cancel_token is None:
+        return model.transcribe(audio, **options)
+
+    decode = model.decode
+
+    def cancellable_decode(*args, **kwargs):
+        raise_if_cancelled(cancel_token)
+        return decode(*args, **kwargs)
+
+    model.decode = cancellable_decode
+    try:
+        return model.transcribe(audio, **options)
+    finally:
+        del model.decode
+
+def _report(progress_callback: Optional[Callable[[float, str], None]], progress: float, message: str) -> None:
+    """Przekazuje postęp do wywołującego (jeśli podał funkcję zwrotną)."""
+    if progress_callback is not None:
+        progress_callback(progress, message)
+
+def _build_transcribe_options(language: Optional[str]) -> dict:
+    """Buduje opcje przekazywane do model.transcribe."""
+    transcribe_options = {"fp16": False} # Ustaw na True, jeśli masz GPU NVIDII i CUDA
+    if language:
+        transcribe_options["language"] = language
+    return transcribe_options
+
+def _extract_transcription(result: dict) -> str:
+    """Wyciąga tekst z wyniku Whisper i loguje wykryty język."""
+    detected_lang = result.get("language", "nie wykryto")
+    logger.info(f"Lokalna transkrypcja zakończona. Wykryty język: {detected_lang}.")
+    return result["text"].strip()
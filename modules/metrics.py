@@ -0,0 +1,331 @@
+# X:\Aplikacje\dictaitor\modules\metrics.py
+import os
+import json
+import time
+import threading
+import logging
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Dict, Any, List, Callable, Iterator
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_DIR = os.path.join(APP_DIR, "config")
+METRICS_PATH = os.path.join(CONFIG_DIR, "metrics.jsonl")
+
+# Rotacja pliku metryk: metrics.jsonl, metrics.jsonl.1, ... metrics.jsonl.N
+MAX_METRICS_FILE_BYTES = 5 * 1024 * 1024
+METRICS_BACKUP_COUNT = 3
+# Przedziały histogramu czasu całego zadania (s) - do wyliczania p50/p95 w Prometheusie
+LATENCY_BUCKETS = (0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+# Port endpointu z metrykami w formacie Prometheus (aplikacja okienkowa)
+DEFAULT_METRICS_HOST = "127.0.0.1"
+DEFAULT_METRICS_PORT = 9464
+
+# Pomiar aktywny w bieżącym wątku - funkcje modułów dopisują do niego etapy bez przekazywania parametru
+_local = threading.local()
+
+
+class JobTimer:
+    """
+    Pomiar jednego zadania: czasy etapów, dane o nagraniu i wynik.
+
+    Etapy o tej samej nazwie są sumowane. Zadanie aktywowane w wątku (activate())
+    zbiera etapy zgłaszane przez metrics.stage() w kodzie local_stt, audio_recorder itd.
+    """
+
+    def __init__(self, backend: str, model: Optional[str] = None, source: Optional[str] = None,
+                 recorder: Optional["MetricsRecorder"] = None):
+        self.started = time.perf_counter()
+        self.record: Dict[str, Any] = {"backend": backend, "model": model, "source": source, "stages": {}}
+        self.completed = False
+        self._recorder = recorder
+        self._finished = False
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Mierzy czas bloku jako etap `name`."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(name, time.perf_counter() - started)
+
+    def add_stage(self, name: str, seconds: float) -> None:
+        with self._lock:
+            stages = self.record["stages"]
+            stages[name] = stages.get(name, 0.0) + seconds
+
+    def annotate(self, **fields: Any) -> None:
+        """Dopisuje pola rekordu (np. audio_seconds, bytes, cache_hit)."""
+        with self._lock:
+            self.record.update(fields)
+
+    def count(self, name: str, value: float = 1) -> None:
+        """Zwiększa pole liczbowe rekordu (np. bajty wysłane przez kilka wątków)."""
+        with self._lock:
+            self.record[name] = self.record.get(name, 0) + value
+
+    @contextmanager
+    def activate(self) -> Iterator["JobTimer"]:
+        """Ustawia pomiar jako bieżący w tym wątku na czas bloku."""
+        previous = getattr(_local, "timer", None)
+        _local.timer = self
+        try:
+            yield self
+        finally:
+            _local.timer = previous
+
+    def complete(self, error: Optional[str] = None) -> None:
+        """Oznacza wynik zadania (pierwsze wywołanie wygrywa); zapis następuje w finish()."""
+        with self._lock:
+            if self.completed:
+                return
+            self.completed = True
+            self.record["error"] = error
+
+    def finish(self, error: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Zamyka pomiar i zapisuje rekord do pliku metryk (tylko raz).
+
+        Returns:
+            Dict[str, Any]: Rekord zadania
+        """
+        self.complete(error)
+        with self._lock:
+            if self._finished:
+                return self.record
+            self._finished = True
+            self.record["total_seconds"] = time.perf_counter() - self.started
+            self.record["timestamp"] = datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+            record = dict(self.record, stages=dict(self.record["stages"]))
+        recorder = self._recorder or get_metrics_recorder()
+        if recorder is not None:
+            recorder.write(record)
+        return record
+
+
+def current_timer() -> Optional[JobTimer]:
+    """Pomiar aktywny w bieżącym wątku (None, jeśli zadanie nie jest mierzone)."""
+    return getattr(_local, "timer", None)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Mierzy blok jako etap bieżącego pomiaru (bez pomiaru - nic nie robi)."""
+    timer = current_timer()
+    if timer is None:
+        yield
+        return
+    with timer.stage(name):
+        yield
+
+
+def annotate(**fields: Any) -> None:
+    """Dopisuje pola do bieżącego pomiaru, jeśli istnieje."""
+    timer = current_timer()
+    if timer is not None:
+        timer.annotate(**fields)
+
+
+def count(name: str, value: float = 1) -> None:
+    """Zwiększa pole liczbowe bieżącego pomiaru, jeśli istnieje."""
+    timer = current_timer()
+    if timer is not None:
+        timer.count(name, value)
+
+
+def bind_timer(func: Callable) -> Callable:
+    """
+    Zwraca funkcję, która w dowolnym wątku (np. puli wysyłania) działa z pomiarem wątku wywołującego.
+    """
+    timer = current_timer()
+    if timer is None:
+        return func
+
+    def bound(*args, **kwargs):
+        with timer.activate():
+            return func(*args, **kwargs)
+    return bound
+
+
+class MetricsRecorder:
+    """
+    Zapisuje rekordy zadań do rotowanego pliku JSONL i agreguje je do formatu Prometheus.
+    """
+
+    def __init__(self, path: str = METRICS_PATH, max_bytes: int = MAX_METRICS_FILE_BYTES,
+                 backup_count: int = METRICS_BACKUP_COUNT):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, int] = {}
+        self._errors: Dict[str, int] = {}
+        self._audio_seconds: Dict[str, float] = {}
+        self._latency: Dict[str, List[int]] = {}
+        self._latency_sum: Dict[str, float] = {}
+        self._stage_seconds: Dict[tuple, float] = {}
+        self._stage_count: Dict[tuple, int] = {}
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def write(self, record: Dict[str, Any]) -> None:
+        """Dopisuje rekord do pliku (z rotacją) i do agregatów."""
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            self._aggregate(record)
+            try:
+                if os.path.exists(self.path) and os.path.getsize(self.path) + len(line) > self.max_bytes:
+                    self._rotate()
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line)
+            except OSError as e:
+                logger.error(f"Nie można zapisać metryk do {self.path}: {e}")
+
+    def _rotate(self) -> None:
+        """Przesuwa metrics.jsonl -> .1 -> .2 ...; najstarszy plik jest usuwany."""
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def _aggregate(self, record: Dict[str, Any]) -> None:
+        backend = str(record.get("backend"))
+        self._jobs[backend] = self._jobs.get(backend, 0) + 1
+        if record.get("error"):
+            self._errors[backend] = self._errors.get(backend, 0) + 1
+        self._audio_seconds[backend] = self._audio_seconds.get(backend, 0.0) + (record.get("audio_seconds") or 0.0)
+
+        total = record.get("total_seconds", 0.0)
+        buckets = self._latency.setdefault(backend, [0] * len(LATENCY_BUCKETS))
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if total <= bound:
+                buckets[index] += 1
+        self._latency_sum[backend] = self._latency_sum.get(backend, 0.0) + total
+
+        for name, seconds in record.get("stages", {}).items():
+            key = (backend, name)
+            self._stage_seconds[key] = self._stage_seconds.get(key, 0.0) + seconds
+            self._stage_count[key] = self._stage_count.get(key, 0) + 1
+
+    def prometheus_text(self, extra: Optional[Dict[str, float]] = None) -> str:
+        """
+        Zwraca agregaty w formacie tekstowym Prometheus.
+
+        Args:
+            extra: Dodatkowe wartości typu gauge (nazwa metryki -> wartość), np. głębokość kolejki serwera
+        """
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str, samples: List[tuple]) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{_escape_label(val)}"' for key, val in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+        with self._lock:
+            metric("dictaitor_jobs_total", "counter", "Zakończone zadania transkrypcji.",
+                   [({"backend": b}, n) for b, n in self._jobs.items()])
+            metric("dictaitor_job_errors_total", "counter", "Zadania zakończone błędem.",
+                   [({"backend": b}, n) for b, n in self._errors.items()])
+            metric("dictaitor_audio_seconds_total", "counter", "Przetworzone audio w sekundach.",
+                   [({"backend": b}, round(s, 3)) for b, s in self._audio_seconds.items()])
+
+            histogram = []
+            for backend, buckets in self._latency.items():
+                for bound, value in zip(LATENCY_BUCKETS, buckets):
+                    histogram.append(({"backend": backend, "le": bound}, value))
+                histogram.append(({"backend": backend, "le": "+Inf"}, self._jobs[backend]))
+            lines.append("# HELP dictaitor_job_latency_seconds Czas zadania od zlecenia do wyniku w schowku.")
+            lines.append("# TYPE dictaitor_job_latency_seconds histogram")
+            for labels, value in histogram:
+                lines.append(f'dictaitor_job_latency_seconds_bucket{{backend="{labels["backend"]}",'
+                             f'le="{labels["le"]}"}} {value}')
+            for backend, total in self._latency_sum.items():
+                lines.append(f'dictaitor_job_latency_seconds_sum{{backend="{backend}"}} {round(total, 6)}')
+                lines.append(f'dictaitor_job_latency_seconds_count{{backend="{backend}"}} {self._jobs[backend]}')
+
+            metric("dictaitor_stage_seconds_total", "counter", "Łączny czas etapów zadań.",
+                   [({"backend": b, "stage": s}, round(v, 6)) for (b, s), v in self._stage_seconds.items()])
+            metric("dictaitor_stage_count_total", "counter", "Liczba zmierzonych etapów.",
+                   [({"backend": b, "stage": s}, n) for (b, s), n in self._stage_count.items()])
+
+        for name, value in (extra or {}).items():
+            metric(name, "gauge", name, [({}, value)])
+        return "\n".join(lines) + "\n"
+
+
+def _escape_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    """Udostępnia GET /metrics w formacie Prometheus."""
+
+    def do_GET(self) -> None:
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = self.server.recorder.prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        logger.debug(f"{self.address_string()} - {format % args}")
+
+
+def start_metrics_server(recorder: "MetricsRecorder", host: str = DEFAULT_METRICS_HOST,
+                         port: int = DEFAULT_METRICS_PORT) -> Optional[ThreadingHTTPServer]:
+    """
+    Uruchamia w tle lokalny endpoint /metrics (format Prometheus).
+
+    Returns:
+        Optional[ThreadingHTTPServer]: Serwer lub None, jeśli nie udało się zająć portu
+    """
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsRequestHandler)
+    except OSError as e:
+        logger.error(f"Nie można uruchomić endpointu metryk na {host}:{port}: {e}")
+        return None
+    server.daemon_threads = True
+    server.recorder = recorder
+    threading.Thread(target=server.serve_forever, name="dictaitor-metrics", daemon=True).start()
+    logger.info(f"Metryki Prometheus dostępne pod http://{host}:{port}/metrics")
+    return server
+
+
+_recorder: Optional[MetricsRecorder] = None
+_recorder_lock = threading.Lock()
+_enabled = True
+
+
+def set_metrics_enabled(enabled: bool) -> None:
+    """Włącza lub wyłącza zapisywanie metryk przez get_metrics_recorder()."""
+    global _enabled
+    _enabled = enabled
+
+
+def get_metrics_recorder() -> Optional[MetricsRecorder]:
+    """Zwraca współdzielony zapis metryk aplikacji (None, jeśli wyłączony lub niedostępny)."""
+    global _recorder
+    if not _enabled:
+        return None
+    with _recorder_lock:
+        if _recorder is None:
+            try:
+                _recorder = MetricsRecorder()
+            except OSError as e:
+                logger.error(f"Nie można przygotować pliku metryk {METRICS_PATH}: {e}")
+                return None
+        return _recorder
@@ -1,16 +1,39 @@
 # X:\Aplikacje\dictaitor\modules\openai_whisper_client.py
-import requests
 import os
 import json
+import wave
 import logging
-from typing import Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Optional, Tuple, List, Union, Callable, TYPE_CHECKING
+
+import numpy as np
+
+from modules.audio_io import load_audio, encode_audio, WHISPER_SAMPLE_RATE, DEFAULT_BITRATE_KBPS, UPLOAD_CODECS
+from modules.vad import trim_silence
+from modules.parallel_stt import split_at_silence
+from modules.transcription_cache import get_default_cache
+from modules.language_id import known_language, remember_language, normalize_language_code
+from modules.jobs import JobCancelled, CancellationToken, raise_if_cancelled, sleep_unless_cancelled
+from modules import metrics
+
+if TYPE_CHECKING:
+    import requests
 
 logger = logging.getLogger(__name__)
 
+# Jak często (s) sprawdzać anulowanie w trakcie oczekiwania na wysyłane fragmenty
+CANCEL_CHECK_INTERVAL = 0.2
+
 class OpenAIWhisperClient:
     """Klient do komunikacji z API OpenAI Whisper dla transkrypcji audio."""
     
     API_URL = "https://api.openai.com/v1/audio/transcriptions"
+    MODEL_NAME = "whisper-1"  # OpenAI ma tylko jeden model Whisper dostępny przez API
+    
+    # Limit rozmiaru pliku przyjmowanego przez API
+    MAX_UPLOAD_BYTES = 25 * 1024 * 1024
+    # Kody HTTP, po których warto ponowić wysyłanie fragmentu
+    RETRYABLE_STATUS_CODES = (408, 409, 429, 500, 502, 503, 504)
     
     def __init__(self, api_key: Optional[str] = None):
         """
@@ -21,6 +44,20 @@ class OpenAIWhisperClient:
         """
         self.api_key = api_key
         self.debug_mode = False
+        # Poziom usuwania ciszy przed wysłaniem (0 - wyłączone, 1-3)
+        self.vad_aggressiveness = 0
+        # Długie nagrania są dzielone w miejscach ciszy i wysyłane równolegle
+        self.max_segment_seconds = 300
+        self.max_parallel_uploads = 4
+        self.max_retries = 2
+        # Limit czasu żądania: wartość bazowa + dodatkowe sekundy na każdy MB
+        self.request_timeout = 60
+        self.timeout_per_mb = 10
+        # Kompresja nagrań WAV w pamięci przed wysłaniem: "wav" (bez kompresji), "flac", "opus", "mp3"
+        self.upload_codec = "wav"
+        self.upload_bitrate_kbps = DEFAULT_BITRATE_KBPS
+        # Wyniki są zapisywane w pamięci podręcznej wspólnej z lokalną transkrypcją
+        self.use_cache = True
     
     def update_api_key(self, api_key: str) -> bool:
         """
@@ -37,17 +74,36 @@ class OpenAIWhisperClient:
             return True
         return False
     
-    def transcribe_audio(self, audio_file_path: str, language: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]:
+    def transcribe_audio(self, audio_file_path: str, language: Optional[str] = None,
+                         cancel_token: Optional[CancellationToken] = None,
+                         progress_callback: Optional[Callable[[float, str], None]] = None) -> Tuple[Optional[str], Optional[str]]:
         """
         Wykonuje transkrypcję pliku audio przy użyciu API OpenAI Whisper.
         
+        Krótkie pliki są wysyłane bez zmian. Pliki przekraczające limit rozmiaru API
+        lub dłuższe niż max_segment_seconds (a także wszystkie pliki przy włączonym
+        usuwaniu ciszy) są dekodowane, dzielone w miejscach ciszy i wysyłane równolegle.
+        Przy wybranym upload_codec nagrania WAV są kompresowane w pamięci tuż przed wysłaniem.
+        Przed wysłaniem sprawdzana jest pamięć podręczna transkrypcji (use_cache).
+        W trybie automatycznym (language None) używany jest język znany już dla tego
+        nagrania lub nauczony z historii (modules.language_id); jeśli go brak, język
+        wykryty przez API jest zapamiętywany dla kolejnych wywołań.
+        
         Args:
             audio_file_path: Ścieżka do pliku audio
             language: Opcjonalny kod języka (np. "pl", "en")
+            cancel_token: Token anulowania sprawdzany przed wysłaniem każdego fragmentu
+            progress_callback: Wywoływane z (postęp 0-1, opis) po każdym wysłanym fragmencie
             
         Returns:
             Tuple[Optional[str], Optional[str]]: (transkrypcja, komunikat_błędu)
+            
+        Raises:
+            JobCancelled: Jeśli transkrypcja została anulowana
         """
+        # Import odroczony - requests nie jest potrzebny do uruchomienia aplikacji
+        import requests
+        
         if not self.api_key:
             logger.error("Brak klucza API OpenAI")
             return None, "Brak klucza API OpenAI. Ustaw klucz API w konfiguracji."
@@ -56,91 +112,332 @@ class OpenAIWhisperClient:
             logger.error(f"Plik audio nie istnieje: {audio_file_path}")
             return None, f"Plik audio nie istnieje: {os.path.basename(audio_file_path)}"
             
+        file_size = os.path.getsize(audio_file_path)
+        metrics.annotate(bytes=file_size)
         if self.debug_mode:
-            file_size_mb = os.path.getsize(audio_file_path) / (1024 * 1024)
             logger.info(f"Informacje o pliku audio:")
             logger.info(f"- Ścieżka: {audio_file_path}")
-            logger.info(f"- Rozmiar: {file_size_mb:.2f} MB")
+            logger.info(f"- Rozmiar: {file_size / (1024 * 1024):.2f} MB")
         
         try:
-            headers = {
-                "Authorization": f"Bearer {self.api_key}"
-            }
-            
-            # Przygotowanie danych formularza
-            data = {
-                "model": "whisper-1",  # OpenAI ma tylko jeden model Whisper dostępny przez API
-                "response_format": "text"
-            }
-            
-            # Dodaj język, jeśli został określony
-            if language:
-                data["language"] = language
-            
-            # Otwórz plik audio do przesłania
-            files = {
-                "file": (os.path.basename(audio_file_path), open(audio_file_path, "rb"))
-            }
+            audio = None
+            cache = get_default_cache() if self.use_cache else None
+            cache_key = None
+            audio_hash = None
+            if cache is not None:
+                audio_hash = cache.lookup_file_hash(audio_file_path)
+                if audio_hash is None:
+                    with metrics.stage("load_audio"):
+                        audio = load_audio(audio_file_path)
+                    with metrics.stage("cache_lookup"):
+                        audio_hash = cache.audio_hash(audio)
+                        cache.remember_file_hash(audio_file_path, audio_hash)
+                with metrics.stage("cache_lookup"):
+                    cache_key = cache.make_key(audio_hash, "openai", self.MODEL_NAME, language, self._cache_options())
+                    cached_text = cache.get(cache_key)
+                metrics.annotate(cache_hit=cached_text is not None)
+                if cached_text is not None:
+                    logger.info("Transkrypcja pobrana z pamięci podręcznej - pomijam wysyłanie do API.")
+                    return cached_text, None
             
-            if self.debug_mode:
-                logger.info(f"Wysyłanie żądania transkrypcji do API Whisper...")
-                logger.info(f"URL API: {self.API_URL}")
-                logger.info(f"Parametry: {data}")
-            
-            # Wyślij żądanie
-            response = requests.post(
-                self.API_URL,
-                headers=headers,
-                data=data,
-                files=files,
-                timeout=60
-            )
-            
-            # Zamknij plik
-            files["file"][1].close()
-            
-            if self.debug_mode:
-                logger.info(f"Status odpowiedzi: {response.status_code}")
-                try:
-                    logger.info(f"Nagłówki odpowiedzi: {dict(response.headers)}")
-                except:
-                    pass
-            
-            # Sprawdź, czy żądanie się powiodło
-            response.raise_for_status()
-            
-            # Transkrypcja może być zwrócona jako tekst lub JSON, w zależności od response_format
-            content_type = response.headers.get("Content-Type", "")
+            if not self._needs_decoding(audio_file_path, file_size):
+                # Wczytaj plik audio do przesłania (mieści się w limicie API)
+                with open(audio_file_path, "rb") as audio_file:
+                    segments = [(os.path.basename(audio_file_path), audio_file.read())]
+            else:
+                with metrics.stage("prepare_segments"):
+                    segments = self._prepare_segments(audio_file_path, audio)
+                if not segments:
+                    logger.info("Nagranie nie zawiera mowy - pomijam wysyłanie do API.")
+                    return "", None
             
-            if "application/json" in content_type:
-                result = response.json()
-                if "text" in result:
-                    return result["text"], None
+            raise_if_cancelled(cancel_token)
+            metrics.annotate(segments=len(segments))
+            upload_language = language
+            detected_languages = None
+            if language is None:
+                upload_language, source = known_language(audio_hash)
+                if upload_language:
+                    logger.info(f"Język nagrania: {upload_language} (źródło: {source})")
+                    metrics.annotate(language=upload_language, language_source=source)
                 else:
-                    logger.warning(f"Nieoczekiwany format odpowiedzi JSON: {json.dumps(result)}")
-                    return json.dumps(result), None
-            else:
-                # Zwróć bezpośrednio tekst
-                return response.text, None
+                    detected_languages = []
+            with metrics.stage("upload"):
+                transcript = self._transcribe_segments(segments, upload_language, cancel_token, progress_callback,
+                                                       detected_languages)
+            if detected_languages:
+                # Język większości fragmentów - kolejne wywołania wyślą go od razu
+                remember_language(audio_hash, max(set(detected_languages), key=detected_languages.count))
+            if cache_key is not None:
+                cache.put(cache_key, transcript, "openai", self.MODEL_NAME, language)
+            return transcript, None
                 
+        except JobCancelled:
+            logger.info("Transkrypcja OpenAI anulowana.")
+            raise
+            
         except requests.exceptions.RequestException as e:
-            error_message = f"Błąd komunikacji z API OpenAI Whisper: {str(e)}"
+            error_message = self._format_request_error(e)
             logger.error(error_message)
-            
-            # Spróbuj wyodrębnić więcej informacji o błędzie z odpowiedzi
-            if hasattr(e, 'response') and e.response is not None:
-                try:
-                    error_data = e.response.json()
-                    if 'error' in error_data:
-                        error_detail = error_data['error'].get('message', str(e))
-                        error_message = f"Błąd API OpenAI: {error_detail}"
-                except:
-                    if hasattr(e, 'response') and hasattr(e.response, 'text'):
-                        error_message = f"Błąd API ({e.response.status_code}): {e.response.text}"
-            
             return None, error_message
             
         except Exception as e:
             error_message = f"Nieoczekiwany błąd podczas transkrypcji: {str(e)}"
             logger.error(error_message)
-            return None, error_message
\ No newline at end of file
+            return None, error_message
+
+    def _post_transcription(self, file_name: str, payload: bytes, language: Optional[str],
+                            detected_languages: Optional[List[str]] = None) -> str:
+        """
+        Wysyła jeden plik (lub fragment) do API i zwraca transkrypcję.
+        
+        Args:
+            file_name: Nazwa pliku w formularzu
+            payload: Zawartość pliku
+            language: Opcjonalny kod języka
+            detected_languages: Lista, do której dopisywany jest język wykryty przez API
+                                (odpowiedź verbose_json); None - odpowiedź tekstowa
+            
+        Returns:
+            str: Transkrypcja
+            
+        Raises:
+            requests.exceptions.RequestException: W przypadku błędu komunikacji lub odpowiedzi HTTP z błędem
+        """
+        import requests
+        
+        headers = {
+            "Authorization": f"Bearer {self.api_key}"
+        }
+        
+        # Przygotowanie danych formularza
+        data = {
+            "model": self.MODEL_NAME,
+            "response_format": "text" if detected_languages is None else "verbose_json"
+        }
+        
+        # Dodaj język, jeśli został określony
+        if language:
+            data["language"] = language
+        
+        files = {
+            "file": (file_name, payload)
+        }
+        
+        payload_mb = len(payload) / (1024 * 1024)
+        metrics.count("upload_bytes", len(payload))
+        timeout = self.request_timeout + self.timeout_per_mb * payload_mb
+        
+        if self.debug_mode:
+            logger.info(f"Wysyłanie żądania transkrypcji do API Whisper ({file_name}, {payload_mb:.2f} MB)...")
+            logger.info(f"URL API: {self.API_URL}")
+            logger.info(f"Parametry: {data}")
+        
+        # Wyślij żądanie
+        response = requests.post(
+            self.API_URL,
+            headers=headers,
+            data=data,
+            files=files,
+            timeout=timeout
+        )
+        
+        if self.debug_mode:
+            logger.info(f"Status odpowiedzi: {response.status_code}")
+            try:
+                logger.info(f"Nagłówki odpowiedzi: {dict(response.headers)}")
+            except:
+                pass
+        
+        # Sprawdź, czy żądanie się powiodło
+        response.raise_for_status()
+        
+        # Transkrypcja może być zwrócona jako tekst lub JSON, w zależności od response_format
+        content_type = response.headers.get("Content-Type", "")
+        
+        if "application/json" in content_type:
+            result = response.json()
+            detected = normalize_language_code(result.get("language"))
+            if detected_languages is not None and detected:
+                detected_languages.append(detected)
+            if "text" in result:
+                return result["text"]
+            else:
+                logger.warning(f"Nieoczekiwany format odpowiedzi JSON: {json.dumps(result)}")
+                return json.dumps(result)
+        else:
+            # Zwróć bezpośrednio tekst
+            return response.text
+
+    def _upload_segment(self, file_name: str, payload: Union[bytes, np.ndarray], language: Optional[str],
+                        detected_languages: Optional[List[str]] = None) -> str:
+        """
+        Wysyła fragment do API, kodując go wcześniej w pamięci, jeśli jest tablicą próbek.
+        
+        Args:
+            file_name: Nazwa pliku (bez rozszerzenia, jeśli payload jest tablicą próbek)
+            payload: Zawartość pliku lub próbki float32 (16 kHz, mono)
+            language: Opcjonalny kod języka
+            detected_languages: Lista na język wykryty przez API (zob. _post_transcription)
+        """
+        if isinstance(payload, np.ndarray):
+            payload, extension = encode_audio(payload, WHISPER_SAMPLE_RATE, self.upload_codec, self.upload_bitrate_kbps)
+            file_name = f"{file_name}.{extension}"
+        return self._post_transcription(file_name, payload, language, detected_languages)
+
+    def _transcribe_segments(self, segments: List[Tuple[str, Union[bytes, np.ndarray]]], language: Optional[str],
+                             cancel_token: Optional[CancellationToken] = None,
+                             progress_callback: Optional[Callable[[float, str], None]] = None,
+                             detected_languages: Optional[List[str]] = None) -> str:
+        """
+        Wysyła fragmenty równolegle i skleja wyniki w kolejności.
+        
+        Fragmenty, których wysłanie się nie powiodło, są ponawiane (tylko one)
+        do max_retries razy z rosnącym odstępem. Wyniki są odbierane w kolejności ukończenia,
+        więc anulowanie lub błąd bez ponawiania przerywa wysyłanie od razu - niewysłane
+        fragmenty są porzucane, a na trwające wysyłki nie czekamy.
+        
+        Raises:
+            requests.exceptions.RequestException: Jeśli któryś fragment nie powiódł się po wszystkich próbach
+            JobCancelled: Jeśli transkrypcja została anulowana
+        """
+        import requests
+        
+        texts: List[Optional[str]] = [None] * len(segments)
+        pending = list(range(len(segments)))
+        if len(segments) > 1:
+            logger.info(f"Wysyłanie {len(segments)} fragmentów (maks. {self.max_parallel_uploads} równolegle)")
+        
+        executor = ThreadPoolExecutor(max_workers=min(self.max_parallel_uploads, len(segments)))
+        try:
+            for attempt in range(self.max_retries + 1):
+                if attempt > 0:
+                    delay = 2 ** attempt
+                    logger.warning(f"Ponawianie {len(pending)} fragmentów za {delay} s (próba {attempt + 1})")
+                    sleep_unless_cancelled(cancel_token, delay)
+                
+                raise_if_cancelled(cancel_token)
+                # Wątki puli dopisują wysłane bajty do pomiaru zadania
+                upload_segment = metrics.bind_timer(self._upload_segment)
+                futures = {
+                    executor.submit(upload_segment, *segments[index], language, detected_languages): index
+                    for index in pending
+                }
+                failed = []
+                last_error = None
+                waiting = set(futures)
+                while waiting:
+                    done, waiting = wait(waiting, timeout=CANCEL_CHECK_INTERVAL if cancel_token else None,
+                                         return_when=FIRST_COMPLETED)
+                    raise_if_cancelled(cancel_token)
+                    for future in done:
+                        index = futures[future]
+                        try:
+                            texts[index] = future.result()
+                        except requests.exceptions.RequestException as e:
+                            logger.error(f"Fragment {index + 1}/{len(segments)}: {self._format_request_error(e)}")
+                            if not self._is_retryable(e):
+                                raise
+                            failed.append(index)
+                            last_error = e
+                            continue
+                        if progress_callback is not None:
+                            finished = sum(1 for text in texts if text is not None)
+                            progress_callback(finished / len(segments), f"Wysłano {finished}/{len(segments)} fragmentów")
+                
+                pending = sorted(failed)
+                if not pending:
+                    break
+            
+            if pending:
+                raise last_error
+        finally:
+            # Po anulowaniu lub błędzie porzuć fragmenty w kolejce i nie czekaj na trwające wysyłki
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        return " ".join(text.strip() for text in texts if text and text.strip())
+
+    def _prepare_segments(self, audio_file_path: str, audio: Optional[np.ndarray] = None) -> List[Tuple[str, np.ndarray]]:
+        """
+        Dekoduje plik, opcjonalnie usuwa długie pauzy i dzieli nagranie w miejscach ciszy
+        na fragmenty mieszczące się w limitach API (kodowane dopiero przy wysyłaniu).
+        
+        Args:
+            audio_file_path: Ścieżka do pliku audio
+            audio: Zdekodowane już próbki pliku (jeśli None, plik jest dekodowany)
+            
+        Returns:
+            List[Tuple[str, np.ndarray]]: (nazwa fragmentu, próbki) dla kolejnych fragmentów;
+                                          pusta lista, jeśli w nagraniu nie wykryto mowy
+        """
+        if audio is None:
+            audio = load_audio(audio_file_path)
+        original_seconds = len(audio) / WHISPER_SAMPLE_RATE
+        metrics.annotate(audio_seconds=original_seconds)
+        if self.vad_aggressiveness:
+            audio, _ = trim_silence(audio, WHISPER_SAMPLE_RATE, self.vad_aggressiveness)
+            if len(audio) == 0:
+                return []
+        
+        # WAV 16-bit mono: 2 bajty na próbkę
+        max_seconds = min(self.max_segment_seconds, self._segment_bytes_limit() / (2 * WHISPER_SAMPLE_RATE))
+        bounds = split_at_silence(audio, WHISPER_SAMPLE_RATE, min_chunk_s=max_seconds / 2, max_chunk_s=max_seconds)
+        
+        base_name = os.path.splitext(os.path.basename(audio_file_path))[0]
+        segments = [
+            (base_name if len(bounds) == 1 else f"{base_name}_{index + 1:03d}", audio[start:end])
+            for index, (start, end) in enumerate(bounds)
+        ]
+        if self.debug_mode:
+            logger.info(f"- Przygotowano {len(segments)} fragmentów: {len(audio) / WHISPER_SAMPLE_RATE:.1f} s "
+                        f"z {original_seconds:.1f} s, kodek: {self.upload_codec}")
+        return segments
+
+    def _cache_options(self) -> dict:
+        """Ustawienia wpływające na wynik, uwzględniane w kluczu pamięci podręcznej."""
+        options = {"vad": self.vad_aggressiveness, "codec": self.upload_codec}
+        if self.upload_codec in UPLOAD_CODECS and UPLOAD_CODECS[self.upload_codec][3]:
+            options["bitrate_kbps"] = self.upload_bitrate_kbps
+        return options
+
+    def _needs_decoding(self, audio_file_path: str, file_size: int) -> bool:
+        """
+        Czy plik trzeba zdekodować przed wysłaniem: usuwanie ciszy, limit rozmiaru API,
+        nagranie WAV dłuższe niż max_segment_seconds lub kompresja nagrania WAV.
+        """
+        if self.vad_aggressiveness or file_size > self._segment_bytes_limit():
+            return True
+        try:
+            with wave.open(audio_file_path, 'rb') as wf:
+                duration = wf.getnframes() / wf.getframerate()
+        except (wave.Error, EOFError, OSError):
+            return False  # Format skompresowany - mieści się w limicie, wysyłamy w całości
+        return duration > self.max_segment_seconds or self.upload_codec != "wav"
+
+    def _segment_bytes_limit(self) -> int:
+        """Maksymalny rozmiar wysyłanego pliku z zapasem na nagłówki formularza."""
+        return self.MAX_UPLOAD_BYTES - 512 * 1024
+
+    def _is_retryable(self, error: "requests.exceptions.RequestException") -> bool:
+        """Czy błąd jest przejściowy (sieć, limit zapytań, błąd serwera)."""
+        response = getattr(error, 'response', None)
+        if response is None:
+            return True  # Timeout lub błąd połączenia
+        return response.status_code in self.RETRYABLE_STATUS_CODES
+
+    def _format_request_error(self, e: "requests.exceptions.RequestException") -> str:
+        """Buduje czytelny komunikat błędu na podstawie wyjątku i odpowiedzi API."""
+        error_message = f"Błąd komunikacji z API OpenAI Whisper: {str(e)}"
+        
+        # Spróbuj wyodrębnić więcej informacji o błędzie z odpowiedzi
+        if hasattr(e, 'response') and e.response is not None:
+            try:
+                error_data = e.response.json()
+                if 'error' in error_data:
+                    error_detail = error_data['error'].get('message', str(e))
+                    error_message = f"Błąd API OpenAI: {error_detail}"
+            except:
+                if hasattr(e, 'response') and hasattr(e.response, 'text'):
+                    error_message = f"Błąd API ({e.response.status_code}): {e.response.text}"
+        
+        return error_message
@@ -0,0 +1,370 @@
+# X:\Aplikacje\dictaitor\modules\parallel_stt.py
+import os
+import re
+import threading
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, List, Tuple, Dict, Any, Callable, Union
+
+import numpy as np
+
+from modules.audio_io import MappedWav
+from modules.vad import frame_energy_db, FRAME_MS
+from modules.jobs import CancellationToken, JobCancelled
+from modules.thread_tuning import resolve_threads, apply_thread_settings, affinity_enabled
+
+logger = logging.getLogger(__name__)
+
+# Granice długości fragmentów, na które dzielimy długie nagrania
+MIN_CHUNK_SECONDS = 30.0
+MAX_CHUNK_SECONDS = 120.0
+# Zakładka między sąsiednimi fragmentami (powtórzone słowa są usuwane przy sklejaniu)
+OVERLAP_SECONDS = 1.0
+# Nagrania krótsze niż ten próg są transkrybowane jednym wywołaniem
+PARALLEL_MIN_DURATION = 600.0
+# Ile słów na granicy fragmentów porównywać przy usuwaniu powtórzeń
+MAX_OVERLAP_WORDS = 15
+# Pisma bez spacji między słowami (ja/zh/th...) - powtórzenia szukane na poziomie znaków
+MAX_OVERLAP_CHARS = 40
+MIN_OVERLAP_CHARS = 3
+_BOUNDARY_PUNCTUATION = re.compile(r"[^\w]*")
+_UNSPACED_SCRIPT = re.compile(r"[\u0e00-\u0eff\u1000-\u109f\u1780-\u17ff\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff]")
+# Ile fragmentów na proces może czekać w kolejce - reszta jest dekodowana dopiero przed wysłaniem
+CHUNKS_IN_FLIGHT_PER_WORKER = 2
+
+# Komunikat po awarii procesu roboczego (pula jest wtedy tworzona od nowa)
+BROKEN_POOL_MESSAGE = ("Proces roboczy zakończył się nieoczekiwanie (np. z braku pamięci). "
+                       "Spróbuj ponownie lub zmniejsz liczbę procesów.")
+
+# Pula procesów roboczych jest utrzymywana między wywołaniami, aby nie ładować modeli ponownie
+_pool = None
+_pool_key = None
+_pool_lock = threading.Lock()
+
+# Model załadowany w procesie roboczym
+_worker_model = None
+
+
+def resolve_threads_per_worker(workers: int, threads_per_worker: int = 0, model_name: Optional[str] = None) -> int:
+    """
+    Zwraca liczbę wątków obliczeniowych na proces roboczy.
+
+    Args:
+        workers: Liczba procesów roboczych
+        threads_per_worker: Wartość z ustawień (0 - wynik kalibracji modelu, ale nie więcej
+                            niż równa część rdzeni; bez kalibracji - równa część rdzeni)
+        model_name: Nazwa modelu (do odczytu kalibracji)
+    """
+    return resolve_threads(model_name, workers, threads_per_worker)
+
+
+def split_at_silence(audio: Union[np.ndarray, MappedWav], rate: int = 16000,
+                     min_chunk_s: float = MIN_CHUNK_SECONDS,
+                     max_chunk_s: float = MAX_CHUNK_SECONDS) -> List[Tuple[int, int]]:
+    """
+    Dzieli nagranie na fragmenty o długości min_chunk_s..max_chunk_s, tnąc w najcichszych miejscach.
+
+    Args:
+        audio: Próbki float32, mono (lub plik zmapowany MappedWav - energia liczona blokami)
+        rate: Częstotliwość próbkowania
+        min_chunk_s: Minimalna długość fragmentu w sekundach
+        max_chunk_s: Maksymalna długość fragmentu w sekundach
+
+    Returns:
+        List[Tuple[int, int]]: Granice fragmentów (początek, koniec) w próbkach
+    """
+    total = len(audio)
+    max_chunk = int(max_chunk_s * rate)
+    if total <= max_chunk:
+        return [(0, total)]
+
+    frame_len = rate * FRAME_MS // 1000
+    # Wygładzona energia (~300 ms), aby ciąć w pauzach, a nie między głoskami
+    energy = frame_energy_db(audio, rate)
+    smooth_frames = max(1, 300 // FRAME_MS)
+    energy = np.convolve(energy, np.ones(smooth_frames) / smooth_frames, mode="same")
+
+    bounds = []
+    start = 0
+    while total - start > max_chunk:
+        lo = (start + int(min_chunk_s * rate)) // frame_len
+        hi = min((start + max_chunk) // frame_len, len(energy))
+        cut_frame = lo + int(np.argmin(energy[lo:hi])) if hi > lo else hi
+        cut = cut_frame * frame_len + frame_len // 2
+        bounds.append((start, cut))
+        start = cut
+    bounds.append((start, total))
+    return bounds
+
+
+def merge_overlapping_texts(texts: List[str], max_overlap_words: int = MAX_OVERLAP_WORDS) -> str:
+    """
+    Skleja transkrypcje kolejnych fragmentów, usuwając słowa powtórzone w zakładce.
+
+    W piśmie bez spacji (japoński, chiński, tajski) jedno "słowo" z split() to całe zdanie -
+    gdy granica fragmentów wypada w takim tekście, powtórzenie jest szukane znak po znaku
+    (od MIN_OVERLAP_CHARS do MAX_OVERLAP_CHARS znaków).
+
+    Args:
+        texts: Transkrypcje fragmentów w kolejności
+        max_overlap_words: Maksymalna liczba porównywanych słów na granicy
+
+    Returns:
+        str: Połączona transkrypcja
+    """
+    merged: List[str] = []
+    for text in texts:
+        words = text.split()
+        overlap = _overlap_length(merged, words, max_overlap_words)
+        if overlap == 0 and merged and words and _UNSPACED_SCRIPT.search(merged[-1]) \
+                and _UNSPACED_SCRIPT.search(words[0]):
+            head = words[0][_char_overlap_length(merged[-1], words[0]):]
+            words = ([head] if head else []) + words[1:]
+        merged.extend(words[overlap:])
+    return " ".join(merged)
+
+
+def _normalize_word(word: str) -> str:
+    return re.sub(r"[^\w]", "", word.lower())
+
+
+def _overlap_length(previous: List[str], following: List[str], max_words: int) -> int:
+    """Długość najdłuższego końca `previous` powtórzonego na początku `following`."""
+    limit = min(len(previous), len(following), max_words)
+    tail = [_normalize_word(word) for word in previous[-limit:]] if limit else []
+    head = [_normalize_word(word) for word in following[:limit]]
+    for k in range(limit, 0, -1):
+        if tail[-k:] == head[:k]:
+            # Pojedyncze krótkie słowo (np. "i", "the") to zbyt słaby dowód powtórzenia
+            if k == 1 and len(head[0]) < 4:
+                continue
+            return k
+    return 0
+
+
+def _char_overlap_length(previous: str, following: str) -> int:
+    """
+    Ile początkowych znaków `following` powtarza koniec `previous`.
+
+    Interpunkcja na granicy jest pomijana przy porównaniu, a za powtórzeniem - usuwana razem z nim.
+    """
+    previous = re.sub(r"[^\w]+$", "", previous)
+    skip = _BOUNDARY_PUNCTUATION.match(following).end()
+    limit = min(len(previous), len(following) - skip, MAX_OVERLAP_CHARS)
+    for k in range(limit, MIN_OVERLAP_CHARS - 1, -1):
+        if previous[-k:] == following[skip:skip + k]:
+            return _BOUNDARY_PUNCTUATION.match(following, skip + k).end()
+    return 0
+
+
+def _init_worker(model_name: str, threads: int, slot_counter=None) -> None:
+    """
+    Inicjalizuje proces roboczy: ustawia liczbę wątków i ładuje model.
+
+    Przy włączonym przypinaniu (slot_counter) każdy proces dostaje kolejny numer slotu
+    i własną grupę rdzeni.
+    """
+    global _worker_model
+    slot = None
+    if slot_counter is not None:
+        with slot_counter.get_lock():
+            slot = slot_counter.value
+            slot_counter.value += 1
+    apply_thread_settings(model_name, threads, slot)
+    from modules.local_stt import load_whisper_model
+    _worker_model = load_whisper_model(model_name)
+
+
+def _transcribe_chunk(index: int, audio: np.ndarray, language: Optional[str],
+                      offset_seconds: float) -> Tuple[int, str, List[Dict[str, Any]]]:
+    """Transkrybuje jeden fragment w procesie roboczym."""
+    if _worker_model is None:
+        raise RuntimeError("Model Whisper nie został załadowany w procesie roboczym.")
+    options = {"fp16": False}
+    if language:
+        options["language"] = language
+    return chunk_result(index, _worker_model.transcribe(audio, **options), offset_seconds)
+
+
+def chunk_result(index: int, result: Dict[str, Any],
+                 offset_seconds: float) -> Tuple[int, str, List[Dict[str, Any]]]:
+    """Wynik model.transcribe dla fragmentu jako (indeks, tekst, segmenty z czasem względem całego nagrania)."""
+    segments = [
+        {"start": segment["start"] + offset_seconds, "end": segment["end"] + offset_seconds,
+         "text": segment["text"]}
+        for segment in result.get("segments", [])
+    ]
+    return index, result["text"].strip(), segments
+
+
+def _detect_chunk_language(audio: np.ndarray) -> Tuple[Optional[str], float]:
+    """Rozpoznaje język okna próbnego w procesie roboczym."""
+    if _worker_model is None:
+        raise RuntimeError("Model Whisper nie został załadowany w procesie roboczym.")
+    from modules.language_id import detect_language
+    return detect_language(_worker_model, audio)
+
+
+def _get_pool(model_name: str, workers: int, threads: int) -> ProcessPoolExecutor:
+    """Zwraca pulę procesów z załadowanym modelem (tworzy nową przy zmianie ustawień)."""
+    global _pool, _pool_key
+    pin = affinity_enabled()
+    key = (model_name, workers, threads, pin)
+    if _pool is not None and _pool_key == key:
+        return _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True)
+    logger.info(f"Uruchamianie puli {workers} procesów roboczych (model: {model_name}, wątki/proces: {threads})")
+    # 'spawn' - bezpieczne z torch i zgodne z Windows
+    context = multiprocessing.get_context("spawn")
+    _pool = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(model_name, threads, context.Value("i", 0) if pin else None)
+    )
+    _pool_key = key
+    return _pool
+
+
+def _discard_broken_pool() -> None:
+    """
+    Porzuca pulę, której proces roboczy zakończył się nieoczekiwanie (np. brak pamięci).
+
+    Taka pula odrzuca wszystkie kolejne zadania - następne wywołanie _get_pool utworzy nową.
+    Wywoływać pod _pool_lock.
+    """
+    global _pool, _pool_key
+    if _pool is not None:
+        logger.error("Proces roboczy transkrypcji równoległej zakończył się nieoczekiwanie - zamykam pulę")
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+        _pool_key = None
+
+
+def shutdown_worker_pool() -> None:
+    """Zamyka pulę procesów roboczych i zwalnia pamięć zajmowaną przez ich modele."""
+    global _pool, _pool_key
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+            _pool = None
+            _pool_key = None
+
+
+def detect_language_parallel(audio: np.ndarray, model_name: str, workers: int = 2,
+                             threads_per_worker: int = 0) -> Tuple[Optional[str], float]:
+    """
+    Rozpoznaje język okna próbnego w procesie roboczym puli - proces główny nie musi
+    ładować własnej kopii modelu.
+
+    Returns:
+        Tuple[Optional[str], float]: (kod języka, prawdopodobieństwo)
+    """
+    threads = resolve_threads_per_worker(workers, threads_per_worker, model_name)
+    with _pool_lock:
+        pool = _get_pool(model_name, workers, threads)
+        try:
+            return pool.submit(_detect_chunk_language, audio).result()
+        except BrokenProcessPool as e:
+            _discard_broken_pool()
+            raise RuntimeError(BROKEN_POOL_MESSAGE) from e
+
+
+def transcribe_parallel(audio: Union[np.ndarray, MappedWav], model_name: str, language: Optional[str] = None,
+                        workers: int = 2, threads_per_worker: int = 0,
+                        rate: int = 16000, cancel_token: Optional[CancellationToken] = None,
+                        progress_callback: Optional[Callable[[float, str], None]] = None) -> Dict[str, Any]:
+    """
+    Transkrybuje długie nagranie równolegle na wielu rdzeniach.
+
+    Nagranie jest dzielone w miejscach ciszy na fragmenty 30-120 s (z krótką zakładką),
+    fragmenty trafiają do puli procesów, z których każdy trzyma własny model,
+    a wyniki są sklejane w kolejności z usunięciem powtórzeń na granicach.
+    W kolejce puli czeka najwyżej CHUNKS_IN_FLIGHT_PER_WORKER fragmentów na proces, więc
+    z pliku zmapowanego (MappedWav) w pamięci jest naraz tylko kilka zdekodowanych fragmentów.
+
+    Args:
+        audio: Próbki float32, mono, 16 kHz (lub plik zmapowany MappedWav)
+        model_name: Nazwa modelu Whisper
+        language: Kod języka lub None (wykrywany w każdym fragmencie - zob. detect_language_parallel)
+        workers: Liczba procesów roboczych (każdy zajmuje pamięć jednego modelu)
+        threads_per_worker: Wątki obliczeniowe na proces (0 - automatycznie, z uwzględnieniem kalibracji)
+        rate: Częstotliwość próbkowania
+        cancel_token: Token anulowania - sprawdzany po każdym fragmencie; niewysłane fragmenty są porzucane
+        progress_callback: Wywoływane z (postęp 0-1, opis) po każdym fragmencie
+
+    Returns:
+        Dict[str, Any]: Wynik w formacie zgodnym z model.transcribe ("text", "segments", "language")
+    """
+    threads = resolve_threads_per_worker(workers, threads_per_worker, model_name)
+    bounds = split_at_silence(audio, rate)
+    ranges = chunk_ranges(bounds, rate)
+    logger.info(f"Transkrypcja równoległa: {len(audio) / rate:.1f} s audio w {len(bounds)} fragmentach, "
+                f"{workers} procesy x {threads} wątki")
+
+    with _pool_lock:
+        pool = _get_pool(model_name, workers, threads)
+        pending = set()
+        results = []
+        next_index = 0
+        try:
+            while next_index < len(bounds) or pending:
+                while next_index < len(bounds) and len(pending) < workers * CHUNKS_IN_FLIGHT_PER_WORKER:
+                    chunk_start, end = ranges[next_index]
+                    pending.add(pool.submit(_transcribe_chunk, next_index, audio[chunk_start:end],
+                                            language, chunk_start / rate))
+                    next_index += 1
+
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                try:
+                    results.extend(future.result() for future in done)
+                except Exception:
+                    # Błąd fragmentu przerywa całą transkrypcję - nie zajmuj puli pozostałymi
+                    _cancel_pending(pending)
+                    raise
+                if cancel_token is not None and cancel_token.cancelled:
+                    _cancel_pending(pending)
+                    raise JobCancelled()
+                if progress_callback is not None:
+                    progress_callback(len(results) / len(bounds), f"Fragment {len(results)}/{len(bounds)}")
+        except BrokenProcessPool as e:
+            _discard_broken_pool()
+            raise RuntimeError(BROKEN_POOL_MESSAGE) from e
+    return assemble_chunk_results(results, bounds, language, rate)
+
+
+def _cancel_pending(futures) -> None:
+    """Anuluje fragmenty czekające w kolejce puli (trwające kończą się w procesach roboczych)."""
+    for future in futures:
+        future.cancel()
+
+
+def chunk_ranges(bounds: List[Tuple[int, int]], rate: int = 16000) -> List[Tuple[int, int]]:
+    """Zakresy próbek do transkrypcji: granice fragmentów poszerzone o zakładkę z poprzednim."""
+    overlap = int(OVERLAP_SECONDS * rate)
+    return [(max(0, start - overlap) if index > 0 else start, end) for index, (start, end) in enumerate(bounds)]
+
+
+def assemble_chunk_results(results: List[Tuple[int, str, List[Dict[str, Any]]]], bounds: List[Tuple[int, int]],
+                           language: Optional[str], rate: int = 16000) -> Dict[str, Any]:
+    """
+    Skleja wyniki fragmentów (indeks, tekst, segmenty) w wynik zgodny z model.transcribe.
+
+    Segmenty muszą mieć znaczniki czasu względem całego nagrania; segmenty z zakładki
+    należą do poprzedniego fragmentu, a powtórzone słowa są usuwane z tekstu.
+    """
+    results = sorted(results, key=lambda item: item[0])
+    segments = []
+    for index, _, chunk_segments in results:
+        cut_seconds = bounds[index][0] / rate
+        segments.extend(segment for segment in chunk_segments
+                        if index == 0 or (segment["start"] + segment["end"]) / 2 >= cut_seconds)
+
+    return {
+        "text": merge_overlapping_texts([text for _, text, _ in results]),
+        "segments": segments,
+        "language": language
+    }
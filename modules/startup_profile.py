@@ -0,0 +1,51 @@
+# X:\Aplikacje\dictaitor\modules\startup_profile.py
+import sys
+import time
+from typing import List, Tuple
+
+# Budżet czasu od startu interpretera do wyświetlenia okna
+STARTUP_BUDGET_SECONDS = 1.0
+# Ciężkie biblioteki, które nie powinny być ładowane przed wyświetleniem okna
+HEAVY_MODULES = ("torch", "whisper", "librosa", "numba", "scipy", "requests")
+
+
+class StartupProfiler:
+    """
+    Pomiar czasu kolejnych etapów uruchamiania aplikacji (importy, budowa okna, pierwsza klatka).
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.phases: List[Tuple[str, float]] = []
+
+    def mark(self, label: str) -> None:
+        """Zamyka etap trwający od poprzedniego znacznika."""
+        now = time.perf_counter()
+        self.phases.append((label, now - self._last))
+        self._last = now
+
+    @property
+    def elapsed(self) -> float:
+        return self._last - self.started
+
+    def report(self, budget: float = STARTUP_BUDGET_SECONDS) -> str:
+        """
+        Buduje raport: czasy etapów, załadowane ciężkie biblioteki i porównanie z budżetem.
+
+        Args:
+            budget: Budżet czasu uruchamiania w sekundach
+        """
+        lines = ["Profil uruchamiania DictAItor:"]
+        for label, seconds in self.phases:
+            lines.append(f"  {label:<40} {seconds * 1000:8.1f} ms")
+        lines.append(f"  {'RAZEM':<40} {self.elapsed * 1000:8.1f} ms (budżet: {budget * 1000:.0f} ms)")
+
+        heavy = [name for name in HEAVY_MODULES if name in sys.modules]
+        lines.append(f"Ciężkie biblioteki załadowane przed pokazaniem okna: {', '.join(heavy) or 'brak'}")
+        lines.append("Budżet dotrzymany." if self.within_budget(budget) else "PRZEKROCZONO BUDŻET uruchamiania!")
+        lines.append("Szczegółowy rozkład importów: python -X importtime main_app.py")
+        return "\n".join(lines)
+
+    def within_budget(self, budget: float = STARTUP_BUDGET_SECONDS) -> bool:
+        return self.elapsed <= budget
@@ -0,0 +1,427 @@
+# X:\Aplikacje\dictaitor\modules\stt_server.py
+import os
+import json
+import time
+import queue
+import tempfile
+import threading
+import logging
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Optional, Dict, Tuple, List, Any
+
+import numpy as np
+
+from modules.audio_io import load_audio, load_audio_bytes, WHISPER_SAMPLE_RATE
+from modules.metrics import JobTimer, MetricsRecorder, CONFIG_DIR
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+TRANSCRIPTIONS_PATH = "/v1/audio/transcriptions"
+
+# Kontrola przyjmowania żądań: powyżej tej liczby oczekujących żądań serwer odpowiada 429
+MAX_QUEUE_DEPTH = 32
+# Mikro-batching: ile żądań zbierać do jednego przebiegu i jak długo czekać na kolejne
+MAX_BATCH_SIZE = 8
+BATCH_WINDOW_SECONDS = 0.05
+# Maksymalny rozmiar przesyłanego pliku (jak w API OpenAI)
+MAX_UPLOAD_BYTES = 25 * 1024 * 1024
+# Jak długo żądanie może czekać na wynik
+REQUEST_TIMEOUT = 600.0
+# Sugerowany czas ponowienia przy przepełnionej kolejce (nagłówek Retry-After)
+RETRY_AFTER_SECONDS = 2
+# Nazwy modeli API OpenAI mapowane na domyślny model serwera
+OPENAI_MODEL_ALIASES = ("whisper-1",)
+RESPONSE_FORMATS = ("json", "text", "verbose_json")
+# Czasy etapów żądań serwera (osobny plik niż metryki aplikacji okienkowej)
+SERVER_METRICS_PATH = os.path.join(CONFIG_DIR, "server_metrics.jsonl")
+
+
+class TranscriptionJob:
+    """Pojedyncze żądanie transkrypcji oczekujące w kolejce serwera."""
+
+    def __init__(self, audio: np.ndarray, model_name: str, language: Optional[str],
+                 timer: Optional[JobTimer] = None):
+        self.audio = audio
+        self.model_name = model_name
+        self.language = language
+        self.timer = timer
+        self.text: Optional[str] = None
+        # Język podany przez klienta lub wykryty przy transkrypcji
+        self.detected_language: Optional[str] = language
+        self.error: Optional[str] = None
+        self.enqueued_at = time.monotonic()
+        self.done = threading.Event()
+
+
+class BatchScheduler:
+    """
+    Kolejka żądań obsługiwana przez jeden wątek roboczy korzystający ze wspólnej puli modeli.
+
+    Żądania napływające w oknie BATCH_WINDOW_SECONDS są łączone w partie (do MAX_BATCH_SIZE)
+    i grupowane według modelu i języka, więc wielu klientów korzysta z jednej kopii modelu
+    w pamięci. Przy pełnej kolejce submit() odrzuca żądanie zamiast zwiększać opóźnienia.
+    """
+
+    def __init__(self, default_model: str = "turbo", vad_aggressiveness: int = 0,
+                 max_queue_depth: int = MAX_QUEUE_DEPTH, max_batch_size: int = MAX_BATCH_SIZE,
+                 batch_window: float = BATCH_WINDOW_SECONDS, metrics_recorder: Optional[MetricsRecorder] = None):
+        self.default_model = default_model
+        self.metrics_recorder = metrics_recorder
+        self.vad_aggressiveness = vad_aggressiveness
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window
+
+        self._queue: "queue.Queue[TranscriptionJob]" = queue.Queue(maxsize=max_queue_depth)
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            "requests_total": 0,
+            "requests_rejected": 0,
+            "requests_failed": 0,
+            "batches_total": 0,
+            "batched_requests_total": 0,
+            "in_flight": 0,
+            "audio_seconds_total": 0.0,
+            "queue_wait_seconds_total": 0.0,
+            "processing_seconds_total": 0.0,
+        }
+
+    def start(self) -> None:
+        """Uruchamia wątek obsługi kolejki."""
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._worker_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Zatrzymuje wątek; żądania pozostałe w kolejce kończą się błędem."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            job.error = "Serwer jest zatrzymywany."
+            job.done.set()
+
+    @property
+    def accepting(self) -> bool:
+        return self._thread is not None and not self._stop_event.is_set()
+
+    def submit(self, job: TranscriptionJob) -> bool:
+        """
+        Dodaje żądanie do kolejki.
+
+        Returns:
+            bool: False, jeśli kolejka jest pełna (żądanie odrzucone)
+        """
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            self._count("requests_rejected")
+            return False
+        self._count("requests_total")
+        return True
+
+    def metrics(self) -> Dict[str, Any]:
+        """Zwraca liczniki serwera wraz z bieżącą głębokością kolejki."""
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        metrics["queue_depth"] = self._queue.qsize()
+        metrics["queue_capacity"] = self._queue.maxsize
+        metrics["average_batch_size"] = round(
+            metrics["batched_requests_total"] / metrics["batches_total"], 2) if metrics["batches_total"] else 0.0
+        return metrics
+
+    def _count(self, name: str, value: float = 1) -> None:
+        with self._metrics_lock:
+            self._metrics[name] += value
+
+    def _worker_loop(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                first = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            # Zbierz żądania, które nadejdą w oknie mikro-batchingu
+            batch = [first]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            groups: Dict[Tuple[str, Optional[str]], List[TranscriptionJob]] = {}
+            for job in batch:
+                groups.setdefault((job.model_name, job.language), []).append(job)
+            for (model_name, language), jobs in groups.items():
+                self._run_batch(model_name, language, jobs)
+
+    def _run_batch(self, model_name: str, language: Optional[str], jobs: List[TranscriptionJob]) -> None:
+        """Transkrybuje partię żądań tym samym modelem - krótkie nagrania w jednym przebiegu modelu."""
+        from modules.local_stt import transcribe_batch_local_detailed
+
+        started = time.monotonic()
+        self._count("batches_total")
+        self._count("batched_requests_total", len(jobs))
+        self._count("in_flight", len(jobs))
+        logger.info(f"Partia {len(jobs)} żądań (model: {model_name}, język: {language or 'auto'})")
+        try:
+            for job in jobs:
+                self._count("queue_wait_seconds_total", started - job.enqueued_at)
+                if job.timer is not None:
+                    job.timer.add_stage("queue_wait", started - job.enqueued_at)
+            outcomes = transcribe_batch_local_detailed([job.audio for job in jobs], model_name=model_name,
+                                                       language=language, vad_aggressiveness=self.vad_aggressiveness,
+                                                       batch_size=len(jobs))
+            elapsed = time.monotonic() - started
+            for job, (result, error) in zip(jobs, outcomes):
+                job.error = error
+                if result is not None:
+                    job.text, job.detected_language = result["text"], result["language"]
+                if job.timer is not None:
+                    job.timer.add_stage("inference_batch", elapsed)
+                    job.timer.annotate(audio_seconds=len(job.audio) / WHISPER_SAMPLE_RATE, batch_size=len(jobs))
+                if job.error:
+                    self._count("requests_failed")
+                else:
+                    self._count("audio_seconds_total", len(job.audio) / WHISPER_SAMPLE_RATE)
+                job.done.set()
+        finally:
+            self._count("in_flight", -len(jobs))
+            self._count("processing_seconds_total", time.monotonic() - started)
+            for job in jobs:
+                if not job.done.is_set():
+                    job.error = job.error or "Błąd wewnętrzny serwera podczas transkrypcji."
+                    job.done.set()
+
+
+def parse_multipart(content_type: str, body: bytes) -> Dict[str, Tuple[Optional[str], bytes]]:
+    """
+    Parsuje formularz multipart/form-data.
+
+    Returns:
+        Dict[str, Tuple[Optional[str], bytes]]: nazwa pola -> (nazwa pliku, zawartość)
+    """
+    message = BytesParser(policy=HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode("latin-1") + body
+    )
+    if not message.is_multipart():
+        raise ValueError("Oczekiwano formularza multipart/form-data.")
+    fields = {}
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        if name:
+            fields[name] = (part.get_filename(), part.get_payload(decode=True) or b"")
+    return fields
+
+
+def decode_upload(file_name: Optional[str], data: bytes) -> np.ndarray:
+    """Dekoduje przesłany plik audio do próbek float32, 16 kHz, mono."""
+    # WAV PCM dekodowany w pamięci - bez pliku tymczasowego i librosa
+    audio = load_audio_bytes(data)
+    if audio is not None:
+        return audio
+    suffix = os.path.splitext(file_name or "")[1] or ".wav"
+    fd, temp_path = tempfile.mkstemp(suffix=suffix)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        return load_audio(temp_path)
+    finally:
+        os.remove(temp_path)
+
+
+class TranscriptionServer(ThreadingHTTPServer):
+    """Serwer HTTP zgodny z endpointem /v1/audio/transcriptions API OpenAI."""
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], scheduler: BatchScheduler, api_key: Optional[str] = None):
+        super().__init__(address, TranscriptionRequestHandler)
+        self.scheduler = scheduler
+        self.api_key = api_key
+
+
+class TranscriptionRequestHandler(BaseHTTPRequestHandler):
+    server: TranscriptionServer
+
+    def do_GET(self) -> None:
+        if self.path == "/metrics":
+            self._send_json(200, self.server.scheduler.metrics())
+        elif self.path == "/metrics/prometheus":
+            scheduler = self.server.scheduler
+            if scheduler.metrics_recorder is None:
+                self._send_error(404, "Metryki zadań są wyłączone.", "not_found")
+                return
+            counters = scheduler.metrics()
+            gauges = {f"dictaitor_server_{name}": counters[name]
+                      for name in ("queue_depth", "queue_capacity", "in_flight", "average_batch_size")}
+            self._send_body(200, scheduler.metrics_recorder.prometheus_text(gauges).encode("utf-8"),
+                            "text/plain; version=0.0.4; charset=utf-8")
+        elif self.path == "/health":
+            status = 200 if self.server.scheduler.accepting else 503
+            self._send_json(status, {"status": "ok" if status == 200 else "unavailable"})
+        else:
+            self._send_error(404, f"Nieznana ścieżka: {self.path}", "not_found")
+
+    def do_POST(self) -> None:
+        if self.path != TRANSCRIPTIONS_PATH:
+            self._send_error(404, f"Nieznana ścieżka: {self.path}", "not_found")
+            return
+        if self.server.api_key and self.headers.get("Authorization") != f"Bearer {self.server.api_key}":
+            self._send_error(401, "Nieprawidłowy klucz API.", "invalid_api_key")
+            return
+        scheduler = self.server.scheduler
+        if not scheduler.accepting:
+            self._send_error(503, "Serwer nie przyjmuje żądań.", "server_unavailable")
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_UPLOAD_BYTES:
+            self._send_error(413, f"Plik przekracza limit {MAX_UPLOAD_BYTES // 2**20} MB.", "invalid_request_error")
+            return
+        try:
+            fields = parse_multipart(self.headers.get("Content-Type", ""), self.rfile.read(length))
+        except Exception as e:
+            self._send_error(400, f"Nieprawidłowy formularz: {e}", "invalid_request_error")
+            return
+        if "file" not in fields:
+            self._send_error(400, "Brak pola 'file'.", "invalid_request_error")
+            return
+
+        model_name = self._field(fields, "model") or scheduler.default_model
+        if model_name in OPENAI_MODEL_ALIASES:
+            model_name = scheduler.default_model
+        language = self._field(fields, "language") or None
+        response_format = self._field(fields, "response_format") or "json"
+        if response_format not in RESPONSE_FORMATS:
+            self._send_error(400, f"Nieobsługiwany response_format: {response_format}. "
+                                  f"Dostępne: {', '.join(RESPONSE_FORMATS)}", "invalid_request_error")
+            return
+
+        timer = None
+        if scheduler.metrics_recorder is not None:
+            timer = JobTimer("server", model=model_name, source="http", recorder=scheduler.metrics_recorder)
+        try:
+            file_name, data = fields["file"]
+            started = time.perf_counter()
+            audio = decode_upload(file_name, data)
+            if timer is not None:
+                timer.add_stage("decode_upload", time.perf_counter() - started)
+                timer.annotate(bytes=len(data))
+        except Exception as e:
+            self._send_error(400, f"Nie można zdekodować pliku audio: {e}", "invalid_request_error")
+            return
+
+        job = TranscriptionJob(audio, model_name, language, timer)
+        try:
+            self._respond_with_result(job, response_format)
+        finally:
+            if timer is not None and job.done.is_set():
+                timer.finish(job.error)
+
+    def _respond_with_result(self, job: TranscriptionJob, response_format: str) -> None:
+        """Kolejkuje żądanie, czeka na wynik i wysyła odpowiedź."""
+        scheduler = self.server.scheduler
+        audio = job.audio
+        if not scheduler.submit(job):
+            self._send_error(429, "Kolejka serwera jest pełna - spróbuj ponownie za chwilę.", "rate_limit_exceeded",
+                             headers={"Retry-After": str(RETRY_AFTER_SECONDS)})
+            return
+        if not job.done.wait(REQUEST_TIMEOUT):
+            self._send_error(503, "Przekroczono czas oczekiwania na transkrypcję.", "server_unavailable")
+            return
+        if job.error:
+            self._send_error(500, job.error, "server_error")
+            return
+
+        if response_format == "text":
+            self._send_body(200, (job.text + "\n").encode("utf-8"), "text/plain; charset=utf-8")
+        elif response_format == "verbose_json":
+            self._send_json(200, {"text": job.text, "language": self._language_name(job.detected_language),
+                                  "duration": len(audio) / WHISPER_SAMPLE_RATE})
+        else:
+            self._send_json(200, {"text": job.text})
+
+    @staticmethod
+    def _language_name(language: Optional[str]) -> Optional[str]:
+        """Nazwa języka jak w odpowiedzi verbose_json API OpenAI ("pl" -> "polish")."""
+        if not language:
+            return None
+        try:
+            from whisper.tokenizer import LANGUAGES
+        except ImportError:
+            return language
+        return LANGUAGES.get(language, language)
+
+    @staticmethod
+    def _field(fields: Dict[str, Tuple[Optional[str], bytes]], name: str) -> str:
+        return fields[name][1].decode("utf-8", errors="replace").strip() if name in fields else ""
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        self._send_body(status, json.dumps(payload, ensure_ascii=False).encode("utf-8"),
+                        "application/json", headers)
+
+    def _send_error(self, status: int, message: str, error_type: str,
+                    headers: Optional[Dict[str, str]] = None) -> None:
+        # Format błędu jak w API OpenAI - OpenAIWhisperClient wyświetli pole "message"
+        self._send_json(status, {"error": {"message": message, "type": error_type}}, headers)
+
+    def _send_body(self, status: int, body: bytes, content_type: str,
+                   headers: Optional[Dict[str, str]] = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        logger.info(f"{self.address_string()} - {format % args}")
+
+
+def run_server(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, default_model: str = "turbo",
+               api_key: Optional[str] = None, warm_up: bool = True, **scheduler_options) -> None:
+    """
+    Uruchamia serwer transkrypcji i obsługuje żądania do przerwania (Ctrl+C).
+
+    Args:
+        host: Adres nasłuchiwania
+        port: Port
+        default_model: Model używany dla żądań z model="whisper-1" lub bez modelu
+        api_key: Wymagany token Bearer (None - bez uwierzytelniania)
+        warm_up: Czy załadować model przed przyjęciem pierwszego żądania
+        scheduler_options: Parametry BatchScheduler (vad_aggressiveness, max_queue_depth, ...)
+    """
+    if warm_up:
+        from modules.local_stt import warm_up_model
+        if not warm_up_model(default_model):
+            logger.warning(f"Nie udało się załadować modelu '{default_model}' - spróbuję przy pierwszym żądaniu.")
+
+    scheduler_options.setdefault("metrics_recorder", MetricsRecorder(SERVER_METRICS_PATH))
+    scheduler = BatchScheduler(default_model=default_model, **scheduler_options)
+    server = TranscriptionServer((host, port), scheduler, api_key)
+    scheduler.start()
+    logger.info(f"Serwer transkrypcji nasłuchuje na http://{host}:{server.server_port}{TRANSCRIPTIONS_PATH} "
+                f"(metryki: /metrics, /metrics/prometheus)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Zatrzymywanie serwera...")
+    finally:
+        server.server_close()
+        scheduler.stop()
@@ -0,0 +1,294 @@
+# X:\Aplikacje\dictaitor\modules\thread_tuning.py
+import os
+import sys
+import json
+import time
+import platform
+import threading
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, List, Dict, Any, Callable
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+THREAD_TUNING_PATH = os.path.join(APP_DIR, "config", "thread_tuning.json")
+
+# Długość nagrania kalibracyjnego i ustawienia wątków międzyoperacyjnych (inter-op) do sprawdzenia
+CALIBRATION_SECONDS = 30.0
+DEFAULT_INTEROP_CHOICES = [1, 2]
+
+_tuning = None
+_tuning_lock = threading.Lock()
+# Czy przypinać procesy robocze do osobnych rdzeni (zob. set_affinity_enabled)
+_affinity_enabled = False
+# Liczbę wątków inter-op torch można ustawić tylko raz w procesie, przed pierwszym użyciem
+_interop_applied = False
+
+
+def machine_fingerprint() -> Dict[str, Any]:
+    """Opis procesora - pomiary z innego komputera (lub po zmianie liczby rdzeni) są ignorowane."""
+    return {
+        "cpu_count": os.cpu_count(),
+        "machine": platform.machine(),
+        "processor": platform.processor() or platform.machine(),
+    }
+
+
+def load_thread_tuning(path: str = THREAD_TUNING_PATH) -> Dict[str, Dict[str, Any]]:
+    """
+    Wczytuje najlepsze ustawienia wątków dla modeli zapisane przez kalibrację.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: nazwa modelu -> {"threads", "interop_threads", "rtf", ...};
+                                   pusty słownik, gdy brak pliku lub pochodzi z innej maszyny
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning(f"Nie można wczytać ustawień wątków z {path}: {e}")
+        return {}
+    if data.get("fingerprint") != machine_fingerprint():
+        logger.info("Kalibracja wątków pochodzi z innej konfiguracji procesora - pomijam ją.")
+        return {}
+    return data.get("models", {})
+
+
+def get_tuned_settings(model_name: str) -> Optional[Dict[str, Any]]:
+    """Ustawienia z kalibracji dla modelu (plik jest wczytywany raz na proces)."""
+    global _tuning
+    with _tuning_lock:
+        if _tuning is None:
+            _tuning = load_thread_tuning()
+        return _tuning.get(model_name)
+
+
+def set_affinity_enabled(enabled: bool) -> None:
+    """Włącza przypinanie procesów roboczych transkrypcji do rozłącznych grup rdzeni."""
+    global _affinity_enabled
+    _affinity_enabled = bool(enabled)
+
+
+def affinity_enabled() -> bool:
+    return _affinity_enabled
+
+
+def resolve_threads(model_name: Optional[str], workers: int = 1, requested: int = 0) -> int:
+    """
+    Liczba wątków obliczeniowych na proces.
+
+    Args:
+        model_name: Nazwa modelu (do odczytu kalibracji) lub None
+        workers: Liczba procesów pracujących jednocześnie
+        requested: Wartość z ustawień (0 - automatycznie)
+
+    Returns:
+        int: requested, a przy 0 - wynik kalibracji ograniczony do równej części rdzeni
+             (bez kalibracji: równa część rdzeni)
+    """
+    if requested and requested > 0:
+        return requested
+    share = max(1, len(available_cpus()) // max(1, workers))
+    tuned = get_tuned_settings(model_name) if model_name else None
+    return min(tuned["threads"], share) if tuned else share
+
+
+def available_cpus() -> List[int]:
+    """Rdzenie, na których proces może działać."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def pin_to_cpus(slot: int, count: int) -> Optional[List[int]]:
+    """
+    Przypina bieżący proces do `count` kolejnych rdzeni wybranych według numeru slotu.
+
+    Procesy z różnymi slotami dostają rozłączne grupy rdzeni (dopóki starcza rdzeni),
+    więc równoległe zadania nie konkurują o te same jednostki.
+
+    Args:
+        slot: Numer procesu roboczego (0, 1, ...)
+        count: Liczba rdzeni dla procesu
+
+    Returns:
+        Optional[List[int]]: Przypisane rdzenie lub None, jeśli system tego nie obsługuje
+    """
+    cpus = available_cpus()
+    count = max(1, min(count, len(cpus)))
+    groups = max(1, len(cpus) // count)
+    first = (slot % groups) * count
+    selected = cpus[first:first + count]
+    try:
+        if hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, selected)
+        elif sys.platform == "win32":
+            import ctypes
+            mask = sum(1 << cpu for cpu in selected)
+            kernel32 = ctypes.windll.kernel32
+            if not kernel32.SetProcessAffinityMask(kernel32.GetCurrentProcess(), ctypes.c_size_t(mask)):
+                raise ctypes.WinError()
+        else:
+            logger.info("Przypinanie do rdzeni nie jest obsługiwane w tym systemie.")
+            return None
+    except OSError as e:
+        logger.warning(f"Nie można przypiąć procesu do rdzeni {selected}: {e}")
+        return None
+    logger.info(f"Proces {os.getpid()} przypięty do rdzeni {selected}")
+    return selected
+
+
+def apply_thread_settings(model_name: Optional[str], threads: int = 0, slot: Optional[int] = None) -> int:
+    """
+    Ustawia liczbę wątków torch dla modelu (wynik kalibracji lub podaną wartość).
+
+    Args:
+        model_name: Nazwa modelu Whisper
+        threads: Liczba wątków (0 - z kalibracji; bez kalibracji ustawienia torch pozostają bez zmian)
+        slot: Numer procesu roboczego do przypięcia do rdzeni (None - bez przypinania)
+
+    Returns:
+        int: Ustawiona liczba wątków (0, jeśli nic nie zmieniono)
+    """
+    global _interop_applied
+    tuned = get_tuned_settings(model_name) if model_name else None
+    threads = threads or (tuned["threads"] if tuned else 0)
+    if not threads:
+        return 0
+    if slot is not None:
+        pin_to_cpus(slot, threads)
+    try:
+        import torch
+    except ImportError:
+        return 0
+
+    if tuned and tuned.get("interop_threads") and not _interop_applied:
+        _interop_applied = True
+        try:
+            torch.set_num_interop_threads(tuned["interop_threads"])
+        except RuntimeError:
+            # Pula inter-op już działa (np. model był używany) - zostaje ustawienie początkowe
+            pass
+    if torch.get_num_threads() != threads:
+        torch.set_num_threads(threads)
+        logger.info(f"Wątki obliczeniowe dla modelu '{model_name}': {threads}")
+    return threads
+
+
+def default_thread_candidates() -> List[int]:
+    """Liczby wątków do sprawdzenia: potęgi dwójki do liczby rdzeni oraz sama liczba rdzeni."""
+    cpu_count = len(available_cpus())
+    candidates = [1 << i for i in range(cpu_count.bit_length()) if 1 << i <= cpu_count]
+    return sorted(set(candidates + [cpu_count]))
+
+
+def calibration_audio(seconds: float = CALIBRATION_SECONDS, rate: int = 16000) -> np.ndarray:
+    """Sygnał o rytmie i widmie zbliżonym do mowy (harmoniczne modulowane w rytmie sylab)."""
+    t = np.arange(int(seconds * rate)) / rate
+    pitch = 140.0 + 30.0 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / rate
+    voice = sum(np.sin(k * phase) / k for k in range(1, 8))
+    envelope = np.clip(np.sin(2 * np.pi * 4.0 * t), 0.0, None) * (np.sin(2 * np.pi * 0.25 * t) > -0.5)
+    noise = np.random.default_rng(0).standard_normal(len(t)) * 0.003
+    return (0.2 * voice * envelope + noise).astype(np.float32)
+
+
+def _measure_model(model_name: str, thread_counts: List[int], interop_threads: int,
+                   audio: np.ndarray, repeat: int) -> List[Dict[str, Any]]:
+    """Mierzy RTF modelu dla kolejnych liczb wątków (w świeżym procesie z podanym inter-op)."""
+    import torch
+    torch.set_num_interop_threads(interop_threads)
+    from modules.local_stt import load_whisper_model, _build_transcribe_options
+
+    model = load_whisper_model(model_name)
+    if model is None:
+        raise RuntimeError(f"Nie udało się załadować modelu '{model_name}'")
+    options = _build_transcribe_options("en")
+    # Rozgrzewka - pierwsze wywołanie płaci za alokacje i inicjalizację jąder
+    model.transcribe(audio[:16000], temperature=0.0, condition_on_previous_text=False, **options)
+    seconds = len(audio) / 16000
+    rows = []
+    for threads in thread_counts:
+        torch.set_num_threads(threads)
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            model.transcribe(audio, temperature=0.0, condition_on_previous_text=False, **options)
+            timings.append(time.perf_counter() - started)
+        rows.append({"model": model_name, "threads": threads, "interop_threads": interop_threads,
+                     "rtf": min(timings) / seconds})
+    return rows
+
+
+def calibrate(models: List[str], thread_counts: Optional[List[int]] = None,
+              interop_choices: Optional[List[int]] = None, audio: Optional[np.ndarray] = None,
+              repeat: int = 1, path: str = THREAD_TUNING_PATH,
+              progress: Callable[[str], None] = logger.info) -> Dict[str, Any]:
+    """
+    Mierzy współczynnik czasu rzeczywistego (RTF) modeli dla kombinacji liczby wątków
+    i wątków inter-op, a najlepsze ustawienia każdego modelu zapisuje w pliku.
+
+    Każde ustawienie inter-op jest mierzone w osobnym procesie (torch pozwala je ustawić
+    tylko raz). Wyniki dla modeli, których nie mierzono, pozostają w pliku.
+
+    Args:
+        models: Nazwy modeli Whisper
+        thread_counts: Liczby wątków (domyślnie default_thread_candidates())
+        interop_choices: Liczby wątków inter-op (domyślnie DEFAULT_INTEROP_CHOICES)
+        audio: Nagranie kalibracyjne 16 kHz (domyślnie calibration_audio())
+        repeat: Powtórzenia każdego pomiaru (liczy się najszybsze)
+        path: Plik wyników
+        progress: Funkcja otrzymująca opis bieżącego kroku
+
+    Returns:
+        Dict[str, Any]: Zawartość zapisanego pliku wraz z wszystkimi pomiarami ("measurements")
+    """
+    global _tuning
+    thread_counts = thread_counts or default_thread_candidates()
+    interop_choices = interop_choices or DEFAULT_INTEROP_CHOICES
+    audio = calibration_audio() if audio is None else audio
+
+    tuned = load_thread_tuning(path)
+    measurements = []
+    context = multiprocessing.get_context("spawn")
+    for model_name in models:
+        best = None
+        for interop_threads in interop_choices:
+            progress(f"Kalibracja: {model_name}, inter-op: {interop_threads}, wątki: {thread_counts}")
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                try:
+                    rows = executor.submit(_measure_model, model_name, thread_counts, interop_threads,
+                                           audio, max(1, repeat)).result()
+                except Exception as e:
+                    progress(f"  błąd: {e}")
+                    continue
+            measurements.extend(rows)
+            for row in rows:
+                progress(f"  wątki {row['threads']:>3}: RTF {row['rtf']:.3f}")
+                if best is None or row["rtf"] < best["rtf"]:
+                    best = row
+        if best is not None:
+            tuned[model_name] = {"threads": best["threads"], "interop_threads": best["interop_threads"],
+                                 "rtf": round(best["rtf"], 4), "measured_at": time.time()}
+
+    data = {"fingerprint": machine_fingerprint(), "models": tuned}
+    if measurements:
+        _save_thread_tuning(data, path)
+    with _tuning_lock:
+        _tuning = None
+    return dict(data, measurements=measurements)
+
+
+def _save_thread_tuning(data: Dict[str, Any], path: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4)
+    os.replace(temp_path, path)
+    logger.info(f"Zapisano ustawienia wątków w {path}")
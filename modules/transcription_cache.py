@@ -0,0 +1,267 @@
+# X:\Aplikacje\dictaitor\modules\transcription_cache.py
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import logging
+from typing import Optional, Dict, Any, Union, List
+
+import numpy as np
+
+from modules.audio_io import MappedWav
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG_DIR = os.path.join(APP_DIR, "config")
+CACHE_DB_PATH = os.path.join(CONFIG_DIR, "transcription_cache.sqlite3")
+
+# Domyślne limity pamięci podręcznej
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_MAX_AGE_DAYS = 180
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+# Co ile zapisów uruchamiać usuwanie starych wpisów
+EVICTION_INTERVAL = 50
+
+
+class TranscriptionCache:
+    """
+    Trwała pamięć podręczna wyników transkrypcji (SQLite).
+
+    Klucz to skrót zdekodowanego audio połączony z backendem, modelem, językiem
+    i opcjami wpływającymi na wynik - ten sam dźwięk z innego pliku również trafia
+    w pamięć podręczną. Dodatkowo pamiętany jest skrót audio dla (ścieżka, rozmiar,
+    czas modyfikacji), więc ponowne otwarcie niezmienionego pliku nie wymaga dekodowania,
+    oraz język wykryty dla skrótu audio (zob. modules.language_id).
+    """
+
+    def __init__(self, db_path: str = CACHE_DB_PATH, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_age_days: float = DEFAULT_MAX_AGE_DAYS, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._puts_since_eviction = 0
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._create_tables()
+
+    def _create_tables(self) -> None:
+        with self._lock, self._connection:
+            self._connection.executescript("""
+                CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    backend TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    language TEXT,
+                    text TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    last_access REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS results_last_access ON results(last_access);
+                CREATE TABLE IF NOT EXISTS file_hashes (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    audio_hash TEXT NOT NULL,
+                    last_access REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS languages (
+                    audio_hash TEXT PRIMARY KEY,
+                    language TEXT NOT NULL,
+                    probability REAL,
+                    created REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS languages_created ON languages(created);
+                CREATE TABLE IF NOT EXISTS stats (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                );
+            """)
+
+    @staticmethod
+    def audio_hash(audio: Union[np.ndarray, MappedWav]) -> str:
+        """Skrót SHA-256 zdekodowanych próbek audio (plik zmapowany jest dekodowany blokami)."""
+        blocks = audio.iter_blocks() if isinstance(audio, MappedWav) else [audio]
+        digest = hashlib.sha256()
+        for block in blocks:
+            digest.update(np.ascontiguousarray(block).tobytes())
+        return digest.hexdigest()
+
+    @staticmethod
+    def make_key(audio_hash: str, backend: str, model: str, language: Optional[str],
+                 options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Buduje klucz wyniku.
+
+        Args:
+            audio_hash: Skrót zdekodowanego audio
+            backend: "local" lub "openai"
+            model: Nazwa modelu
+            language: Kod języka lub None (automatyczne wykrywanie)
+            options: Pozostałe opcje wpływające na wynik (np. poziom usuwania ciszy)
+        """
+        material = json.dumps([audio_hash, backend, model, language or "auto", options or {}], sort_keys=True)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def lookup_file_hash(self, path: str) -> Optional[str]:
+        """Zwraca zapamiętany skrót audio pliku, jeśli plik nie zmienił się od ostatniego dekodowania."""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        path = os.path.abspath(path)
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "SELECT audio_hash FROM file_hashes WHERE path = ? AND size = ? AND mtime_ns = ?",
+                (path, stat.st_size, stat.st_mtime_ns)
+            ).fetchone()
+            if row:
+                self._connection.execute("UPDATE file_hashes SET last_access = ? WHERE path = ?", (time.time(), path))
+        return row[0] if row else None
+
+    def remember_file_hash(self, path: str, audio_hash: str) -> None:
+        """Zapamiętuje skrót audio dla bieżącej wersji pliku."""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO file_hashes (path, size, mtime_ns, audio_hash, last_access) VALUES (?, ?, ?, ?, ?)",
+                (os.path.abspath(path), stat.st_size, stat.st_mtime_ns, audio_hash, time.time())
+            )
+
+    def get_language(self, audio_hash: str) -> Optional[str]:
+        """Zwraca język zapamiętany dla skrótu audio."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT language FROM languages WHERE audio_hash = ?", (audio_hash,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put_language(self, audio_hash: str, language: str, probability: Optional[float] = None) -> None:
+        """Zapamiętuje język wykryty dla skrótu audio (probability - pewność detekcji, jeśli znana)."""
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO languages (audio_hash, language, probability, created) VALUES (?, ?, ?, ?)",
+                (audio_hash, language, probability, time.time())
+            )
+
+    def recent_languages(self, limit: int) -> List[str]:
+        """Języki ostatnich `limit` nagrań, od najnowszego."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT language FROM languages ORDER BY created DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def get(self, key: str) -> Optional[str]:
+        """Zwraca zapisaną transkrypcję lub None (aktualizuje liczniki trafień/chybień)."""
+        with self._lock, self._connection:
+            row = self._connection.execute("SELECT text FROM results WHERE key = ?", (key,)).fetchone()
+            counter = "hits" if row else "misses"
+            if row:
+                self.hits += 1
+                self._connection.execute("UPDATE results SET last_access = ? WHERE key = ?", (time.time(), key))
+            else:
+                self.misses += 1
+            self._connection.execute(
+                "INSERT INTO stats (name, value) VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET value = value + 1",
+                (counter,)
+            )
+        return row[0] if row else None
+
+    def put(self, key: str, text: str, backend: str, model: str, language: Optional[str]) -> None:
+        """Zapisuje wynik transkrypcji."""
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO results (key, backend, model, language, text, size, created, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, backend, model, language, text, len(text.encode("utf-8")), now, now)
+            )
+            self._puts_since_eviction += 1
+            evict = self._puts_since_eviction >= EVICTION_INTERVAL
+        if evict:
+            self.evict()
+
+    def evict(self) -> int:
+        """
+        Usuwa wpisy starsze niż max_age_days oraz najdawniej używane ponad max_entries / max_bytes.
+
+        Returns:
+            int: Liczba usuniętych wyników
+        """
+        cutoff = time.time() - self.max_age_days * 86400
+        with self._lock, self._connection:
+            self._puts_since_eviction = 0
+            removed = self._connection.execute("DELETE FROM results WHERE last_access < ?", (cutoff,)).rowcount
+            self._connection.execute("DELETE FROM file_hashes WHERE last_access < ?", (cutoff,))
+            self._connection.execute("DELETE FROM languages WHERE created < ?", (cutoff,))
+
+            count, total_bytes = self._connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+            if count > self.max_entries or total_bytes > self.max_bytes:
+                # Przejdź od najnowszych i zachowaj tyle, ile mieści się w limitach
+                kept_bytes = 0
+                cutoff_access = None
+                rows = self._connection.execute("SELECT last_access, size FROM results ORDER BY last_access DESC")
+                for index, (last_access, size) in enumerate(rows):
+                    kept_bytes += size
+                    if index >= self.max_entries or kept_bytes > self.max_bytes:
+                        cutoff_access = last_access
+                        break
+                if cutoff_access is not None:
+                    removed += self._connection.execute(
+                        "DELETE FROM results WHERE last_access <= ?", (cutoff_access,)
+                    ).rowcount
+        if removed:
+            logger.info(f"Pamięć podręczna transkrypcji: usunięto {removed} wpisów")
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        """Zwraca statystyki: trafienia/chybienia (sesja i łącznie), liczbę wpisów i rozmiar."""
+        with self._lock:
+            totals = dict(self._connection.execute("SELECT name, value FROM stats").fetchall())
+            entries, total_bytes = self._connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+            ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "total_hits": totals.get("hits", 0),
+            "total_misses": totals.get("misses", 0),
+            "entries": entries,
+            "bytes": total_bytes,
+        }
+
+    def clear(self) -> None:
+        """Usuwa wszystkie zapisane wyniki, skróty plików i wykryte języki."""
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM results")
+            self._connection.execute("DELETE FROM file_hashes")
+            self._connection.execute("DELETE FROM languages")
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache() -> Optional[TranscriptionCache]:
+    """Zwraca współdzieloną pamięć podręczną aplikacji (None, jeśli nie da się jej otworzyć)."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            try:
+                _default_cache = TranscriptionCache()
+            except sqlite3.Error as e:
+                logger.error(f"Nie można otworzyć pamięci podręcznej transkrypcji {CACHE_DB_PATH}: {e}")
+                return None
+        return _default_cache
@@ -0,0 +1,217 @@
+# X:\Aplikacje\dictaitor\modules\vad.py
+import logging
+from typing import Tuple, List, Dict, Any, Iterator, Union
+
+import numpy as np
+
+from modules.audio_io import MappedWav
+
+logger = logging.getLogger(__name__)
+
+# Długość ramki analizy w milisekundach
+FRAME_MS = 30
+
+# Poziomy agresywności: (próg energii ponad poziom szumu w dB,
+#                        minimalna długość usuwanej ciszy w s,
+#                        margines zachowywany wokół mowy w s)
+VAD_PRESETS = {
+    1: (6.0, 1.0, 0.30),   # Łagodny - usuwa tylko długie pauzy
+    2: (9.0, 0.7, 0.20),   # Średni
+    3: (12.0, 0.5, 0.15),  # Agresywny
+}
+
+# Ramki cichsze niż ten poziom (dBFS) zawsze traktujemy jako ciszę
+ABSOLUTE_SILENCE_DB = -55.0
+# Udział przejść przez zero, powyżej którego cichą ramkę uznajemy za spółgłoskę bezdźwięczną
+SPEECH_ZCR = 0.25
+# Ile ramek analizować naraz w pliku zmapowanym do pamięci (~60 s)
+VAD_BLOCK_FRAMES = 2000
+
+
+class TimestampMap:
+    """
+    Mapowanie czasu w audio po usunięciu ciszy na czas w oryginalnym nagraniu.
+
+    Przechowuje początki zachowanych fragmentów w obu osiach czasu, dzięki czemu
+    znaczniki czasu segmentów z transkrypcji można przenieść na oryginał.
+    """
+
+    def __init__(self, trimmed_starts: np.ndarray, original_starts: np.ndarray, rate: int,
+                 original_samples: int, trimmed_samples: int):
+        self.trimmed_starts = trimmed_starts
+        self.original_starts = original_starts
+        self.rate = rate
+        self.original_samples = original_samples
+        self.trimmed_samples = trimmed_samples
+
+    @classmethod
+    def identity(cls, num_samples: int, rate: int) -> "TimestampMap":
+        """Mapowanie dla audio, z którego nic nie usunięto."""
+        zero = np.zeros(1, dtype=np.int64)
+        return cls(zero, zero.copy(), rate, num_samples, num_samples)
+
+    @property
+    def original_duration(self) -> float:
+        return self.original_samples / self.rate
+
+    @property
+    def trimmed_duration(self) -> float:
+        return self.trimmed_samples / self.rate
+
+    @property
+    def removed_seconds(self) -> float:
+        return max(0.0, self.original_duration - self.trimmed_duration)
+
+    def to_original(self, seconds: float) -> float:
+        """
+        Przelicza czas w audio po przycięciu na czas w oryginalnym nagraniu.
+
+        Args:
+            seconds: Czas w audio po usunięciu ciszy
+
+        Returns:
+            float: Odpowiadający mu czas w oryginale
+        """
+        sample = int(round(seconds * self.rate))
+        index = max(0, int(np.searchsorted(self.trimmed_starts, sample, side="right")) - 1)
+        return (self.original_starts[index] + sample - self.trimmed_starts[index]) / self.rate
+
+    def remap_segments(self, segments: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Przenosi znaczniki 'start'/'end' segmentów Whisper na oś czasu oryginału (w miejscu)."""
+        for segment in segments:
+            segment["start"] = self.to_original(segment["start"])
+            segment["end"] = self.to_original(segment["end"])
+        return segments
+
+
+def _frame_blocks(audio: Union[np.ndarray, MappedWav], frame_len: int) -> Iterator[np.ndarray]:
+    """Pełne ramki nagrania jako tablice (ramki, frame_len); plik zmapowany jest czytany blokami."""
+    if isinstance(audio, MappedWav):
+        blocks = audio.iter_blocks(VAD_BLOCK_FRAMES * frame_len)
+    else:
+        blocks = [audio]
+    for block in blocks:
+        num_frames = len(block) // frame_len
+        yield block[:num_frames * frame_len].reshape(num_frames, frame_len)
+
+
+def _energy_db(frames: np.ndarray) -> np.ndarray:
+    return 10.0 * np.log10(np.mean(np.square(frames, dtype=np.float32), axis=1) + 1e-10)
+
+
+def frame_energy_db(audio: Union[np.ndarray, MappedWav], rate: int = 16000) -> np.ndarray:
+    """
+    Oblicza energię kolejnych ramek FRAME_MS w dBFS.
+
+    Args:
+        audio: Próbki float32 w zakresie [-1, 1], mono (lub plik zmapowany MappedWav)
+        rate: Częstotliwość próbkowania
+
+    Returns:
+        np.ndarray: Energia każdej pełnej ramki
+    """
+    frame_len = rate * FRAME_MS // 1000
+    return np.concatenate([_energy_db(frames) for frames in _frame_blocks(audio, frame_len)])
+
+
+def detect_speech_frames(audio: Union[np.ndarray, MappedWav], rate: int = 16000,
+                         aggressiveness: int = 2) -> np.ndarray:
+    """
+    Wyznacza ramki zawierające mowę na podstawie energii i liczby przejść przez zero.
+
+    Args:
+        audio: Próbki float32 w zakresie [-1, 1], mono (lub plik zmapowany MappedWav)
+        rate: Częstotliwość próbkowania
+        aggressiveness: Poziom agresywności (1-3)
+
+    Returns:
+        np.ndarray: Maska bool dla kolejnych ramek o długości FRAME_MS
+    """
+    margin_db = VAD_PRESETS[aggressiveness][0]
+    frame_len = rate * FRAME_MS // 1000
+    if len(audio) // frame_len == 0:
+        return np.zeros(0, dtype=bool)
+
+    energies, zcrs = [], []
+    for frames in _frame_blocks(audio, frame_len):
+        signs = np.signbit(frames)
+        energies.append(_energy_db(frames))
+        zcrs.append(np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / frame_len)
+    energy_db = np.concatenate(energies)
+    zcr = np.concatenate(zcrs)
+
+    noise_floor = np.percentile(energy_db, 10)
+    speech_level = np.percentile(energy_db, 90)
+    if speech_level - noise_floor < margin_db:
+        # Brak wyraźnych pauz (np. ciągła mowa) - zostaw wszystko poza absolutną ciszą
+        return energy_db > ABSOLUTE_SILENCE_DB
+
+    threshold = noise_floor + margin_db
+    voiced = energy_db > threshold
+    unvoiced = (energy_db > noise_floor + margin_db / 2) & (zcr > SPEECH_ZCR)
+    return (voiced | unvoiced) & (energy_db > ABSOLUTE_SILENCE_DB)
+
+
+def trim_silence(audio: Union[np.ndarray, MappedWav], rate: int = 16000,
+                 aggressiveness: int = 2) -> Tuple[Union[np.ndarray, MappedWav], TimestampMap]:
+    """
+    Usuwa długie fragmenty bez mowy z nagrania.
+
+    Krótkie pauzy i margines wokół mowy są zachowywane, aby nie ucinać słów
+    ani nie sklejać zdań w nienaturalny sposób. Plik zmapowany (MappedWav) jest
+    analizowany blokami; gdy nie ma czego usuwać, zwracany jest bez dekodowania.
+
+    Args:
+        audio: Próbki float32 w zakresie [-1, 1], mono (lub plik zmapowany MappedWav)
+        rate: Częstotliwość próbkowania
+        aggressiveness: Poziom agresywności (1-3); 0 wyłącza usuwanie ciszy
+
+    Returns:
+        Tuple[np.ndarray, TimestampMap]: (audio bez długich pauz, mapowanie czasu na oryginał)
+    """
+    if aggressiveness not in VAD_PRESETS or len(audio) == 0:
+        return audio, TimestampMap.identity(len(audio), rate)
+
+    _, min_silence_s, padding_s = VAD_PRESETS[aggressiveness]
+    frame_len = rate * FRAME_MS // 1000
+    speech = detect_speech_frames(audio, rate, aggressiveness)
+    if speech.size == 0:
+        return audio, TimestampMap.identity(len(audio), rate)
+
+    # Poszerz mowę o margines (dylatacja maski splotem)
+    pad_frames = int(round(padding_s * 1000 / FRAME_MS))
+    if pad_frames > 0:
+        speech = np.convolve(speech.astype(np.int8), np.ones(2 * pad_frames + 1, dtype=np.int8), mode="same") > 0
+
+    # Znajdź ciągi ramek ciszy
+    edges = np.diff(np.concatenate(([1], speech.astype(np.int8), [1])))
+    silence_starts = np.flatnonzero(edges == -1)
+    silence_ends = np.flatnonzero(edges == 1)
+    min_silence_frames = int(round(min_silence_s * 1000 / FRAME_MS))
+    long_silences = (silence_ends - silence_starts) >= min_silence_frames
+    silence_starts = silence_starts[long_silences] * frame_len
+    silence_ends = silence_ends[long_silences] * frame_len
+    # Ostatnia, niepełna ramka należy do ciszy, jeśli cisza sięga końca nagrania
+    silence_ends[silence_ends >= speech.size * frame_len] = len(audio)
+
+    if silence_starts.size == 0:
+        return audio, TimestampMap.identity(len(audio), rate)
+
+    keep_starts = np.concatenate(([0], silence_ends))
+    keep_ends = np.concatenate((silence_starts, [len(audio)]))
+    non_empty = keep_ends > keep_starts
+    keep_starts, keep_ends = keep_starts[non_empty], keep_ends[non_empty]
+
+    if keep_starts.size == 0:
+        logger.info("VAD: nie wykryto mowy w nagraniu.")
+        zero = np.zeros(1, dtype=np.int64)
+        return audio[:0], TimestampMap(zero, zero.copy(), rate, len(audio), 0)
+
+    lengths = keep_ends - keep_starts
+    trimmed_starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    trimmed = np.concatenate([audio[start:end] for start, end in zip(keep_starts, keep_ends)])
+
+    tmap = TimestampMap(trimmed_starts, keep_starts, rate, len(audio), len(trimmed))
+    logger.info(f"VAD: usunięto {tmap.removed_seconds:.1f} s ciszy z {tmap.original_duration:.1f} s "
+                f"({100 * tmap.removed_seconds / max(tmap.original_duration, 1e-9):.0f}%)")
+    return trimmed, tmap
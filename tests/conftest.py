@@ -0,0 +1,8 @@
+# X:\Aplikacje\dictaitor\tests\conftest.py
+"""Wspólna konfiguracja testów: moduły aplikacji importowane z katalogu głównego."""
+import os
+import sys
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
@@ -0,0 +1,273 @@
+# X:\Aplikacje\dictaitor\tests\test_audio_recorder.py
+import threading
+import wave
+
+import numpy as np
+import pytest
+
+from modules import audio_recorder, metrics
+from modules.audio_recorder import AudioRecorder, PcmArena, StreamingWavWriter
+from modules.audio_sources import ArraySource
+
+RATE = 100  # Mała częstotliwość - bloki po kilkaset próbek
+
+
+def make_arena(channels: int = 1, max_blocks: int = 0) -> PcmArena:
+    # Blok 500 próbek, zakładka 100 -> blok i zaczyna się od próbki 400 * i
+    return PcmArena(RATE, channels, block_seconds=5, overlap_seconds=1, max_blocks=max_blocks)
+
+
+def reference(frames: int, channels: int = 1) -> np.ndarray:
+    return (np.arange(frames * channels) % 30000).astype(np.int16).reshape(-1, channels)
+
+
+def fill(arena: PcmArena, samples: np.ndarray, chunk: int = 37) -> None:
+    for start in range(0, len(samples), chunk):
+        arena.write(samples[start:start + chunk].tobytes())
+
+
+def test_block_layout():
+    arena = make_arena()
+    assert (arena.capacity, arena.overlap, arena.step) == (500, 100, 400)
+    # Blok nie może być krótszy niż dwie zakładki
+    assert PcmArena(RATE, block_seconds=1, overlap_seconds=1).capacity == 200
+
+
+@pytest.mark.parametrize("channels", [1, 2])
+def test_views_match_written_samples(channels):
+    samples = reference(2345, channels)
+    arena = make_arena(channels)
+    fill(arena, samples)
+
+    assert len(arena) == len(samples)
+    np.testing.assert_array_equal(arena.view(), samples)
+    for start, end in [(0, 1), (399, 401), (395, 505), (400, 500), (0, 900), (777, 2345), (2300, 5000)]:
+        np.testing.assert_array_equal(arena.view(start, end), samples[start:end])
+        parts = list(arena.iter_views(start, end))
+        np.testing.assert_array_equal(np.concatenate(parts), samples[start:end])
+
+
+def test_short_ranges_are_views_without_copy():
+    samples = reference(2345)
+    arena = make_arena()
+    fill(arena, samples)
+
+    # Zakres nie dłuższy niż zakładka leży zawsze w jednym bloku
+    for start in range(0, len(samples) - arena.overlap, 13):
+        window = arena.view(start, start + arena.overlap)
+        assert window.base is not None and not window.flags.owndata
+        np.testing.assert_array_equal(window, samples[start:start + arena.overlap])
+    np.testing.assert_array_equal(arena.last(arena.overlap), samples[-arena.overlap:])
+    assert not arena.last(arena.overlap).flags.owndata
+
+
+def test_iter_views_cover_range_without_repeats():
+    arena = make_arena()
+    fill(arena, reference(1700))
+    lengths = [len(part) for part in arena.iter_views()]
+    assert sum(lengths) == 1700
+    assert lengths == [500, 400, 400, 400]
+
+
+def test_out_of_range_requests_are_clamped():
+    samples = reference(450)
+    arena = make_arena()
+    assert arena.view().shape == (0, 1)
+    fill(arena, samples)
+    np.testing.assert_array_equal(arena.view(-5, 10_000), samples)
+    assert arena.view(300, 200).shape == (0, 1)
+    np.testing.assert_array_equal(arena.last(10_000), samples)
+
+
+def test_max_blocks_drops_oldest_blocks():
+    samples = reference(3000)
+    arena = make_arena(max_blocks=2)
+    fill(arena, samples)
+
+    assert len(arena) == len(samples)
+    # Zachowane są dwa ostatnie bloki: [2400, 2900) i [2800, 3300)
+    assert arena.start_frame == 2400
+    assert arena.nbytes == 2 * arena.capacity * samples.itemsize
+    np.testing.assert_array_equal(arena.view(), samples[2400:])
+    np.testing.assert_array_equal(arena.view(0, 2500), samples[2400:2500])
+    assert arena.view(0, 2000).shape == (0, 1)
+    # Ostatnie `step` próbek są dostępne zawsze
+    np.testing.assert_array_equal(arena.last(arena.step), samples[-arena.step:])
+
+
+def test_views_keep_their_data_after_block_is_dropped():
+    samples = reference(3000)
+    arena = make_arena(max_blocks=2)
+    fill(arena, samples[:450])
+    window = arena.view(350, 450)
+    parts = list(arena.iter_views(0, 450))
+
+    fill(arena, samples[450:])
+    assert arena.start_frame > 450
+    np.testing.assert_array_equal(window, samples[350:450])
+    np.testing.assert_array_equal(np.concatenate(parts), samples[:450])
+
+
+def test_concurrent_reads_while_blocks_are_dropped():
+    samples = reference(200_000)
+    arena = make_arena(max_blocks=2)
+    stop = threading.Event()
+    mismatches = []
+
+    def reader():
+        while not stop.is_set():
+            end = len(arena)
+            for start, stop_at in ((0, end), (max(0, end - 900), end), (max(0, end - 50), end)):
+                window = arena.view(start, stop_at)
+                # Zakres sprzed start_frame jest obcinany - sprawdź, czy dane pasują do końca zakresu
+                if not np.array_equal(window, samples[stop_at - len(window):stop_at]):
+                    mismatches.append((start, stop_at))
+
+    threads = [threading.Thread(target=reader) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    fill(arena, samples, chunk=7)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    assert mismatches == []
+
+
+def test_unbounded_arena_keeps_everything():
+    samples = reference(3000)
+    arena = make_arena()
+    fill(arena, samples)
+    assert arena.start_frame == 0
+    assert arena.nbytes == 8 * arena.capacity * samples.itemsize
+
+
+@pytest.fixture
+def recordings_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(audio_recorder, "RECORDINGS_DIR", str(tmp_path))
+    return tmp_path
+
+
+def record(audio: np.ndarray, **options) -> AudioRecorder:
+    source = ArraySource(audio, rate=16000, chunk_size=16000, speed=0)
+    recorder = AudioRecorder(source=source, **options)
+    assert recorder.start_recording()
+    assert source.finished.wait(30)
+    recorder.stop_recording()
+    return recorder
+
+
+def long_recording() -> np.ndarray:
+    # Dłuższe niż dwa bloki bufora (ARENA_BLOCK_SECONDS) - przy zapisie na dysk początek jest zwalniany
+    seconds = 2 * audio_recorder.ARENA_BLOCK_SECONDS + 60
+    rng = np.random.default_rng(0)
+    return rng.integers(-20000, 20000, int(seconds * 16000), dtype=np.int16)
+
+
+def test_streaming_recorder_reads_head_from_file(recordings_dir):
+    audio = long_recording()
+    recorder = record(audio)
+
+    assert recorder.saved_filepath
+    assert not recorder.holds_full_recording()
+    assert recorder.pcm_arena.start_frame > 0
+    expected = audio.astype(np.float32) / 32768.0
+    np.testing.assert_array_equal(recorder.get_audio_array(), expected)
+    np.testing.assert_array_equal(recorder.get_audio_array(1000, 2000), expected[1000:2000])
+    assert recorder.save_to_file() == recorder.saved_filepath
+
+
+def test_duration_metric_without_memory_buffer(recordings_dir):
+    audio = np.zeros(16000 * 30, dtype=np.int16)
+    timer = metrics.JobTimer("recording")
+    with timer.activate():
+        recorder = record(audio, keep_in_memory=False)
+    assert not recorder.has_audio()
+    assert timer.record["audio_seconds"] == pytest.approx(30.0)
+
+
+def test_in_memory_recorder_keeps_full_recording(recordings_dir):
+    audio = long_recording()
+    recorder = record(audio, stream_to_disk=False)
+
+    assert recorder.saved_filepath is None
+    assert recorder.holds_full_recording()
+    np.testing.assert_array_equal(recorder.get_audio_array(), audio.astype(np.float32) / 32768.0)
+    assert recorder.save_to_file()
+
+
+class FailingFile:
+    """Plik, do którego po `fail_after` bajtach danych nie da się nic zapisać (np. pełny dysk)."""
+
+    def __init__(self, file, fail_after: int):
+        self._file = file
+        self.fail_after = fail_after
+
+    def write(self, data):
+        if len(data) != StreamingWavWriter._HEADER_SIZE:
+            if self.fail_after < len(data):
+                raise OSError("Brak miejsca na dysku")
+            self.fail_after -= len(data)
+        return self._file.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+def test_wav_writer_stops_after_write_error(tmp_path):
+    writer = StreamingWavWriter(str(tmp_path / "nagranie.wav"), 16000, 1, 2)
+    writer.open()
+    writer._file = FailingFile(writer._file, fail_after=4096)
+    for _ in range(10):
+        writer.write(b"\x01\x00" * 1024)
+    # Po błędzie wątek zapisujący kończy się, a kolejne ramki nie trafiają do kolejki
+    writer._thread.join(5)
+
+    assert isinstance(writer.error, OSError)
+    writer.write(b"\x01\x00" * 1024)
+    assert writer._queue.empty()
+    assert writer.close() == 4096
+    with wave.open(str(tmp_path / "nagranie.wav")) as wav_file:
+        assert wav_file.getnframes() == 2048
+
+
+def test_wav_writer_queue_overflow_is_an_error(tmp_path, monkeypatch):
+    monkeypatch.setattr(audio_recorder, "WAV_WRITER_MAX_QUEUED", 3)
+    writer = StreamingWavWriter(str(tmp_path / "nagranie.wav"), 16000, 1, 2)
+    # Wątek zapisujący nie działa - kolejka się zapełnia
+    writer._file = open(str(tmp_path / "nagranie.wav"), "wb")
+    for _ in range(5):
+        writer.write(b"\x00\x00" * 16)
+    assert writer.error is not None
+    assert writer._queue.qsize() == 3
+    writer.close()
+
+
+def test_recorder_reports_wav_write_error(recordings_dir):
+    audio = np.zeros(16000 * 30, dtype=np.int16)
+    source = ArraySource(audio, rate=16000, chunk_size=1600, speed=0)
+    recorder = AudioRecorder(source=source)
+    errors = []
+    stopped = threading.Event()
+
+    def on_source_stopped(error):
+        errors.append(error)
+        stopped.set()
+
+    recorder.on_source_stopped = on_source_stopped
+    original_start = recorder.source.start
+
+    def start(on_chunk, on_stop=None):
+        recorder.wav_writer._file = FailingFile(recorder.wav_writer._file, fail_after=16000 * 2)
+        original_start(on_chunk, on_stop)
+
+    recorder.source.start = start
+    assert recorder.start_recording()
+    assert stopped.wait(10)
+    assert isinstance(errors[0], OSError)
+    assert not recorder.is_active()
+    assert recorder.needs_stop()
+
+    path = recorder.stop_recording()
+    assert not recorder.needs_stop()
+    with wave.open(path) as wav_file:
+        assert wav_file.getnframes() == 16000
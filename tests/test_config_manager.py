@@ -0,0 +1,111 @@
+# X:\Aplikacje\dictaitor\tests\test_config_manager.py
+import json
+import os
+import time
+
+import pytest
+
+from modules import config_manager
+from modules.config_manager import ConfigStore
+
+
+@pytest.fixture
+def config_path(tmp_path):
+    return str(tmp_path / "config" / "settings.json")
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f)
+    # Zapis z zewnątrz musi zmienić czas modyfikacji także na systemach plików z grubą rozdzielczością
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def read_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def test_missing_file_gives_empty_config(config_path):
+    store = ConfigStore(config_path, save_delay=60)
+    assert store.data() == {}
+    assert store.get("model", "tiny") == "tiny"
+    assert store.flush()
+    assert not os.path.exists(config_path)
+
+
+def test_burst_of_updates_is_saved_once(config_path, monkeypatch):
+    store = ConfigStore(config_path, save_delay=0.2)
+    writes = []
+    original_write = store._write
+
+    def counting_write(data):
+        writes.append(dict(data))
+        return original_write(data)
+
+    monkeypatch.setattr(store, "_write", counting_write)
+
+    for index in range(5):
+        store.set("counter", index)
+    store.update({"model": "base", "language": "pl"})
+    assert writes == []
+    assert store.get("counter") == 4
+
+    deadline = time.monotonic() + 5
+    while not writes and time.monotonic() < deadline:
+        time.sleep(0.05)
+    # Po zapisie nie jest planowany kolejny
+    time.sleep(0.3)
+    assert writes == [{"counter": 4, "model": "base", "language": "pl"}]
+    assert read_json(config_path) == writes[0]
+
+
+def test_flush_merges_pending_changes_into_external_edit(config_path):
+    write_json(config_path, {"model": "tiny", "language": "en"})
+    store = ConfigStore(config_path, save_delay=60)
+    store.set("language", "pl")
+
+    # Inny proces zmienia plik, zanim zapiszemy nasze zmiany
+    write_json(config_path, {"model": "small", "language": "de", "theme": "dark"})
+    assert store.flush()
+
+    assert read_json(config_path) == {"model": "small", "language": "pl", "theme": "dark"}
+    assert store.data() == read_json(config_path)
+
+
+def test_external_change_is_reloaded(config_path, monkeypatch):
+    monkeypatch.setattr(config_manager, "MTIME_CHECK_INTERVAL", 0.0)
+    write_json(config_path, {"model": "tiny"})
+    store = ConfigStore(config_path, save_delay=60)
+    assert store.get("model") == "tiny"
+
+    write_json(config_path, {"model": "medium"})
+    assert store.get("model") == "medium"
+
+
+def test_replace_drops_old_keys(config_path):
+    write_json(config_path, {"model": "tiny", "old_key": 1})
+    store = ConfigStore(config_path, save_delay=60)
+    store.replace({"model": "base"})
+    assert store.flush()
+    assert read_json(config_path) == {"model": "base"}
+
+
+def test_invalid_file_keeps_defaults_and_is_not_overwritten_without_changes(config_path):
+    os.makedirs(os.path.dirname(config_path))
+    with open(config_path, "w") as f:
+        f.write("{niepoprawny json")
+    store = ConfigStore(config_path, save_delay=60)
+    assert store.data() == {}
+    assert store.flush()
+    with open(config_path) as f:
+        assert f.read() == "{niepoprawny json"
+
+
+def test_write_leaves_no_temporary_files(config_path):
+    store = ConfigStore(config_path, save_delay=60)
+    store.set("model", "base")
+    assert store.flush()
+    assert os.listdir(os.path.dirname(config_path)) == ["settings.json"]
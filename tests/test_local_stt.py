@@ -0,0 +1,43 @@
+# X:\Aplikacje\dictaitor\tests\test_local_stt.py
+import pytest
+
+from modules import local_stt
+from modules.local_stt import WhisperModelPool
+
+
+class FakeModel:
+    def __init__(self):
+        self.calls = 0
+
+    def transcribe(self, audio, **options):
+        self.calls += 1
+        return {"text": "", "segments": [], "language": "en"}
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = WhisperModelPool(idle_timeout=0)
+    monkeypatch.setattr(local_stt, "model_pool", pool)
+    monkeypatch.setattr(local_stt, "WHISPER_INSTALLED", True)
+    return pool
+
+
+def test_inference_lock_is_shared_per_model(pool):
+    assert pool.inference_lock("tiny") is pool.inference_lock("tiny")
+    assert pool.inference_lock("tiny") is not pool.inference_lock("base")
+
+
+def test_warm_up_runs_inference_when_model_is_free(pool, monkeypatch):
+    model = FakeModel()
+    monkeypatch.setattr(local_stt, "load_whisper_model", lambda name: model)
+    assert local_stt.warm_up_model("tiny")
+    assert model.calls == 1
+    assert not pool.inference_lock("tiny").locked()
+
+
+def test_warm_up_skips_inference_while_model_is_in_use(pool, monkeypatch):
+    model = FakeModel()
+    monkeypatch.setattr(local_stt, "load_whisper_model", lambda name: model)
+    with pool.inference_lock("tiny"):
+        assert local_stt.warm_up_model("tiny")
+    assert model.calls == 0
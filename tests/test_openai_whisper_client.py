@@ -0,0 +1,99 @@
+# X:\Aplikacje\dictaitor\tests\test_openai_whisper_client.py
+import threading
+import time
+
+import pytest
+
+requests = pytest.importorskip("requests")
+
+from modules.jobs import CancellationToken, JobCancelled
+from modules.openai_whisper_client import OpenAIWhisperClient
+
+
+def make_response(status_code: int) -> "requests.Response":
+    response = requests.Response()
+    response.status_code = status_code
+    return response
+
+
+class FakeUploads:
+    """Zastępuje wysyłanie fragmentu: fragment o nazwie z `slow` czeka na zwolnienie, `errors` zgłaszają błąd."""
+
+    def __init__(self, slow=(), errors=None):
+        self.slow = set(slow)
+        self.errors = dict(errors or {})
+        self.release = threading.Event()
+        self.calls = []
+
+    def __call__(self, file_name, payload, language, detected_languages=None):
+        self.calls.append(file_name)
+        if file_name in self.slow:
+            self.release.wait(10)
+        error = self.errors.get(file_name)
+        if error is not None:
+            if isinstance(error, list):
+                error = error.pop(0) if error else None
+            if error is not None:
+                raise error
+        return f"tekst {file_name}"
+
+
+@pytest.fixture
+def client():
+    return OpenAIWhisperClient(api_key="test")
+
+
+def segments(count: int):
+    return [(f"s{index}", b"") for index in range(count)]
+
+
+def test_results_are_joined_in_segment_order(client, monkeypatch):
+    uploads = FakeUploads()
+    monkeypatch.setattr(client, "_upload_segment", uploads)
+    assert client._transcribe_segments(segments(3), "pl") == "tekst s0 tekst s1 tekst s2"
+
+
+def test_cancel_does_not_wait_for_uploads_in_flight(client, monkeypatch):
+    uploads = FakeUploads(slow={"s0"})
+    monkeypatch.setattr(client, "_upload_segment", uploads)
+    token = CancellationToken()
+    threading.Timer(0.2, token.cancel).start()
+
+    started = time.monotonic()
+    with pytest.raises(JobCancelled):
+        client._transcribe_segments(segments(2), "pl", cancel_token=token)
+    assert time.monotonic() - started < 2
+    uploads.release.set()
+
+
+def test_failure_of_later_segment_is_reported_without_waiting_for_earlier(client, monkeypatch):
+    uploads = FakeUploads(slow={"s0"}, errors={"s1": requests.exceptions.HTTPError(response=make_response(400))})
+    monkeypatch.setattr(client, "_upload_segment", uploads)
+
+    started = time.monotonic()
+    with pytest.raises(requests.exceptions.HTTPError):
+        client._transcribe_segments(segments(2), "pl")
+    assert time.monotonic() - started < 2
+    uploads.release.set()
+
+
+def test_only_failed_segments_are_retried(client, monkeypatch):
+    monkeypatch.setattr("modules.jobs.time.sleep", lambda seconds: None)
+    uploads = FakeUploads(errors={"s1": [requests.exceptions.ConnectionError()]})
+    monkeypatch.setattr(client, "_upload_segment", uploads)
+
+    assert client._transcribe_segments(segments(3), "pl") == "tekst s0 tekst s1 tekst s2"
+    assert sorted(uploads.calls) == ["s0", "s1", "s1", "s2"]
+
+
+def test_cancel_interrupts_retry_delay(client, monkeypatch):
+    uploads = FakeUploads(errors={"s0": [requests.exceptions.ConnectionError()]})
+    monkeypatch.setattr(client, "_upload_segment", uploads)
+    token = CancellationToken()
+    threading.Timer(0.2, token.cancel).start()
+
+    started = time.monotonic()
+    with pytest.raises(JobCancelled):
+        client._transcribe_segments(segments(1), "pl", cancel_token=token)
+    assert time.monotonic() - started < 1
+    assert uploads.calls == ["s0"]
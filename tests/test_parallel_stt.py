@@ -0,0 +1,120 @@
+# X:\Aplikacje\dictaitor\tests\test_parallel_stt.py
+import numpy as np
+import pytest
+
+from modules import parallel_stt
+from modules.parallel_stt import (
+    merge_overlapping_texts, split_at_silence, chunk_ranges, chunk_result, assemble_chunk_results
+)
+
+RATE = 16000
+
+
+def test_merge_removes_words_repeated_in_overlap():
+    texts = ["Ala ma kota i psa", "kota i psa, a także rybki."]
+    assert merge_overlapping_texts(texts) == "Ala ma kota i psa a także rybki."
+
+
+def test_merge_ignores_case_and_punctuation():
+    texts = ["We went to the Station.", "the station, then home"]
+    assert merge_overlapping_texts(texts) == "We went to the Station. then home"
+
+
+def test_merge_keeps_single_short_repeated_word():
+    # Jedno krótkie słowo to zbyt słaby dowód powtórzenia
+    assert merge_overlapping_texts(["to jest to", "to nie to"]) == "to jest to to nie to"
+    assert merge_overlapping_texts(["koniec zdania", "zdania kolejne"]) == "koniec zdania kolejne"
+
+
+def test_merge_respects_max_overlap_words():
+    texts = ["jeden dwa trzy cztery", "jeden dwa trzy cztery pięć"]
+    assert merge_overlapping_texts(texts) == "jeden dwa trzy cztery pięć"
+    assert merge_overlapping_texts(texts, max_overlap_words=3) == "jeden dwa trzy cztery jeden dwa trzy cztery pięć"
+
+
+def test_merge_handles_empty_fragments():
+    assert merge_overlapping_texts([]) == ""
+    assert merge_overlapping_texts(["", "tekst", ""]) == "tekst"
+
+
+def test_split_at_silence_cuts_in_pauses():
+    rng = np.random.default_rng(0)
+    audio = (rng.standard_normal(100 * RATE) * 0.3).astype(np.float32)
+    pauses = (35, 70)
+    for pause in pauses:
+        audio[pause * RATE:(pause + 1) * RATE] = 0.0
+
+    bounds = split_at_silence(audio, RATE, min_chunk_s=20.0, max_chunk_s=45.0)
+
+    assert bounds[0][0] == 0 and bounds[-1][1] == len(audio)
+    assert all(end == next_start for (_, end), (next_start, _) in zip(bounds, bounds[1:]))
+    cuts = [end / RATE for _, end in bounds[:-1]]
+    assert len(cuts) == len(pauses)
+    for cut, pause in zip(cuts, pauses):
+        assert pause <= cut <= pause + 1
+
+
+def test_split_at_silence_short_audio_is_one_chunk():
+    audio = np.zeros(10 * RATE, dtype=np.float32)
+    assert split_at_silence(audio, RATE, max_chunk_s=30.0) == [(0, len(audio))]
+
+
+def test_assemble_drops_segments_from_overlap():
+    bounds = [(0, 10 * RATE), (10 * RATE, 20 * RATE)]
+    ranges = chunk_ranges(bounds, RATE)
+    assert ranges[0] == bounds[0]
+    assert ranges[1][0] < bounds[1][0]
+
+    offset = ranges[1][0] / RATE
+    results = [
+        chunk_result(1, {"text": " końcówka zdania dalej", "segments": [
+            {"start": 0.0, "end": 0.5, "text": "końcówka zdania"},
+            {"start": 1.5, "end": 4.0, "text": "dalej"},
+        ]}, offset),
+        chunk_result(0, {"text": " początek końcówka zdania", "segments": [
+            {"start": 0.0, "end": 9.9, "text": "początek końcówka zdania"},
+        ]}, 0.0),
+    ]
+    assembled = assemble_chunk_results(results, bounds, "pl", RATE)
+
+    assert assembled["text"] == "początek końcówka zdania dalej"
+    assert [segment["text"] for segment in assembled["segments"]] == ["początek końcówka zdania", "dalej"]
+    assert assembled["segments"][1]["start"] == offset + 1.5
+    assert assembled["language"] == "pl"
+
+
+def test_merge_unspaced_scripts_by_characters():
+    assert merge_overlapping_texts(["今天天气很好我们去公园", "我们去公园散步吧"]) == "今天天气很好我们去公园 散步吧"
+    assert merge_overlapping_texts(["今日は良い天気です。", "良い天気です、散歩しましょう"]) == "今日は良い天気です。 散歩しましょう"
+    # Zbyt krótkie powtórzenie może być przypadkowe
+    assert merge_overlapping_texts(["我们去", "去公园"]) == "我们去 去公园"
+
+
+def test_broken_pool_is_discarded(monkeypatch):
+    from concurrent.futures import Future
+    from concurrent.futures.process import BrokenProcessPool
+
+    class BrokenPool:
+        shut_down = False
+
+        def submit(self, *args, **kwargs):
+            future = Future()
+            future.set_exception(BrokenProcessPool("proces zakończony"))
+            return future
+
+        def shutdown(self, wait=True, cancel_futures=False):
+            self.shut_down = True
+
+    pool = BrokenPool()
+
+    def get_pool(model_name, workers, threads):
+        parallel_stt._pool = pool
+        parallel_stt._pool_key = (model_name, workers, threads)
+        return pool
+
+    monkeypatch.setattr(parallel_stt, "_get_pool", get_pool)
+    audio = np.zeros(200 * RATE, dtype=np.float32)
+    with pytest.raises(RuntimeError, match="Proces roboczy"):
+        parallel_stt.transcribe_parallel(audio, "tiny", "pl", workers=2, threads_per_worker=1, rate=RATE)
+    assert pool.shut_down
+    assert parallel_stt._pool is None and parallel_stt._pool_key is None
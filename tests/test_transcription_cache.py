@@ -0,0 +1,134 @@
+# X:\Aplikacje\dictaitor\tests\test_transcription_cache.py
+import os
+
+import pytest
+
+from modules import transcription_cache
+from modules.transcription_cache import TranscriptionCache, EVICTION_INTERVAL
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(transcription_cache.time, "time", fake)
+    return fake
+
+
+@pytest.fixture
+def make_cache(tmp_path):
+    caches = []
+
+    def make(**limits):
+        cache = TranscriptionCache(str(tmp_path / "cache" / "db.sqlite3"), **limits)
+        caches.append(cache)
+        return cache
+
+    yield make
+    for cache in caches:
+        cache._connection.close()
+
+
+def put_entries(cache, clock, keys, text="tekst"):
+    for key in keys:
+        cache.put(key, text, "local", "tiny", "pl")
+        clock.advance(1)
+
+
+def test_put_get_and_stats(make_cache, clock):
+    cache = make_cache()
+    cache.put("a", "zażółć", "local", "tiny", "pl")
+    assert cache.get("a") == "zażółć"
+    assert cache.get("b") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    assert stats["bytes"] == len("zażółć".encode("utf-8"))
+
+
+def test_evict_over_max_entries_keeps_most_recently_used(make_cache, clock):
+    cache = make_cache(max_entries=3)
+    put_entries(cache, clock, ["a", "b", "c", "d", "e"])
+    # Odczyt odświeża last_access - "a" staje się najświeższe
+    cache.get("a")
+
+    assert cache.evict() == 2
+    assert [key for key in "abcde" if cache.get(key) is not None] == ["a", "d", "e"]
+
+
+def test_evict_over_max_bytes(make_cache, clock):
+    cache = make_cache(max_bytes=25)
+    put_entries(cache, clock, ["a", "b", "c", "d"], text="x" * 10)
+
+    assert cache.evict() == 2
+    assert cache.stats()["bytes"] == 20
+    assert cache.get("a") is None and cache.get("d") is not None
+
+
+def test_evict_by_age(make_cache, clock):
+    cache = make_cache(max_age_days=1)
+    put_entries(cache, clock, ["old"])
+    cache.put_language("hash-old", "pl")
+    clock.advance(2 * 86400)
+    put_entries(cache, clock, ["new"])
+
+    assert cache.evict() == 1
+    assert cache.get("old") is None
+    assert cache.get("new") is not None
+    assert cache.get_language("hash-old") is None
+
+
+def test_put_runs_eviction_periodically(make_cache, clock):
+    cache = make_cache(max_entries=5)
+    put_entries(cache, clock, [f"k{i}" for i in range(EVICTION_INTERVAL - 1)])
+    assert cache.stats()["entries"] == EVICTION_INTERVAL - 1
+    put_entries(cache, clock, ["last"])
+    assert cache.stats()["entries"] == 5
+    assert cache.get("last") is not None
+
+
+def test_file_hash_lookup_refreshes_last_access(make_cache, clock, tmp_path):
+    cache = make_cache(max_age_days=1)
+    audio_file = tmp_path / "nagranie.wav"
+    audio_file.write_bytes(b"RIFF")
+    cache.remember_file_hash(str(audio_file), "hash")
+
+    # Plik używany regularnie nie wypada z pamięci podręcznej
+    clock.advance(0.75 * 86400)
+    assert cache.lookup_file_hash(str(audio_file)) == "hash"
+    clock.advance(0.75 * 86400)
+    cache.evict()
+    assert cache.lookup_file_hash(str(audio_file)) == "hash"
+
+    clock.advance(2 * 86400)
+    cache.evict()
+    assert cache.lookup_file_hash(str(audio_file)) is None
+
+
+def test_file_hash_ignored_after_file_change(make_cache, clock, tmp_path):
+    cache = make_cache()
+    audio_file = tmp_path / "nagranie.wav"
+    audio_file.write_bytes(b"RIFF")
+    cache.remember_file_hash(str(audio_file), "hash")
+
+    audio_file.write_bytes(b"RIFF-zmieniony")
+    assert cache.lookup_file_hash(str(audio_file)) is None
+    assert cache.lookup_file_hash(os.path.join(str(tmp_path), "brak.wav")) is None
+
+
+def test_clear(make_cache, clock):
+    cache = make_cache()
+    put_entries(cache, clock, ["a"])
+    cache.put_language("hash", "en")
+    cache.clear()
+    assert cache.get("a") is None
+    assert cache.get_language("hash") is None
@@ -0,0 +1,68 @@
+# X:\Aplikacje\dictaitor\tests\test_vad.py
+import numpy as np
+import pytest
+
+from modules.vad import TimestampMap, trim_silence
+
+RATE = 16000
+
+
+def speech_with_pause(pause_seconds: float = 3.0) -> np.ndarray:
+    """2 s "mowy" (szum), pauza, znowu 2 s mowy - próbki mowy są unikalne, więc łatwo je odnaleźć."""
+    rng = np.random.default_rng(0)
+    first, second = (rng.standard_normal((2, 2 * RATE)) * 0.3).astype(np.float32)
+    return np.concatenate([first, np.zeros(int(pause_seconds * RATE), dtype=np.float32), second])
+
+
+def test_identity_map_keeps_times():
+    tmap = TimestampMap.identity(10 * RATE, RATE)
+    assert tmap.to_original(0.0) == 0.0
+    assert tmap.to_original(7.25) == pytest.approx(7.25)
+    assert tmap.removed_seconds == 0.0
+    assert tmap.original_duration == tmap.trimmed_duration == 10.0
+
+
+def test_to_original_shifts_by_removed_fragments():
+    # Zachowane: [0, 2 s) i [5 s, 7 s) oryginału -> [0, 2 s) i [2 s, 4 s) po przycięciu
+    tmap = TimestampMap(np.array([0, 2 * RATE]), np.array([0, 5 * RATE]), RATE, 7 * RATE, 4 * RATE)
+    assert tmap.to_original(1.0) == pytest.approx(1.0)
+    assert tmap.to_original(2.0) == pytest.approx(5.0)
+    assert tmap.to_original(3.5) == pytest.approx(6.5)
+    assert tmap.removed_seconds == pytest.approx(3.0)
+
+
+def test_remap_segments_in_place():
+    tmap = TimestampMap(np.array([0, 2 * RATE]), np.array([0, 5 * RATE]), RATE, 7 * RATE, 4 * RATE)
+    segments = [{"start": 0.5, "end": 1.5, "text": "a"}, {"start": 2.5, "end": 3.0, "text": "b"}]
+    result = tmap.remap_segments(segments)
+    assert result is segments
+    assert [(s["start"], s["end"]) for s in segments] == [pytest.approx((0.5, 1.5)), pytest.approx((5.5, 6.0))]
+    assert segments[1]["text"] == "b"
+
+
+def test_trim_silence_map_points_back_to_same_samples():
+    audio = speech_with_pause()
+    trimmed, tmap = trim_silence(audio, RATE, aggressiveness=2)
+
+    assert len(trimmed) < len(audio)
+    assert tmap.trimmed_samples == len(trimmed)
+    assert tmap.original_samples == len(audio)
+    assert tmap.removed_seconds == pytest.approx((len(audio) - len(trimmed)) / RATE)
+    for seconds in (0.1, 1.9, tmap.trimmed_duration - 1.0, tmap.trimmed_duration - 0.01):
+        trimmed_index = int(round(seconds * RATE))
+        original_index = int(round(tmap.to_original(seconds) * RATE))
+        assert audio[original_index] == trimmed[trimmed_index]
+
+
+def test_trim_silence_without_pauses_returns_input():
+    audio = speech_with_pause(pause_seconds=0.0)
+    trimmed, tmap = trim_silence(audio, RATE, aggressiveness=2)
+    assert trimmed is audio
+    assert tmap.removed_seconds == 0.0
+
+
+def test_trim_silence_disabled():
+    audio = speech_with_pause()
+    trimmed, tmap = trim_silence(audio, RATE, aggressiveness=0)
+    assert trimmed is audio
+    assert tmap.to_original(4.0) == pytest.approx(4.0)